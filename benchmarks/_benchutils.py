@@ -0,0 +1,137 @@
+
+
+
+import os
+import sys
+import json
+import time
+import typing
+import platform
+
+
+
+
+#
+# Make sure the sources of this repository are used (and not some installed version of jk_simpleexec).
+#
+SRC_DIR_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+if SRC_DIR_PATH not in sys.path:
+	sys.path.insert(0, SRC_DIR_PATH)
+
+
+
+
+
+
+#
+# Calculate a percentile from a list of values (linear interpolation between closest ranks).
+#
+# @param		float[] values			(required) The values. This list does not need to be sorted.
+# @param		float p					(required) The percentile to calculate in the range [0..100].
+# @return		float					The percentile value or <c>None</c> if no values have been specified.
+#
+def percentile(values:typing.List[float], p:float) -> typing.Union[float,None]:
+	if not values:
+		return None
+	values = sorted(values)
+	k = (len(values) - 1) * p / 100.0
+	f = int(k)
+	c = min(f + 1, len(values) - 1)
+	return values[f] + (values[c] - values[f]) * (k - f)
+#
+
+
+
+#
+# Build the statistics record of a single benchmark case.
+#
+# @param		str name				(required) The name of the benchmark case.
+# @param		float[] durations		(required) The measured durations of every iteration in seconds.
+# @param		int bytesPerIteration	(optional) The amount of data processed per iteration. If specified the throughput is included in bytes per second.
+# @param		dict extra				(optional) Additional data to include in the record.
+# @return		dict					A JSON compatible dictionary.
+#
+def buildRecord(name:str, durations:typing.List[float], bytesPerIteration:int = None, extra:dict = None) -> dict:
+	total = sum(durations)
+	ret = {
+		"name": name,
+		"iterations": len(durations),
+		"total_s": total,
+		"mean_s": (total / len(durations)) if durations else None,
+		"min_s": min(durations) if durations else None,
+		"max_s": max(durations) if durations else None,
+		"p50_s": percentile(durations, 50),
+		"p90_s": percentile(durations, 90),
+		"p99_s": percentile(durations, 99),
+		"ops_per_s": (len(durations) / total) if total > 0 else None,
+	}
+	if bytesPerIteration is not None:
+		ret["bytes_per_iteration"] = bytesPerIteration
+		ret["bytes_per_s"] = (bytesPerIteration * len(durations) / total) if total > 0 else None
+	if extra:
+		ret.update(extra)
+	return ret
+#
+
+
+
+#
+# Run the specified callable repeatedly and measure every single invocation.
+#
+# @param		callable fn				(required) The function to benchmark. It is invoked without arguments.
+# @param		int iterations			(required) The number of measured invocations.
+# @param		int warmup				(optional) The number of unmeasured invocations to perform before measuring.
+# @return		float[]					The durations of the measured invocations in seconds.
+#
+def measure(fn:typing.Callable, iterations:int, warmup:int = 1) -> typing.List[float]:
+	for _ in range(warmup):
+		fn()
+
+	durations = []
+	for _ in range(iterations):
+		t = time.perf_counter()
+		fn()
+		durations.append(time.perf_counter() - t)
+	return durations
+#
+
+
+
+#
+# Get information about the environment the benchmarks have been run in. This is included in the output to be able to compare results.
+#
+def getEnvironmentInfo() -> dict:
+	import jk_simpleexec
+
+	return {
+		"jk_simpleexec_version": jk_simpleexec.__version__,
+		"python_version": platform.python_version(),
+		"python_implementation": platform.python_implementation(),
+		"platform": platform.platform(),
+		"cpu_count": os.cpu_count(),
+		"timestamp": time.time(),
+	}
+#
+
+
+
+#
+# Write the benchmark records as a single JSON document. Records are written to STDOUT if no file path is specified.
+#
+def writeResults(benchmarkName:str, records:typing.List[dict], outFilePath:str = None):
+	data = {
+		"benchmark": benchmarkName,
+		"environment": getEnvironmentInfo(),
+		"results": records,
+	}
+	s = json.dumps(data, indent="\t")
+	if outFilePath:
+		with open(outFilePath, "w", encoding="utf-8") as fout:
+			fout.write(s)
+			fout.write("\n")
+	else:
+		print(s)
+#
+
+
+
@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+
+#
+# Measures the time required for "import jk_simpleexec" in a fresh python interpreter and verifies that none of the
+# optional or expensive modules get loaded by the import.
+#
+# Exits with a non-zero exit code if the import takes longer than specified by --max-ms or if some of these modules are imported.
+#
+
+
+
+import sys
+import json
+import argparse
+
+import _benchutils
+
+import jk_simpleexec
+
+
+
+
+#
+# These modules must only be loaded on demand.
+#
+LAZY_MODULES = [
+	"invoke",
+	"fabric",
+	"lxml",
+	"xml.etree.ElementTree",
+	"json",
+	"jk_cmdoutputparsinghelper",
+]
+
+CHILD_CODE = """
+import sys, time
+sys.path.insert(0, {srcDirPath!r})
+t = time.perf_counter()
+import jk_simpleexec
+d = time.perf_counter() - t
+loaded = [ m for m in {lazyModules!r} if m in sys.modules ]
+import json
+print(json.dumps({{ "duration": d, "loaded": loaded }}))
+"""
+
+
+
+
+
+ap = argparse.ArgumentParser(description="Measure the import time of jk_simpleexec.")
+ap.add_argument("-n", "--iterations", type=int, default=20, help="Number of fresh interpreters to start.")
+ap.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this value (in milliseconds).")
+ap.add_argument("-o", "--output", default=None, help="Write JSON results to this file instead of STDOUT.")
+args = ap.parse_args()
+
+code = CHILD_CODE.format(srcDirPath=_benchutils.SRC_DIR_PATH, lazyModules=LAZY_MODULES)
+
+durations = []
+loadedModules = set()
+for _ in range(args.iterations):
+	r = jk_simpleexec.invokeCmd2(
+		cmdPath=sys.executable,
+		cmdArgs=[ "-c", code ],
+	)
+	r.assertSuccess()
+	data = json.loads(r.stdOutStr)
+	durations.append(data["duration"])
+	loadedModules.update(data["loaded"])
+
+record = _benchutils.buildRecord("import jk_simpleexec", durations, extra={
+	"eagerly_loaded_lazy_modules": sorted(loadedModules),
+})
+_benchutils.writeResults("import", [ record ], args.output)
+
+bFailed = False
+if loadedModules:
+	print("ERROR: Modules imported eagerly: " + ", ".join(sorted(loadedModules)), file=sys.stderr)
+	bFailed = True
+if (args.max_ms is not None) and (record["p50_s"] * 1000 > args.max_ms):
+	print("ERROR: Median import time of {:.1f} ms exceeds {:.1f} ms".format(record["p50_s"] * 1000, args.max_ms), file=sys.stderr)
+	bFailed = True
+
+sys.exit(1 if bFailed else 0)
+
+
+
+
+
+
+
+
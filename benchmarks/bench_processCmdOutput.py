@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+
+#
+# Compares the bulk implementation of processCmdOutput() with the original line based implementation.
+#
+# Both implementations are fed with the same data, once as str and once as raw bytes (as received from a child process;
+# the line based implementation has to decode it first). Every result is verified to be identical.
+#
+
+
+
+import argparse
+import typing
+
+import _benchutils
+
+from jk_cmdoutputparsinghelper.TextData import TextData
+
+import jk_simpleexec
+
+
+
+
+#
+# The original line based implementation of processCmdOutput().
+#
+def legacyProcessCmdOutput(textData:str, policy:jk_simpleexec.TextDataProcessingPolicy) -> TextData:
+	textData = TextData(textData)
+
+	if policy.bRightTrimLines:
+		textData.lines.rightTrimAllLines()
+	if policy.bRemoveLeadingEmptyLines:
+		textData.lines.removeLeadingEmptyLines()
+	if policy.bRemoveTrailingEmptyLines:
+		textData.lines.removeTrailingEmptyLines()
+
+	return textData
+#
+
+#
+# Create text data with <c>nLines</c> lines and leading and trailing empty lines. If <c>bTrailingWhiteSpace</c> is <c>True</c>
+# two out of three lines end with white space.
+#
+def createTextData(nLines:int, bTrailingWhiteSpace:bool) -> str:
+	lines = [ "", "   ", "" ]
+	for i in range(nLines):
+		if bTrailingWhiteSpace and (i % 3 == 0):
+			lines.append("line " + str(i) + "   ")
+		elif bTrailingWhiteSpace and (i % 3 == 1):
+			lines.append("line " + str(i) + " with some more text in it\t")
+		else:
+			lines.append("line " + str(i) + " with some more text in it")
+	lines.extend([ "", "  ", "" ])
+	return "\n".join(lines)
+#
+
+#
+# Create text data with a single line of text surrounded by <c>nLines</c> empty lines (e.g. from tools that print progress output).
+#
+def createMostlyEmptyTextData(nLines:int) -> str:
+	return "\n" * nLines + "some text  \n" + "  \n" * nLines
+#
+
+
+
+
+
+
+ap = argparse.ArgumentParser(description="Compare the bulk and the line based implementation of processCmdOutput().")
+ap.add_argument("-n", "--iterations", type=int, default=5, help="Number of iterations per case.")
+ap.add_argument("--lines", default="1000,100000,1000000", help="Comma separated numbers of lines to process.")
+ap.add_argument("-o", "--output", default=None, help="Write JSON results to this file instead of STDOUT.")
+args = ap.parse_args()
+
+policies = [
+	("trim", jk_simpleexec.TextDataProcessingPolicy(False, False, True)),
+	("leading+trailing", jk_simpleexec.TextDataProcessingPolicy(True, True, False)),
+	("all", jk_simpleexec.TextDataProcessingPolicy(True, True, True)),
+]
+
+records = []
+for nLines in [ int(s) for s in args.lines.split(",") ]:
+	for dataName, text in [
+			("trailing white space", createTextData(nLines, True)),
+			("clean", createTextData(nLines, False)),
+			("mostly empty", createMostlyEmptyTextData(min(nLines, 100000))),
+		]:
+		data = text.encode("utf-8")
+
+		for policyName, policy in policies:
+			expected = list(legacyProcessCmdOutput(text, policy).lines)
+			assert list(jk_simpleexec.processCmdOutput(text, policy).lines) == expected
+			assert list(jk_simpleexec.processCmdOutput(data, policy).lines) == expected
+
+			# the lines are accessed in every case to make results comparable regardless of how lazy an implementation is
+			for implName, fn in [
+					("legacy str", lambda: legacyProcessCmdOutput(text, policy).lines),
+					("legacy bytes", lambda: legacyProcessCmdOutput(data.decode("utf-8"), policy).lines),
+					("bulk str", lambda: jk_simpleexec.processCmdOutput(text, policy).lines),
+					("bulk bytes", lambda: jk_simpleexec.processCmdOutput(data, policy).lines),
+				]:
+				durations = _benchutils.measure(fn, args.iterations)
+				records.append(_benchutils.buildRecord(
+					"processCmdOutput " + implName + ", " + str(nLines) + " lines " + dataName + ", policy " + policyName,
+					durations,
+					bytesPerIteration=len(data),
+				))
+
+_benchutils.writeResults("processCmdOutput", records, args.output)
+
+
+
+
+
+
+
+
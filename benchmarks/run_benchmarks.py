@@ -0,0 +1,352 @@
+#!/usr/bin/python3
+
+#
+# Benchmark suite for the execution hot paths of jk_simpleexec.
+#
+# Every benchmark case reports latency percentiles and throughput. The results are written as a single JSON document
+# so that they can be compared across releases. Specify a previous result file with --baseline to get the ratios
+# between the current and the previous run included in the output.
+#
+# Examples:
+#
+#	./run_benchmarks.py
+#	./run_benchmarks.py --case large_output --sizes 1M,64M,1G -n 3
+#	./run_benchmarks.py -o results-new.json --baseline results-old.json
+#
+
+
+
+import os
+import sys
+import json
+import argparse
+import typing
+
+import _benchutils
+
+import jk_simpleexec
+import jk_simpleexec.testing
+
+
+
+
+TRUE_PATH = "/bin/true"
+
+SIZE_UNITS = {
+	"K": 1024,
+	"M": 1024 * 1024,
+	"G": 1024 * 1024 * 1024,
+}
+
+
+
+def parseSize(s:str) -> int:
+	s = s.strip().upper()
+	if s[-1:] in SIZE_UNITS:
+		return int(s[:-1]) * SIZE_UNITS[s[-1]]
+	return int(s)
+#
+
+def formatSize(n:int) -> str:
+	for unit in [ "G", "M", "K" ]:
+		if (n % SIZE_UNITS[unit]) == 0:
+			return str(n // SIZE_UNITS[unit]) + unit
+	return str(n)
+#
+
+#
+# Create some text data with <c>nLines</c> lines. Some lines have trailing spaces, there are leading and trailing empty lines.
+#
+def createTextData(nLines:int) -> str:
+	lines = [ "", "" ]
+	for i in range(nLines):
+		if i % 3 == 0:
+			lines.append("line " + str(i) + "   ")
+		else:
+			lines.append("line " + str(i) + " with some more text in it")
+	lines.extend([ "", "  ", "" ])
+	return "\n".join(lines)
+#
+
+
+
+
+
+################################################################################################################################
+## Benchmark cases
+################################################################################################################################
+
+def bench_invoke_true(args) -> typing.List[dict]:
+	durations = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[]), args.iterations * 10)
+	return [ _benchutils.buildRecord("invokeCmd2 " + TRUE_PATH, durations) ]
+#
+
+def bench_large_output(args) -> typing.List[dict]:
+	ret = []
+	for size in args.sizes:
+		# let a shell pipeline produce the data: this way only the capturing side is measured
+		durations = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(
+			cmdPath="/bin/sh",
+			cmdArgs=[ "-c", "yes 'some line of text produced by the child process' | head -c " + str(size) ],
+		), args.iterations)
+		ret.append(_benchutils.buildRecord("large output " + formatSize(size), durations, bytesPerIteration=size))
+	return ret
+#
+
+def bench_large_stdin(args) -> typing.List[dict]:
+	ret = []
+	for size in args.sizes:
+		data = b"some line of text piped into the child process\n" * (size // 48 + 1)
+		data = data[:size]
+		durations = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(
+			cmdPath="wc",
+			cmdArgs=[ "-c" ],
+			dataToPipeAsStdIn=data,
+		), args.iterations)
+		ret.append(_benchutils.buildRecord("large stdin " + formatSize(size), durations, bytesPerIteration=size))
+	return ret
+#
+
+def bench_shell_vs_exec(args) -> typing.List[dict]:
+	n = args.iterations * 10
+	dExec = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[], shell=False), n)
+	dShell = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[], shell=True), n)
+	return [
+		_benchutils.buildRecord("exec " + TRUE_PATH, dExec),
+		_benchutils.buildRecord("shell " + TRUE_PATH, dShell),
+	]
+#
+
+def bench_env(args) -> typing.List[dict]:
+	n = args.iterations * 10
+	overrides = { "LC_ALL": "C" }
+	snapshot = jk_simpleexec.EnvSnapshot(envOverrides=overrides)
+	dOverrides = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[], envOverrides=overrides), n)
+	dSnapshot = _benchutils.measure(lambda: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[], env=snapshot), n)
+	return [
+		_benchutils.buildRecord("env overrides per call " + TRUE_PATH, dOverrides),
+		_benchutils.buildRecord("env snapshot " + TRUE_PATH, dSnapshot),
+	]
+#
+
+def bench_processCmdOutput(args) -> typing.List[dict]:
+	ret = []
+	for nLines in [ 1000, 100000, 1000000 ]:
+		text = createTextData(nLines)
+		nBytes = len(text.encode("utf-8"))
+		for name, policy in [
+				("none", jk_simpleexec.TextDataProcessingPolicy(False, False, False)),
+				("trim", jk_simpleexec.TextDataProcessingPolicy(False, False, True)),
+				("leading+trailing", jk_simpleexec.TextDataProcessingPolicy(True, True, False)),
+				("all", jk_simpleexec.TextDataProcessingPolicy(True, True, True)),
+			]:
+			# accessing the lines makes sure the result is comparable regardless of how lazy the implementation is
+			durations = _benchutils.measure(lambda: jk_simpleexec.processCmdOutput(text, policy).lines, args.iterations)
+			ret.append(_benchutils.buildRecord("processCmdOutput " + str(nLines) + " lines, policy " + name, durations, bytesPerIteration=nBytes))
+	return ret
+#
+
+def bench_whereis(args) -> typing.List[dict]:
+	durations = _benchutils.measure(lambda: jk_simpleexec.whereis("sh"), args.iterations * 10)
+	return [ _benchutils.buildRecord("whereis sh", durations) ]
+#
+
+def bench_runCmd(args) -> typing.List[dict]:
+	ret = []
+	n = args.iterations * 10
+
+	durations = _benchutils.measure(lambda: jk_simpleexec.runCmd(None, "true"), n)
+	ret.append(_benchutils.buildRecord("runCmd local true", durations))
+
+	# the overhead on top of the simulated round trip
+	c = jk_simpleexec.testing.FakeConnection(latency=0.001)
+	durations = _benchutils.measure(lambda: jk_simpleexec.runCmd(c, "true"), n)
+	ret.append(_benchutils.buildRecord("runCmd fake connection (1ms latency) true", durations))
+
+	if args.ssh_host:
+		from fabric import Connection
+
+		c = Connection(host=args.ssh_host, port=args.ssh_port)
+		try:
+			durations = _benchutils.measure(lambda: jk_simpleexec.runCmd(c, "true"), n)
+			ret.append(_benchutils.buildRecord("runCmd ssh true", durations, extra={ "ssh_host": args.ssh_host, "ssh_port": args.ssh_port }))
+		finally:
+			c.close()
+
+	if args.local_sshd:
+		with jk_simpleexec.testing.LocalSSHServer() as server:
+			with server.connect() as c:
+				durations = _benchutils.measure(lambda: jk_simpleexec.runCmd(c, "true"), n)
+				ret.append(_benchutils.buildRecord("runCmd local sshd true", durations))
+
+	return ret
+#
+
+def bench_template(args) -> typing.List[dict]:
+	import shlex
+
+	n = args.iterations * 10
+	template = jk_simpleexec.CommandTemplate(TRUE_PATH + " --name={name} [--level {level}] {paths*}")
+	values = { "name": "some name", "level": 3, "paths": [ "a", "b", "c" ] }
+	return [
+		_benchutils.buildRecord("CommandTemplate.render()", _benchutils.measure(lambda: template.render(values), n * 100)),
+		_benchutils.buildRecord("CommandTemplate.invoke() " + TRUE_PATH, _benchutils.measure(lambda: template.invoke(values), n)),
+		_benchutils.buildRecord("runCmd interpolated shell command " + TRUE_PATH, _benchutils.measure(
+			lambda: jk_simpleexec.runCmd(None, TRUE_PATH + " --name=" + shlex.quote(values["name"]) + " --level " + str(values["level"]) + " a b c"), n)),
+	]
+#
+
+def bench_pipeline(args) -> typing.List[dict]:
+	import resource
+
+	ret = []
+	for size in args.sizes:
+		producer = [ "head", "-c", str(size), "/dev/zero" ]
+
+		def chained():
+			r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", " ".join(producer) + " | tr '\\0' x" ])
+			jk_simpleexec.invokeCmd2(cmdPath="wc", cmdArgs=[ "-c" ], dataToPipeAsStdIn="\n".join(r.stdOutLines))
+		#
+
+		def pipeline():
+			jk_simpleexec.invokePipeline(commands=[ producer, [ "tr", "\\0", "x" ], [ "wc", "-c" ] ])
+		#
+
+		for name, fn in [ ("chained invokeCmd2", chained), ("invokePipeline", pipeline) ]:
+			# the CPU time of the current process shows how much of the data passes through python
+			cpuStart = resource.getrusage(resource.RUSAGE_SELF)
+			durations = _benchutils.measure(fn, args.iterations)
+			cpuEnd = resource.getrusage(resource.RUSAGE_SELF)
+			parentCPU = (cpuEnd.ru_utime + cpuEnd.ru_stime - cpuStart.ru_utime - cpuStart.ru_stime) / (args.iterations + 1)
+			ret.append(_benchutils.buildRecord(name + " " + formatSize(size), durations, bytesPerIteration=size, extra={ "parent_cpu_s": parentCPU }))
+	return ret
+#
+
+def bench_engine(args) -> typing.List[dict]:
+	import concurrent.futures
+
+	ret = []
+	nCommands = 500
+	with jk_simpleexec.ExecutionEngine() as engine:
+		durations = _benchutils.measure(lambda: [ f.result() for f in [ engine.submit(cmdPath=TRUE_PATH, cmdArgs=[]) for i in range(nCommands) ] ], args.iterations)
+		ret.append(_benchutils.buildRecord("ExecutionEngine " + str(nCommands) + " x " + TRUE_PATH, durations))
+
+	for nThreads in [ 16, 64 ]:
+		with concurrent.futures.ThreadPoolExecutor(nThreads) as executor:
+			durations = _benchutils.measure(lambda: list(executor.map(lambda i: jk_simpleexec.invokeCmd2(cmdPath=TRUE_PATH, cmdArgs=[]), range(nCommands))), args.iterations)
+			ret.append(_benchutils.buildRecord("invokeCmd2 in " + str(nThreads) + " threads " + str(nCommands) + " x " + TRUE_PATH, durations))
+
+	return ret
+#
+
+def bench_resultLog(args) -> typing.List[dict]:
+	import tempfile
+
+	ret = []
+	nResults = 10000
+	text = createTextData(20)
+	results = [
+		jk_simpleexec.CommandResult("/usr/bin/some-tool", [ "--arg", str(i) ], jk_simpleexec.processCmdOutput(text, jk_simpleexec.DEFAULT_STDOUT_PROCESSING), [], 0, 0.01)
+		for i in range(nResults)
+	]
+
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "results")
+
+		def writeJSONDump():
+			with open(filePath, "w", encoding="utf-8") as fout:
+				for r in results:
+					json.dump(r.toJSON(), fout)
+					fout.write("\n")
+		#
+		durations = _benchutils.measure(writeJSONDump, args.iterations)
+		ret.append(_benchutils.buildRecord("json.dump(toJSON()) " + str(nResults) + " results", durations, extra={ "file_size": os.path.getsize(filePath) }))
+
+		for format, compression in [ ("jsonl", None), ("binary", None), ("binary", "gzip") ]:
+			def write():
+				os.unlink(filePath)
+				with jk_simpleexec.CommandResultLogWriter(filePath, format=format, compression=compression, bWriteIndex=False) as w:
+					w.writeAll(results)
+			#
+			def read():
+				with jk_simpleexec.CommandResultLogReader(filePath) as reader:
+					for r in reader:
+						pass
+			#
+			name = format + ("" if compression is None else "+" + compression)
+			durations = _benchutils.measure(write, args.iterations)
+			ret.append(_benchutils.buildRecord("CommandResultLogWriter " + name + " " + str(nResults) + " results", durations, extra={ "file_size": os.path.getsize(filePath) }))
+			durations = _benchutils.measure(read, args.iterations)
+			ret.append(_benchutils.buildRecord("CommandResultLogReader " + name + " " + str(nResults) + " results", durations))
+
+	return ret
+#
+
+
+
+BENCHMARKS = {
+	"invoke_true": bench_invoke_true,
+	"large_output": bench_large_output,
+	"large_stdin": bench_large_stdin,
+	"shell_vs_exec": bench_shell_vs_exec,
+	"env": bench_env,
+	"processCmdOutput": bench_processCmdOutput,
+	"whereis": bench_whereis,
+	"runCmd": bench_runCmd,
+	"resultLog": bench_resultLog,
+	"engine": bench_engine,
+	"template": bench_template,
+	"pipeline": bench_pipeline,
+}
+
+
+
+
+
+#
+# Add the p50 values and ratios of a previous run to the specified records. Records are matched by their name.
+#
+def addBaseline(records:typing.List[dict], baselineFilePath:str):
+	with open(baselineFilePath, "r", encoding="utf-8") as fin:
+		baseline = json.load(fin)
+	baselineRecords = { r["name"]: r for r in baseline["results"] }
+	for r in records:
+		b = baselineRecords.get(r["name"])
+		if b and b.get("p50_s"):
+			r["baseline_p50_s"] = b["p50_s"]
+			r["p50_ratio"] = r["p50_s"] / b["p50_s"]
+#
+
+
+
+ap = argparse.ArgumentParser(description="Run the jk_simpleexec benchmark suite.")
+ap.add_argument("-c", "--case", action="append", choices=sorted(BENCHMARKS), help="Benchmark case to run. Can be specified multiple times. Default: all.")
+ap.add_argument("-n", "--iterations", type=int, default=5, help="Base number of iterations per case.")
+ap.add_argument("--sizes", default="1M,16M,128M", help="Comma separated data sizes for the large output and large stdin cases (e.g. \"1M,64M,1G\").")
+ap.add_argument("--ssh-host", default=None, help="Additionally benchmark runCmd() over SSH against this host (requires fabric).")
+ap.add_argument("--ssh-port", type=int, default=22, help="The SSH port to use together with --ssh-host.")
+ap.add_argument("--local-sshd", action="store_true", help="Additionally benchmark runCmd() against a private sshd started on a temporary port (requires sshd and fabric).")
+ap.add_argument("--baseline", default=None, help="A JSON result file of a previous run to compare with.")
+ap.add_argument("-o", "--output", default=None, help="Write JSON results to this file instead of STDOUT.")
+args = ap.parse_args()
+args.sizes = [ parseSize(s) for s in args.sizes.split(",") ]
+
+records = []
+for caseName in (args.case or BENCHMARKS.keys()):
+	print("Running: " + caseName, file=sys.stderr)
+	for r in BENCHMARKS[caseName](args):
+		r["case"] = caseName
+		records.append(r)
+
+if args.baseline:
+	addBaseline(records, args.baseline)
+
+_benchutils.writeResults("suite", records, args.output)
+
+
+
+
+
+
+
+
@@ -0,0 +1,365 @@
+
+
+import os
+import time
+import threading
+import collections
+import typing
+
+from .CommandResult import CommandResult
+
+
+
+
+_LOADAVG_FILE_PATH = "/proc/loadavg"
+_PRESSURE_FILE_PATH_PATTERN = "/proc/pressure/{}"
+
+DEFAULT_MAX_PRESSURE = {
+	"cpu": 40.0,
+	"memory": 10.0,
+	"io": 40.0,
+}
+
+
+
+#
+# Read the "some avg10" value of a PSI file: the percentage of time during the last 10 seconds in which at least one task was stalled.
+#
+def _readPressure(resourceName:str) -> typing.Union[float,None]:
+	try:
+		with open(_PRESSURE_FILE_PATH_PATTERN.format(resourceName), "r") as fin:
+			line = fin.readline()
+	except OSError:
+		return None
+	for item in line.split()[1:]:
+		if item.startswith("avg10="):
+			return float(item[6:])
+	return None
+#
+
+def _readLoadAvg() -> typing.Union[float,None]:
+	try:
+		with open(_LOADAVG_FILE_PATH, "r") as fin:
+			return float(fin.read().split(" ", 1)[0])
+	except (OSError, ValueError):
+		return None
+#
+
+
+
+
+#
+# Limits the number of commands running concurrently and adjusts this limit at runtime depending on the load of the host.
+#
+# The limit is adjusted following an AIMD policy (additive increase, multiplicative decrease) at most once per <c>adjustInterval</c>:
+#
+# * If the host is overloaded the limit is multiplied by <c>decreaseFactor</c>. The host is considered overloaded if the average latency of the
+#   commands completed since the previous adjustment exceeds <c>targetLatency</c>, if the 1 minute load average per CPU exceeds <c>maxLoadPerCPU</c> or if
+#   a PSI pressure value (<c>/proc/pressure/cpu</c>, <c>memory</c>, <c>io</c>: "some avg10") exceeds its maximum.
+# * Otherwise, if the limit has actually been reached since the last adjustment, it is increased by <c>increaseStep</c>.
+#
+# The load average and the PSI values are averages over a period of time: they reflect a decrease only after a while. Therefore these signals do not
+# cause another decrease within <c>LOADAVG_COOLDOWN</c> or <c>PRESSURE_COOLDOWN</c> seconds after a decrease. Until then the limit is held.
+#
+# Signals that are not available (e.g. PSI on older kernels) are ignored. Please note that the load average covers the whole host even within a container.
+#
+# Use an instance of this class with <c>JobScheduler(limiter=...)</c> or directly:
+#
+#	limiter = AdaptiveLimiter(minLimit=2, maxLimit=64, targetLatency=5)
+#	...
+#	limiter.acquire()				# in every worker thread
+#	r = None
+#	try:
+#		r = invokeCmd2(...)
+#	finally:
+#		limiter.release(r)
+#
+class AdaptiveLimiter(object):
+
+	# the number of decisions kept for getDecisions()
+	MAX_DECISIONS = 1000
+
+	# the time in seconds after a decrease in which the load average (1 minute average) or PSI ("avg10") don't cause another decrease
+	LOADAVG_COOLDOWN = 60.0
+	PRESSURE_COOLDOWN = 10.0
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int minLimit					(optional) The minimum limit. (Default: 1)
+	# @param		int maxLimit					(optional) The maximum limit. (Default: four times the number of CPUs)
+	# @param		float targetLatency				(optional) The maximum average duration of commands in seconds. If <c>None</c> the latency is not considered.
+	# @param		int initialLimit				(optional) The limit to start with. (Default: the number of CPUs within the range of <c>minLimit</c> and <c>maxLimit</c>)
+	# @param		float maxLoadPerCPU				(optional) The maximum 1 minute load average divided by the number of CPUs. If <c>None</c> the load average is not considered. (Default: 1.5)
+	# @param		dict maxPressure				(optional) The maximum PSI values in percent for "cpu", "memory" and "io" (see <c>DEFAULT_MAX_PRESSURE</c>). Specify
+	#												<c>None</c> as value to ignore a resource.
+	# @param		int increaseStep				(optional) The value the limit is increased by. (Default: 1)
+	# @param		float decreaseFactor			(optional) The factor the limit is multiplied with if the host is overloaded. (Default: 0.75)
+	# @param		float adjustInterval			(optional) The minimum time in seconds between two adjustments. (Default: 1)
+	#
+	def __init__(self,
+			minLimit:int = 1,
+			maxLimit:int = None,
+			targetLatency:float = None,
+			initialLimit:int = None,
+			maxLoadPerCPU:float = 1.5,
+			maxPressure:typing.Dict[str,typing.Union[float,None]] = None,
+			increaseStep:int = 1,
+			decreaseFactor:float = 0.75,
+			adjustInterval:float = 1,
+		):
+
+		nCPUs = os.cpu_count() or 1
+		if maxLimit is None:
+			maxLimit = max(minLimit, 4 * nCPUs)
+		if initialLimit is None:
+			initialLimit = nCPUs
+		assert 1 <= minLimit <= maxLimit
+		assert increaseStep >= 1
+		assert 0 < decreaseFactor < 1
+
+		self.minLimit = minLimit
+		self.maxLimit = maxLimit
+		self.targetLatency = targetLatency
+		self.maxLoadPerCPU = maxLoadPerCPU
+		self.maxPressure = dict(DEFAULT_MAX_PRESSURE)
+		if maxPressure:
+			self.maxPressure.update(maxPressure)
+		self.increaseStep = increaseStep
+		self.decreaseFactor = decreaseFactor
+		self.adjustInterval = adjustInterval
+
+		self.__nCPUs = nCPUs
+		self.__cond = threading.Condition()
+		self.__limit = min(maxLimit, max(minLimit, initialLimit))
+		self.__running = 0
+		self.__waiting = 0
+		self.__peakRunning = 0
+		self.__latencySum = 0.0				# the latencies observed since the previous adjustment
+		self.__latencyCount = 0
+		self.__tLastAdjustment = time.monotonic()
+		self.__tLastDecrease = None
+		self.__signals = {}
+		self.__counters = collections.Counter()
+		self.__decisions = collections.deque(maxlen=AdaptiveLimiter.MAX_DECISIONS)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The current limit.
+	#
+	@property
+	def limit(self) -> int:
+		return self.__limit
+	#
+
+	#
+	# The number of slots currently acquired.
+	#
+	@property
+	def running(self) -> int:
+		return self.__running
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __readSignals(self) -> dict:
+		loadAvg = _readLoadAvg()
+		ret = {
+			# every latency is considered by a single decision only: without new results there is no evidence of overload
+			"latency": self.__latencySum / self.__latencyCount if self.__latencyCount else None,
+			"loadPerCPU": None if loadAvg is None else loadAvg / self.__nCPUs,
+		}
+		for resourceName in DEFAULT_MAX_PRESSURE:
+			ret[resourceName + "Pressure"] = _readPressure(resourceName) if self.maxPressure.get(resourceName) is not None else None
+		return ret
+	#
+
+	#
+	# Adjust the limit if the adjustment interval has passed. The lock must be held.
+	#
+	def __maybeAdjust(self):
+		tNow = time.monotonic()
+		if tNow - self.__tLastAdjustment < self.adjustInterval:
+			return
+		self.__tLastAdjustment = tNow
+
+		signals = self.__readSignals()
+		self.__latencySum = 0.0
+		self.__latencyCount = 0
+		tSinceDecrease = float("inf") if self.__tLastDecrease is None else tNow - self.__tLastDecrease
+		reasons = []
+		bDecrease = False
+		if (self.targetLatency is not None) and (signals["latency"] is not None) and (signals["latency"] > self.targetLatency):
+			reasons.append("latency")
+			bDecrease = True
+		if (self.maxLoadPerCPU is not None) and (signals["loadPerCPU"] is not None) and (signals["loadPerCPU"] > self.maxLoadPerCPU):
+			reasons.append("loadavg")
+			bDecrease = bDecrease or (tSinceDecrease >= AdaptiveLimiter.LOADAVG_COOLDOWN)
+		for resourceName, maxValue in self.maxPressure.items():
+			value = signals.get(resourceName + "Pressure")
+			if (maxValue is not None) and (value is not None) and (value > maxValue):
+				reasons.append(resourceName + " pressure")
+				bDecrease = bDecrease or (tSinceDecrease >= AdaptiveLimiter.PRESSURE_COOLDOWN)
+
+		oldLimit = self.__limit
+		if bDecrease:
+			action = "decrease"
+			self.__tLastDecrease = tNow
+			self.__limit = max(self.minLimit, int(self.__limit * self.decreaseFactor))
+		elif reasons:
+			# overloaded, but a previous decrease might not be reflected by the signals yet
+			action = "hold"
+		elif self.__peakRunning >= self.__limit:
+			action = "increase"
+			self.__limit = min(self.maxLimit, self.__limit + self.increaseStep)
+		else:
+			action = "hold"
+		if self.__limit == oldLimit:
+			action = "hold"
+		self.__peakRunning = self.__running
+
+		self.__signals = signals
+		self.__counters[action] += 1
+		self.__decisions.append({
+			"time": time.time(),
+			"action": action,
+			"reasons": reasons,
+			"limit": self.__limit,
+			"previousLimit": oldLimit,
+			"running": self.__running,
+			"signals": signals,
+		})
+		if self.__limit > oldLimit:
+			self.__cond.notify(self.__limit - oldLimit)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Acquire a slot if the limit has not been reached yet.
+	#
+	# @return		bool					Returns <c>True</c> if a slot has been acquired.
+	#
+	def tryAcquire(self) -> bool:
+		with self.__cond:
+			self.__maybeAdjust()
+			if self.__running >= self.__limit:
+				return False
+			self.__running += 1
+			self.__peakRunning = max(self.__peakRunning, self.__running)
+			return True
+	#
+
+	#
+	# Wait for a free slot and acquire it.
+	#
+	# @param		float timeout			(optional) The maximum time to wait in seconds.
+	# @return		bool					Returns <c>False</c> if the timeout has been reached.
+	#
+	def acquire(self, timeout:float = None) -> bool:
+		tDeadline = None if timeout is None else time.monotonic() + timeout
+		with self.__cond:
+			self.__waiting += 1
+			try:
+				while True:
+					self.__maybeAdjust()
+					if self.__running < self.__limit:
+						break
+					waitTime = self.adjustInterval
+					if tDeadline is not None:
+						remaining = tDeadline - time.monotonic()
+						if remaining <= 0:
+							return False
+						waitTime = min(waitTime, remaining)
+					self.__cond.wait(waitTime)
+			finally:
+				self.__waiting -= 1
+			self.__running += 1
+			self.__peakRunning = max(self.__peakRunning, self.__running)
+			return True
+	#
+
+	#
+	# Release a slot.
+	#
+	# @param		CommandResult|float result		(optional) The result of the command (or its duration in seconds). This is used for measuring the latency.
+	#
+	def release(self, result:typing.Union[CommandResult,float,None] = None):
+		if isinstance(result, CommandResult):
+			result = result.duration if result.duration >= 0 else None
+		with self.__cond:
+			assert self.__running > 0
+			self.__running -= 1
+			if result is not None:
+				self.__latencySum += result
+				self.__latencyCount += 1
+			self.__maybeAdjust()
+			self.__cond.notify()
+	#
+
+	#
+	# Get metrics about this limiter.
+	#
+	# @return		dict			Returns a dictionary with the following keys:
+	#								* "limit", "minLimit", "maxLimit" - the current limit and its range
+	#								* "running", "waiting" - the number of slots acquired and the number of threads waiting for a slot
+	#								* "increase", "decrease", "hold" - the number of decisions made since the limiter was created
+	#								* "signals" - the signals of the most recent decision: "latency" (the average latency in seconds of the commands
+	#								  completed since the decision before, <c>None</c> if no command completed), "loadPerCPU",
+	#								  "cpuPressure", "memoryPressure" and "ioPressure" (<c>None</c> if not available)
+	#								* "lastDecision" - the most recent decision (see <c>getDecisions()</c>) or <c>None</c>
+	#
+	def getMetrics(self) -> dict:
+		with self.__cond:
+			return {
+				"limit": self.__limit,
+				"minLimit": self.minLimit,
+				"maxLimit": self.maxLimit,
+				"running": self.__running,
+				"waiting": self.__waiting,
+				"increase": self.__counters["increase"],
+				"decrease": self.__counters["decrease"],
+				"hold": self.__counters["hold"],
+				"signals": dict(self.__signals),
+				"lastDecision": self.__decisions[-1] if self.__decisions else None,
+			}
+	#
+
+	#
+	# Get the most recent decisions (up to <c>MAX_DECISIONS</c>).
+	#
+	# @return		dict[]			The decisions (oldest first). Each decision is a dictionary with the keys "time" (as returned by <c>time.time()</c>),
+	#								"action" ("increase", "decrease" or "hold"), "reasons" (the signals that indicated overload; if the limit has been held
+	#								nevertheless these are cooling down after a previous decrease), "limit",
+	#								"previousLimit", "running" and "signals".
+	#
+	def getDecisions(self) -> typing.List[dict]:
+		with self.__cond:
+			return list(self.__decisions)
+	#
+
+	def __enter__(self):
+		self.acquire()
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.release()
+	#
+
+#
+
+
+
@@ -0,0 +1,320 @@
+
+
+import os
+import time
+import signal
+import threading
+import typing
+
+from .CommandResult import CommandResult
+from . import _resultlog as _resultlog
+
+
+
+
+#
+# Records the results of commands run by <c>invokeCmd2()</c> and <c>runCmd()</c> or serves recorded results instead of running commands.
+#
+# Activate a recording with <c>enableRecording()</c> or <c>enableReplay()</c>:
+#
+#	with jk_simpleexec.enableRecording("commands.rec"):
+#		...										# commands are run and recorded
+#
+#	with jk_simpleexec.enableReplay("commands.rec", simulateDuration=1.0):
+#		...										# no commands are run at all
+#
+# A command is identified by its argument vector, its working directory, the SHA-256 hash of the data piped to STDIN and the host
+# (for remote commands). The results of a command recorded multiple times are served in the order of recording; after the last one
+# the results are served again from the beginning. This way a recording of a few runs can drive load tests of arbitrary length.
+#
+# The recorded results contain the output as processed according to the <c>TextDataProcessingPolicy</c> in effect while recording.
+# Output forwarders and timelines are not served while replaying.
+#
+# Recording files start with <c>MAGIC</c> followed by a single byte identifying the compression. Then records follow, each consisting of the
+# length of the (compressed) payload as unsigned 64 bit little endian integer and the payload: the length of the key (same encoding), the
+# key as JSON and the result encoded the same way <c>CommandResultLogWriter</c> does.
+#
+class CommandRecording(object):
+
+	MAGIC = b"JKSXREC1"
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. Use <c>enableRecording()</c> or <c>enableReplay()</c> instead of invoking this constructor directly.
+	#
+	# @param		str filePath				(required) The path of the recording file. In "record" mode results are appended to an existing file.
+	# @param		str mode					(required) "record" or "replay".
+	# @param		str compression				(optional) <c>None</c> (default), "gzip" or "zstd". (Only used in "record" mode.)
+	# @param		float simulateDuration		(optional) If specified replaying a result takes the recorded duration multiplied by this factor
+	#											(e.g. <c>1.0</c> for the original duration). If <c>None</c> (default) results are served immediately.
+	# @param		bool passThrough			(optional) If <c>True</c> commands not recorded are run while replaying. Otherwise (default) an exception is raised.
+	#
+	def __init__(self,
+			filePath:str,
+			mode:str,
+			compression:str = None,
+			simulateDuration:float = None,
+			passThrough:bool = False,
+		):
+
+		assert isinstance(filePath, str)
+		if mode not in ("record", "replay"):
+			raise Exception("Unknown mode: " + repr(mode))
+		if compression not in _resultlog.COMPRESSION_IDS:
+			raise Exception("Unknown compression: " + repr(compression))
+		if simulateDuration is not None:
+			assert simulateDuration >= 0
+
+		self.__filePath = filePath
+		self.__mode = mode
+		self.__simulateDuration = simulateDuration
+		self.__passThrough = passThrough
+		self.__lock = threading.Lock()
+		self.__nRecorded = 0
+		self.__nReplayed = 0
+		self.__nMissing = 0
+
+		self.__f = None
+		self.__records = {}					# key -> [ position of the next record to serve, payload, payload, ... ]
+		if mode == "record":
+			self.__compression = compression
+			self.__compress, _ = _resultlog.createCodec(compression)
+			self.__prepareFile()
+			self.__f = open(filePath, "ab")
+		else:
+			self.__load()
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def filePath(self) -> str:
+		return self.__filePath
+	#
+
+	#
+	# Either "record" or "replay".
+	#
+	@property
+	def mode(self) -> str:
+		return self.__mode
+	#
+
+	#
+	# The number of results recorded by this object.
+	#
+	@property
+	def nRecorded(self) -> int:
+		return self.__nRecorded
+	#
+
+	#
+	# The number of results served by this object.
+	#
+	@property
+	def nReplayed(self) -> int:
+		return self.__nReplayed
+	#
+
+	#
+	# The number of commands not found in the recording while replaying.
+	#
+	@property
+	def nMissing(self) -> int:
+		return self.__nMissing
+	#
+
+	#
+	# The number of distinct commands in the recording. (Only available in "replay" mode.)
+	#
+	@property
+	def commandCount(self) -> int:
+		return len(self.__records)
+	#
+
+	@property
+	def isClosed(self) -> bool:
+		return (self.__f is None) and (self.__mode == "record")
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __prepareFile(self):
+		if not os.path.isfile(self.__filePath) or (os.path.getsize(self.__filePath) == 0):
+			with open(self.__filePath, "wb") as fout:
+				fout.write(CommandRecording.MAGIC + bytes([ _resultlog.COMPRESSION_IDS[self.__compression] ]))
+			return
+
+		with open(self.__filePath, "r+b") as f:
+			compression = self.__readHeader(f)
+			if compression != self.__compression:
+				raise Exception("Existing file uses compression " + repr(compression) + ": " + repr(self.__filePath))
+			# remove an incomplete last record
+			_, validEnd = _resultlog.loadOffsets(f, None, True)
+			f.truncate(validEnd)
+	#
+
+	def __readHeader(self, f) -> typing.Union[str,None]:
+		header = f.read(len(CommandRecording.MAGIC) + 1)
+		if (len(header) != len(CommandRecording.MAGIC) + 1) or (header[:-1] != CommandRecording.MAGIC):
+			raise Exception("Not a recording file: " + repr(self.__filePath))
+		if header[-1] not in _resultlog.COMPRESSION_NAMES:
+			raise Exception("Unknown compression in recording file: " + repr(self.__filePath))
+		return _resultlog.COMPRESSION_NAMES[header[-1]]
+	#
+
+	def __load(self):
+		import json
+
+		with open(self.__filePath, "rb") as f:
+			_, decompress = _resultlog.createCodec(self.__readHeader(f))
+			data = f.read()
+
+		view = memoryview(data)
+		pos = 0
+		while pos + _resultlog.LENGTH.size <= len(data):
+			n = _resultlog.LENGTH.unpack_from(view, pos)[0]
+			pos += _resultlog.LENGTH.size
+			if pos + n > len(data):
+				# incomplete last record
+				break
+			payload = view[pos:pos+n]
+			pos += n
+			if decompress is not None:
+				payload = memoryview(decompress(payload))
+			nKey = _resultlog.LENGTH.unpack_from(payload)[0]
+			key = CommandRecording.__keyFromJSON(json.loads(bytes(payload[_resultlog.LENGTH.size:_resultlog.LENGTH.size+nKey])))
+			entry = self.__records.get(key)
+			if entry is None:
+				entry = self.__records[key] = [ 1 ]
+			# results are decoded while replaying: this way a replay has the same cost for the caller as decoding a single result
+			entry.append(payload[_resultlog.LENGTH.size+nKey:])
+	#
+
+	@staticmethod
+	def __keyFromJSON(jKey:dict) -> tuple:
+		return (tuple(jKey["argv"]), jKey["cwd"], jKey["stdIn"], jKey["host"])
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Create the key identifying a command.
+	#
+	# @param		str[] argv						(required) The command and its arguments (a single string for commands interpreted by a shell).
+	# @param		str workingDirectory			(optional) The working directory.
+	# @param		bytes dataToPipeAsStdIn			(optional) The data piped to STDIN.
+	# @param		str host						(optional) The host for remote commands.
+	#
+	@staticmethod
+	def _createKey(argv:typing.List[str], workingDirectory:str = None, dataToPipeAsStdIn:bytes = None, host:str = None) -> tuple:
+		stdInHash = None
+		if dataToPipeAsStdIn:
+			import hashlib
+			stdInHash = hashlib.sha256(dataToPipeAsStdIn).hexdigest()
+		return (tuple(argv), workingDirectory or None, stdInHash, host)
+	#
+
+	#
+	# Serve the recorded result of a command.
+	#
+	# @param		tuple key						(required) The key as created by <c>_createKey()</c>.
+	# @param		threading.Event cancelEvent		(optional) Interrupts the simulated duration. If the event is set the result is that of a
+	#												command killed by <c>invokeCmd2(cancelEvent=...)</c>: no output, the return code of SIGKILL
+	#												and "cancelled" as <c>limitKillReason</c>.
+	# @return		CommandResult					The recorded result or <c>None</c> if the command is to be run (and recorded if in "record" mode).
+	#
+	def _replay(self, key:tuple, cancelEvent:threading.Event = None) -> typing.Union[CommandResult,None]:
+		if self.__mode != "replay":
+			return None
+
+		with self.__lock:
+			entry = self.__records.get(key)
+			if entry is None:
+				self.__nMissing += 1
+				if self.__passThrough:
+					return None
+				raise Exception("No result recorded for command: " + repr(list(key[0])) + (" in " + repr(key[1]) if key[1] else "") + (" on " + key[3] if key[3] else ""))
+			payload = entry[entry[0]]
+			entry[0] = entry[0] + 1 if entry[0] + 1 < len(entry) else 1
+			self.__nReplayed += 1
+
+		r = _resultlog.decodeBinary(payload)
+		tStart = time.monotonic()
+		tSimulated = r.duration * self.__simulateDuration if (self.__simulateDuration and (r.duration > 0)) else 0
+		if cancelEvent is not None:
+			if cancelEvent.wait(tSimulated) if tSimulated else cancelEvent.is_set():
+				# the command would have been killed before it completed
+				return CommandResult(r.commandPath, r.commandArguments, [], [], -signal.SIGKILL, time.monotonic() - tStart, None, "cancelled")
+		elif tSimulated:
+			time.sleep(tSimulated)
+		return r
+	#
+
+	#
+	# Record the result of a command. (This does nothing in "replay" mode.)
+	#
+	# @param		tuple key				(required) The key as created by <c>_createKey()</c>.
+	# @param		CommandResult r			(required) The result.
+	#
+	def _record(self, key:tuple, r:CommandResult):
+		if self.__mode != "record":
+			return
+
+		import json
+
+		jKey = json.dumps({
+			"argv": key[0],
+			"cwd": key[1],
+			"stdIn": key[2],
+			"host": key[3],
+		}).encode("utf-8")
+		data = _resultlog.LENGTH.pack(len(jKey)) + jKey + _resultlog.encodeBinary(r)
+		if self.__compress is not None:
+			data = self.__compress(data)
+		data = _resultlog.LENGTH.pack(len(data)) + data
+
+		with self.__lock:
+			if self.__f is None:
+				return
+			# a single write per record: this way records of multiple threads never interleave and a crash loses at most the last record
+			self.__f.write(data)
+			self.__f.flush()
+			self.__nRecorded += 1
+	#
+
+	#
+	# Close the recording file. If this recording is active it is deactivated.
+	#
+	def close(self):
+		from . import _common
+
+		if _common.commandRecording is self:
+			_common.commandRecording = None
+		with self.__lock:
+			if self.__f is not None:
+				self.__f.close()
+				self.__f = None
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+#
+
+
+
@@ -1,18 +1,14 @@
 ﻿
 
 import typing
-import os
-import time
-import traceback
-import sys
-import abc
-import subprocess
-import json
-from io import StringIO, BytesIO
-import xml.etree.ElementTree as ElementTree
 
 import jk_prettyprintobj
-from jk_cmdoutputparsinghelper.TextData import TextData
+
+from .ResourceUsage import ResourceUsage
+from .OutputTimeline import OutputTimeline
+
+if typing.TYPE_CHECKING:
+	from jk_cmdoutputparsinghelper.TextData import TextData
 
 
 
@@ -31,18 +27,34 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 	def __init__(self,
 			cmd:str,
 			cmdArgs:list,
-			stdOut:typing.Union[list,tuple,str,TextData],
-			stdErr:typing.Union[list,tuple,str,TextData],
+			stdOut:typing.Union[list,tuple,str,"TextData"],
+			stdErr:typing.Union[list,tuple,str,"TextData"],
 			returnCode:int,
 			duration:float = -1,
+			resourceUsage:ResourceUsage = None,
+			limitKillReason:str = None,
+			timeline:OutputTimeline = None,
+			stdOutDecodeErrors:int = 0,
+			stdErrDecodeErrors:int = 0,
+			errorClasses:typing.List[str] = None,
+			errorMatches:typing.List[typing.Tuple[str,str]] = None,
 		):
 
+		from jk_cmdoutputparsinghelper.TextData import TextData
+
 		self.__cmd = cmd
 		self.__cmdArgs = cmdArgs
 		self.__stdOut = stdOut if isinstance(stdOut, TextData) else TextData(stdOut)
 		self.__stdErr = stdErr if isinstance(stdErr, TextData) else TextData(stdErr)
 		self.__returnCode = returnCode
 		self.__duration = duration
+		self.__resourceUsage = resourceUsage
+		self.__limitKillReason = limitKillReason
+		self.__timeline = timeline
+		self.__stdOutDecodeErrors = stdOutDecodeErrors
+		self.__stdErrDecodeErrors = stdErrDecodeErrors
+		self.__errorClasses = errorClasses
+		self.__errorMatches = errorMatches
 	#
 
 	################################################################################################################################
@@ -129,7 +141,7 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 	# @return		jk_cmdoutputparsinghelper.TextData			The TextData object that holds the text data.
 	#
 	@property
-	def stdOut(self) -> TextData:
+	def stdOut(self) -> "TextData":
 		return self.__stdOut
 	#
 
@@ -139,7 +151,7 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 	# @return		jk_cmdoutputparsinghelper.TextData			The TextData object that holds the text data.
 	#
 	@property
-	def stdErr(self) -> TextData:
+	def stdErr(self) -> "TextData":
 		return self.__stdErr
 	#
 
@@ -164,10 +176,92 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 		return self.__duration
 	#
 
+	#
+	# Information about the resources used by the command. This information is only available if resource limits have been specified
+	# for the command (see <c>invokeCmd2(resourceLimits=...)</c>).
+	#
+	# @return		ResourceUsage			The resource usage or <c>None</c>.
+	#
+	@property
+	def resourceUsage(self) -> typing.Union[ResourceUsage,None]:
+		return self.__resourceUsage
+	#
+
+	#
+	# If the command has been terminated because it exceeded a limit this property returns the name of that limit
+	# (e.g. "timeout", "cancelled", "fatalError", "cpuSeconds" or "cgroupMemoryMax"). Otherwise <c>None</c> is returned.
+	#
+	@property
+	def limitKillReason(self) -> typing.Union[str,None]:
+		if self.__limitKillReason:
+			return self.__limitKillReason
+		return self.__resourceUsage.limitKillReason if self.__resourceUsage else None
+	#
+
+	#
+	# The time of arrival of all output of the command. This is only available if the command has been run with
+	# <c>invokeCmd2(recordTimeline=True)</c>.
+	#
+	# @return		OutputTimeline			The timeline or <c>None</c>.
+	#
+	@property
+	def timeline(self) -> typing.Union[OutputTimeline,None]:
+		return self.__timeline
+	#
+
+	#
+	# The number of decoding errors in the STDOUT output. Invalid data is handled as specified by <c>TextDataProcessingPolicy.decodingErrors</c>.
+	#
+	# @return		int			The number of errors or <c>None</c> if unknown (e.g. if the output has been decoded by fabric).
+	#
+	@property
+	def stdOutDecodeErrors(self) -> typing.Union[int,None]:
+		return self.__stdOutDecodeErrors
+	#
+
+	#
+	# The number of decoding errors in the STDERR output.
+	#
+	# @return		int			The number of errors or <c>None</c> if unknown.
+	#
+	@property
+	def stdErrDecodeErrors(self) -> typing.Union[int,None]:
+		return self.__stdErrDecodeErrors
+	#
+
+	#
+	# The error classes matched in the STDERR output (in the order of their first match). This is only available if the command has been
+	# run with an <c>ErrorClassifier</c> (see <c>invokeCmd2(stdErrClassifier=...)</c>).
+	#
+	# @return		str[]			The class names (possibly an empty list) or <c>None</c> if the output has not been classified.
+	#
+	@property
+	def errorClasses(self) -> typing.Union[typing.List[str],None]:
+		return self.__errorClasses
+	#
+
+	#
+	# The lines of the STDERR output that matched an error class (up to <c>ErrorClassifier.maxMatches</c>).
+	#
+	# @return		tuple[]			A list of tuples <c>(className, line)</c> or <c>None</c> if the output has not been classified.
+	#
+	@property
+	def errorMatches(self) -> typing.Union[typing.List[typing.Tuple[str,str]],None]:
+		return self.__errorMatches
+	#
+
 	################################################################################################################################
 	## Helper Methods
 	################################################################################################################################
 
+	#
+	# Returns <c>True</c> if the STDOUT output has been spilled to disk (see <c>invokeCmd2(spillThreshold=...)</c>).
+	#
+	def __isStdOutMapped(self) -> bool:
+		from ._MappedTextData import _MappedTextData
+		return isinstance(self.__stdOut, _MappedTextData)
+	#
+
 	def _dumpVarNames(self) -> list:
 		return [
 			"commandPath",
@@ -178,6 +272,11 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 			"isError",
 			"isErrorRC",
 			"duration",
+			"resourceUsage",
+			"limitKillReason",
+			"stdOutDecodeErrors",
+			"stdErrDecodeErrors",
+			"errorClasses",
 		]
 	#
 
@@ -208,15 +307,23 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 	#
 	#
 	# Interpret the text data as JSON data and return it.
+	# If the output has been spilled to disk it is decoded directly from the mapped data (without trimming lines).
 	#
 	def getStdOutAsJSON(self):
+		import json
+		if self.__isStdOutMapped():
+			return json.loads(str(self.__stdOut.buffer, "utf-8", self.__stdOut.decodingErrors))
 		return json.loads(self.__stdOut.text)
 	#
 
 	#
 	# Interpret the text data as XML and return an ElemenTree object.
+	# If the output has been spilled to disk it is parsed incrementally from the mapped data (without trimming lines).
 	#
 	def getStdOutAsXML(self):
+		import xml.etree.ElementTree as ElementTree
+		if self.__isStdOutMapped():
+			return ElementTree.parse(self.__stdOut.openReader()).getroot()
 		xRoot = ElementTree.fromstring(self.__stdOut.text)
 		return xRoot
 	#
@@ -232,6 +339,9 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 			parser = lxmletree.XMLParser(remove_blank_text=True)
 		except Exception as e:
 			raise Exception("lxml module is required for getStdOutAsLXML() to work!")
+		if self.__isStdOutMapped():
+			return lxmletree.parse(self.__stdOut.openReader(), parser)
+		from io import BytesIO
 		xRoot = lxmletree.parse(BytesIO(self.__stdOut.text.encode("utf-8")), parser)
 		return xRoot
 	#
@@ -277,16 +387,23 @@ class CommandResult(jk_prettyprintobj.DumpMixin):
 	# Convert the whole object to a JSON dictionary.
 	#
 	# @return		dict			Returns a dictionary with data registered at the following keys:
-	#								"cmd", "cmdArgs", "stdOut", "stdErr", "retCode"
+	#								"cmd", "cmdArgs", "stdOut", "stdErr", "retCode", "duration", "resourceUsage", "limitKillReason",
+	#								"stdOutDecodeErrors", "stdErrDecodeErrors", "errorClasses", "errorMatches"
 	#
 	def toJSON(self):
 		return {
 			"cmd": self.__cmd,
 			"cmdArgs" : self.__cmdArgs,
-			"stdOut" : self.__stdOut.lines,
-			"stdErr" : self.__stdErr.lines,
+			"stdOut" : list(self.__stdOut.lines),
+			"stdErr" : list(self.__stdErr.lines),
 			"retCode" : self.__returnCode,
 			"duration": self.__duration,
+			"resourceUsage": self.__resourceUsage.toJSON() if self.__resourceUsage else None,
+			"limitKillReason": self.limitKillReason,
+			"stdOutDecodeErrors": self.__stdOutDecodeErrors,
+			"stdErrDecodeErrors": self.__stdErrDecodeErrors,
+			"errorClasses": self.__errorClasses,
+			"errorMatches": None if self.__errorMatches is None else [ list(x) for x in self.__errorMatches ],
 		}
 	#
 
@@ -0,0 +1,164 @@
+
+
+import typing
+
+from .CommandResult import CommandResult
+from . import _resultlog as _resultlog
+
+
+
+
+#
+# Reads log files written by <c>CommandResultLogWriter</c>. The format and compression are detected automatically.
+#
+# Iterating over the reader streams all records from the beginning of the file. Additionally records can be accessed by index
+# (e.g. <c>reader[12345]</c>, <c>reader[-1]</c>): only the requested record is read then. For this the offsets of the records are
+# required, which are taken from the index file if it is up to date or are determined by reading through the file once.
+#
+class CommandResultLogReader(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str filePath				(required) The path of the log file.
+	# @param		bool bUseIndex				(optional) If <c>True</c> (default) the index file is used if it exists and is up to date.
+	#
+	def __init__(self, filePath:str, bUseIndex:bool = True):
+		assert isinstance(filePath, str)
+
+		self.__filePath = filePath
+		self.__indexFilePath = filePath + _resultlog.INDEX_FILE_EXTENSION if bUseIndex else None
+		self.__f = open(filePath, "rb")
+
+		header = self.__f.read(len(_resultlog.MAGIC) + 1)
+		if header[:len(_resultlog.MAGIC)] == _resultlog.MAGIC:
+			self.__format = "binary"
+			if header[-1] not in _resultlog.COMPRESSION_NAMES:
+				raise Exception("Unknown compression in log file: " + repr(filePath))
+			self.__compression = _resultlog.COMPRESSION_NAMES[header[-1]]
+			_, self.__decompress = _resultlog.createCodec(self.__compression)
+		else:
+			self.__format = "jsonl"
+			self.__compression = None
+			self.__decompress = None
+
+		self.__offsets = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def filePath(self) -> str:
+		return self.__filePath
+	#
+
+	#
+	# The format of the log file: "binary" or "jsonl".
+	#
+	@property
+	def format(self) -> str:
+		return self.__format
+	#
+
+	@property
+	def compression(self) -> typing.Union[str,None]:
+		return self.__compression
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __getOffsets(self):
+		if self.__offsets is None:
+			self.__offsets, _ = _resultlog.loadOffsets(self.__f, self.__indexFilePath, self.__format == "binary")
+		return self.__offsets
+	#
+
+	def __decodePayload(self, data:bytes) -> CommandResult:
+		if self.__decompress is not None:
+			data = self.__decompress(data)
+		return _resultlog.decodeBinary(data)
+	#
+
+	#
+	# Read the record at the current position of the specified file.
+	#
+	# @return		CommandResult			The result or <c>None</c> if the end of the file (or an incomplete record) has been reached.
+	#
+	def __readRecord(self, f) -> typing.Union[CommandResult,None]:
+		if self.__format == "binary":
+			header = f.read(_resultlog.LENGTH.size)
+			if len(header) < _resultlog.LENGTH.size:
+				return None
+			n = _resultlog.LENGTH.unpack(header)[0]
+			data = f.read(n)
+			if len(data) < n:
+				return None
+			return self.__decodePayload(data)
+		else:
+			line = f.readline()
+			if not line.endswith(b"\n"):
+				return None
+			return _resultlog.decodeJSONL(line)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def __iter__(self) -> typing.Iterator[CommandResult]:
+		with open(self.__filePath, "rb") as f:
+			if self.__format == "binary":
+				f.seek(len(_resultlog.MAGIC) + 1)
+			while True:
+				r = self.__readRecord(f)
+				if r is None:
+					return
+				yield r
+	#
+
+	#
+	# The number of records. (This requires the offsets of the records.)
+	#
+	def __len__(self) -> int:
+		return len(self.__getOffsets())
+	#
+
+	def __getitem__(self, index:int) -> CommandResult:
+		offsets = self.__getOffsets()
+		self.__f.seek(offsets[index])
+		return self.__readRecord(self.__f)
+	#
+
+	#
+	# Forget the offsets determined so far. Invoke this to access records that have been appended after the offsets have been determined.
+	#
+	def refresh(self):
+		self.__offsets = None
+	#
+
+	def close(self):
+		if self.__f is not None:
+			self.__f.close()
+			self.__f = None
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+#
+
+
+
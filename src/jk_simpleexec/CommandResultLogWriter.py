@@ -0,0 +1,203 @@
+
+
+import os
+import array
+import typing
+
+from .CommandResult import CommandResult
+from . import _resultlog as _resultlog
+
+
+
+
+#
+# Writes <c>CommandResult</c> objects to an append-only log file. Use <c>CommandResultLogReader</c> to read such files.
+#
+# Two formats are supported:
+#
+# * "binary" - length prefixed records with an optional per record compression ("gzip" or "zstd"). This is the most compact format.
+# * "jsonl" - JSON Lines: one JSON object per result. STDOUT and STDERR are stored as a single (escaped) string each.
+#
+# If the file already exists new records are appended. An incomplete last record (e.g. if a previous writer has been killed) is removed.
+#
+# NOTE: zstd compression requires the python module "<c>zstandard</c>" to be installed (see the "zstd" extra of this package).
+#
+# NOTE: Only the data provided by <c>CommandResult.toJSON()</c> is written. A timeline is not stored.
+#
+class CommandResultLogWriter(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str filePath				(required) The path of the log file.
+	# @param		str format					(optional) "binary" (default) or "jsonl".
+	# @param		str compression				(optional) <c>None</c> (default), "gzip" or "zstd". Only supported by the binary format.
+	# @param		int compressionLevel		(optional) The compression level to use.
+	# @param		bool bWriteIndex			(optional) If <c>True</c> (default) an index file (<c>filePath</c> + ".idx") is maintained that
+	#											allows readers to access records without reading through the whole file.
+	#
+	def __init__(self,
+			filePath:str,
+			format:str = "binary",
+			compression:str = None,
+			compressionLevel:int = None,
+			bWriteIndex:bool = True,
+		):
+
+		assert isinstance(filePath, str)
+		if format not in ("binary", "jsonl"):
+			raise Exception("Unknown format: " + repr(format))
+		if compression not in _resultlog.COMPRESSION_IDS:
+			raise Exception("Unknown compression: " + repr(compression))
+		if (format == "jsonl") and compression:
+			raise Exception("Compression is only supported by the binary format!")
+
+		self.__filePath = filePath
+		self.__format = format
+		self.__compression = compression
+		self.__compress, _ = _resultlog.createCodec(compression, compressionLevel)
+		self.__encode = _resultlog.encodeBinary if format == "binary" else _resultlog.encodeJSONL
+		self.__indexFilePath = filePath + _resultlog.INDEX_FILE_EXTENSION if bWriteIndex else None
+
+		offsets = self.__prepareFile()
+
+		self.__f = open(filePath, "ab")
+		self.__pos = self.__f.seek(0, os.SEEK_END)
+		self.__recordCount = len(offsets)
+
+		if bWriteIndex:
+			with open(self.__indexFilePath, "wb") as fout:
+				fout.write(_resultlog.toIndexBytes(offsets))
+			self.__fIndex = open(self.__indexFilePath, "ab")
+		else:
+			self.__fIndex = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def filePath(self) -> str:
+		return self.__filePath
+	#
+
+	@property
+	def format(self) -> str:
+		return self.__format
+	#
+
+	@property
+	def compression(self) -> typing.Union[str,None]:
+		return self.__compression
+	#
+
+	#
+	# The number of records in the log file (including the records that existed before).
+	#
+	@property
+	def recordCount(self) -> int:
+		return self.__recordCount
+	#
+
+	@property
+	def isClosed(self) -> bool:
+		return self.__f is None
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Create the file or check an existing one. An incomplete last record is removed.
+	#
+	# @return		array.array			The offsets of the existing records.
+	#
+	def __prepareFile(self) -> array.array:
+		bBinary = self.__format == "binary"
+
+		if not os.path.isfile(self.__filePath) or (os.path.getsize(self.__filePath) == 0):
+			with open(self.__filePath, "wb") as fout:
+				if bBinary:
+					fout.write(_resultlog.MAGIC + bytes([ _resultlog.COMPRESSION_IDS[self.__compression] ]))
+			return array.array("Q")
+
+		with open(self.__filePath, "r+b") as f:
+			header = f.read(len(_resultlog.MAGIC) + 1)
+			if header[:len(_resultlog.MAGIC)] == _resultlog.MAGIC:
+				if not bBinary:
+					raise Exception("Existing file is not a JSON Lines file: " + repr(self.__filePath))
+				if _resultlog.COMPRESSION_NAMES.get(header[-1], "?") != self.__compression:
+					raise Exception("Existing file uses compression " + repr(_resultlog.COMPRESSION_NAMES.get(header[-1], "?")) + ": " + repr(self.__filePath))
+			elif bBinary:
+				raise Exception("Existing file is not a binary log file: " + repr(self.__filePath))
+
+			offsets, validEnd = _resultlog.loadOffsets(f, self.__indexFilePath, bBinary)
+			f.truncate(validEnd)
+
+		return offsets
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Append a single result to the log file.
+	#
+	def write(self, r:CommandResult):
+		assert isinstance(r, CommandResult)
+
+		data = self.__encode(r)
+		if self.__format == "binary":
+			if self.__compress is not None:
+				data = self.__compress(data)
+			data = _resultlog.LENGTH.pack(len(data)) + data
+
+		self.__f.write(data)
+		if self.__fIndex is not None:
+			self.__fIndex.write(_resultlog.LENGTH.pack(self.__pos))
+		self.__pos += len(data)
+		self.__recordCount += 1
+	#
+
+	#
+	# Append multiple results to the log file.
+	#
+	def writeAll(self, results:typing.Iterable[CommandResult]):
+		for r in results:
+			self.write(r)
+	#
+
+	def flush(self):
+		self.__f.flush()
+		if self.__fIndex is not None:
+			self.__fIndex.flush()
+	#
+
+	def close(self):
+		if self.__f is not None:
+			self.__f.close()
+			self.__f = None
+			if self.__fIndex is not None:
+				self.__fIndex.close()
+				self.__fIndex = None
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+#
+
+
+
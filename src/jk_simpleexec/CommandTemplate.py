@@ -0,0 +1,501 @@
+
+
+import re
+import shlex
+import typing
+
+import jk_prettyprintobj
+
+from . import _common as _common
+
+
+
+
+_PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)([?*]?)\}")
+_ENV_ASSIGNMENT_PATTERN = re.compile(r"\s*[A-Za-z_][A-Za-z0-9_]*=")
+
+#
+# Characters that have a special meaning for a shell if they are not quoted. If a template contains one of them it can't be run without a shell.
+#
+_SHELL_CHARS = {
+	"|": "pipe",
+	"&": "control operator",
+	";": "command separator",
+	"\n": "command separator",
+	"<": "redirection",
+	">": "redirection",
+	"(": "subshell",
+	")": "subshell",
+	"$": "expansion",
+	"`": "command substitution",
+	"*": "glob",
+	"?": "glob",
+}
+
+_MISSING = object()
+
+
+
+#
+# A placeholder within a word of a template.
+#
+class _Placeholder(object):
+
+	__slots__ = ( "name", "kind", "bInDoubleQuotes" )
+
+	def __init__(self, name:str, kind:str, bInDoubleQuotes:bool):
+		self.name = name
+		self.kind = kind
+		self.bInDoubleQuotes = bInDoubleQuotes
+	#
+
+	#
+	# Quote a value for the shell.
+	#
+	def quote(self, value:str) -> str:
+		if self.bInDoubleQuotes:
+			return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("$", "\\$").replace("`", "\\`")
+		return shlex.quote(value)
+	#
+
+#
+
+
+
+#
+# A word of a template: a sequence of literal text and placeholders.
+#
+class _Word(object):
+
+	__slots__ = ( "separator", "parts", "raws", "groupIndex", "constant" )
+
+	def __init__(self, separator:str, groupIndex:typing.Union[int,None]):
+		# the white space preceding this word in the template
+		self.separator = separator
+		# literal text (str) and placeholders (_Placeholder)
+		self.parts = []
+		# the literal text as it is written in the template (or None for placeholders)
+		self.raws = []
+		self.groupIndex = groupIndex
+		# the value if the word does not contain placeholders
+		self.constant = None
+	#
+
+	def addText(self, value:str, raw:str):
+		if self.parts and (self.raws[-1] is not None):
+			self.parts[-1] += value
+			self.raws[-1] += raw
+		else:
+			self.parts.append(value)
+			self.raws.append(raw)
+	#
+
+	def addPlaceholder(self, placeholder:_Placeholder):
+		self.parts.append(placeholder)
+		self.raws.append(None)
+	#
+
+	#
+	# Render this word.
+	#
+	# @param		dict values					(required) The values of the placeholders.
+	# @param		bool bShell					(required) If <c>True</c> the word is rendered for a shell: literal text is taken as it is written
+	#											in the template and values are quoted.
+	# @return		str[]						The words (or <c>None</c> if the word or its group is to be omitted).
+	#
+	def render(self, values:dict, bShell:bool) -> typing.Union[typing.List[str],None]:
+		items = None
+		texts = []
+		for part, raw in zip(self.parts, self.raws):
+			if raw is not None:
+				texts.append(raw if bShell else part)
+				continue
+
+			value = values.get(part.name, _MISSING)
+			if part.kind == "*":
+				if (value is _MISSING) or (value is None):
+					value = ()
+				elif isinstance(value, (str, bytes)) or not isinstance(value, typing.Iterable):
+					raise Exception("A list is required for placeholder: " + repr(part.name))
+				items = [ part.quote(str(x)) if bShell else str(x) for x in value ]
+				if not items:
+					return None
+				texts.append(None)
+				continue
+
+			if (value is _MISSING) or (value is None) or (value is False):
+				if (part.kind == "?") or (self.groupIndex is not None):
+					return None
+				raise Exception("Missing value for placeholder: " + repr(part.name))
+			if value is True:
+				value = ""
+			else:
+				value = str(value)
+			texts.append(part.quote(value) if bShell else value)
+
+		if items is None:
+			return [ "".join(texts) ]
+		i = texts.index(None)
+		prefix = "".join(texts[:i])
+		suffix = "".join(texts[i+1:])
+		return [ prefix + x + suffix for x in items ]
+	#
+
+#
+
+
+
+#
+# Parse a template.
+#
+# @return		_Word[]						The words.
+# @return		str[]						The shell syntax found in the template.
+#
+def _parse(template:str) -> typing.Tuple[typing.List[_Word],typing.List[str]]:
+	words = []
+	shellSyntax = []
+	word = None
+	separator = ""
+	groupIndex = None
+	nGroups = 0
+
+	def onShellSyntax(description:str):
+		if description not in shellSyntax:
+			shellSyntax.append(description)
+	#
+
+	if _ENV_ASSIGNMENT_PATTERN.match(template):
+		onShellSyntax("variable assignment")
+
+	i = 0
+	n = len(template)
+	while i < n:
+		ch = template[i]
+
+		# white space: end of a word
+
+		if ch in " \t\n":
+			if ch == "\n":
+				onShellSyntax(_SHELL_CHARS[ch])
+			if word is not None:
+				words.append(word)
+				word = None
+				separator = ""
+			separator += ch
+			i += 1
+			continue
+
+		if (ch == "\\") and template.startswith("\n", i + 1):
+			# line continuation
+			separator += template[i:i+2]
+			i += 2
+			continue
+
+		# optional groups
+
+		# ("[" followed by white space is the command "[" of the shell)
+		if (ch == "[") and (word is None) and (groupIndex is None) and (template[i+1:i+2] not in ( "", " ", "\t", "\n" )):
+			groupIndex = nGroups
+			nGroups += 1
+			i += 1
+			continue
+		if (ch == "]") and (groupIndex is not None) and ((i + 1 == n) or (template[i+1] in " \t\n")):
+			if word is not None:
+				words.append(word)
+				word = None
+				separator = ""
+			groupIndex = None
+			i += 1
+			continue
+
+		if word is None:
+			word = _Word(separator, groupIndex)
+			separator = ""
+			if ch in "#~":
+				onShellSyntax("comment" if ch == "#" else "tilde expansion")
+
+		# quoting
+
+		if ch == "\\":
+			word.addText(template[i+1:i+2], template[i:i+2])
+			i += 2
+			continue
+
+		if ch == "'":
+			j = template.find("'", i + 1)
+			if j < 0:
+				raise Exception("Unterminated quote in template: " + repr(template))
+			word.addText(template[i+1:j], template[i:j+1])
+			i = j + 1
+			continue
+
+		if ch == "\"":
+			word.addText("", "\"")
+			i += 1
+			while True:
+				if i >= n:
+					raise Exception("Unterminated quote in template: " + repr(template))
+				ch = template[i]
+				if ch == "\"":
+					word.addText("", "\"")
+					i += 1
+					break
+				if (ch == "\\") and (template[i+1:i+2] in ( "\"", "\\", "$", "`", "\n" )):
+					word.addText(template[i+1], template[i:i+2])
+					i += 2
+					continue
+				if ch == "{":
+					m = _PLACEHOLDER_PATTERN.match(template, i)
+					if m:
+						word.addPlaceholder(_Placeholder(m.group(1), m.group(2), True))
+						i = m.end()
+						continue
+				elif ch in "$`":
+					onShellSyntax(_SHELL_CHARS[ch])
+				word.addText(ch, ch)
+				i += 1
+			continue
+
+		# placeholders
+
+		if ch == "{":
+			m = _PLACEHOLDER_PATTERN.match(template, i)
+			if m:
+				word.addPlaceholder(_Placeholder(m.group(1), m.group(2), False))
+				i = m.end()
+				continue
+			j = template.find("}", i)
+			if (j > 0) and (("," in template[i:j]) or (".." in template[i:j])):
+				onShellSyntax("brace expansion")
+			word.addText(ch, ch)
+			i += 1
+			continue
+
+		# everything else
+
+		if ch in _SHELL_CHARS:
+			onShellSyntax(_SHELL_CHARS[ch])
+		word.addText(ch, ch)
+		i += 1
+
+	if word is not None:
+		words.append(word)
+	if groupIndex is not None:
+		raise Exception("Unterminated optional group in template: " + repr(template))
+	if not words:
+		raise Exception("Empty template!")
+
+	for word in words:
+		nLists = sum(1 for x in word.parts if isinstance(x, _Placeholder) and (x.kind == "*"))
+		if nLists > 1:
+			raise Exception("Only a single list placeholder is allowed per word: " + repr(template))
+		if len(word.parts) == 1 and not isinstance(word.parts[0], _Placeholder):
+			word.constant = word.parts[0]
+
+	return words, shellSyntax
+#
+
+
+
+
+#
+# A command template that is parsed once and can then be rendered to an argument vector again and again quickly. This way commands can be
+# built from values without a shell: no additional <c>/bin/sh</c> process is required and values can't be misinterpreted as shell syntax.
+#
+# Templates are written like shell commands: words are separated by white space, quotes and backslashes work as usual. Additionally:
+#
+# * <c>{name}</c> - is replaced by the value of <c>name</c>. This can be part of a word (e.g. <c>--output={path}</c>).
+# * <c>{name?}</c> - an optional value: if it is <c>None</c>, <c>False</c> or not specified the whole word is omitted. If it is <c>True</c> it is
+#   replaced by an empty string, so flags can be controlled by booleans (e.g. <c>--verbose{verbose?}</c>).
+# * <c>{name*}</c> - a list: the word is repeated for every item (e.g. <c>-I{includeDirs*}</c>). An empty list omits the word.
+# * <c>[ ... ]</c> - an optional group of words: the group is omitted if any placeholder within has no value (e.g. <c>[--level {level}]</c>).
+#
+# If a template contains real shell syntax (pipes, redirections, variables, globs, ...) it is run by <c>/bin/sh</c>. In that case the values
+# are quoted before they are inserted. Whether this is the case is reported by <c>requiresShell</c> and <c>shellSyntax</c> (and logged).
+#
+# Example:
+#
+#	t = jk_simpleexec.CommandTemplate("rsync -a [--bwlimit={bwLimit}] --exclude={excludes*} {src} {dest}")
+#	for src, dest in pairs:
+#		r = t.invoke({ "src": src, "dest": dest, "excludes": [ "*.tmp" ] })
+#
+class CommandTemplate(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str template				(required) The template.
+	# @param		* log						(optional) A logger (or a callable) that is notified if the template requires a shell.
+	#
+	def __init__(self, template:str, log = None):
+		assert isinstance(template, str)
+
+		self.__template = template
+		self.__words, self.__shellSyntax = _parse(template)
+
+		if self.__shellSyntax:
+			message = "Command template requires a shell (" + ", ".join(self.__shellSyntax) + "): " + repr(template)
+			if log:
+				printFunc = getattr(log, "notice", None)
+				if printFunc is None:
+					printFunc = getattr(log, "info", None)
+					if printFunc is None:
+						assert callable(log)
+						printFunc = log
+				printFunc(message)
+			if _common.debugValve:
+				_common.debugValve(message)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def template(self) -> str:
+		return self.__template
+	#
+
+	#
+	# <c>True</c> if the template contains shell syntax and is therefore run by <c>/bin/sh</c>.
+	#
+	@property
+	def requiresShell(self) -> bool:
+		return bool(self.__shellSyntax)
+	#
+
+	#
+	# The kinds of shell syntax found in the template (e.g. "pipe" or "redirection").
+	#
+	@property
+	def shellSyntax(self) -> typing.List[str]:
+		return list(self.__shellSyntax)
+	#
+
+	#
+	# The names of all placeholders.
+	#
+	@property
+	def placeholderNames(self) -> typing.List[str]:
+		ret = []
+		for word in self.__words:
+			for part in word.parts:
+				if isinstance(part, _Placeholder) and (part.name not in ret):
+					ret.append(part.name)
+		return ret
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"template",
+			"requiresShell",
+			"shellSyntax",
+			"placeholderNames",
+		]
+	#
+
+	#
+	# Render all words.
+	#
+	# @return		str[]		The words. If <c>bShell</c> is <c>True</c> the first word of every item is preceded by its separator.
+	#
+	def __renderWords(self, values:dict, bShell:bool) -> typing.List[str]:
+		ret = []
+		groupIndex = None
+		groupStart = 0
+		bSkipGroup = False
+		for word in self.__words:
+			if word.groupIndex != groupIndex:
+				groupIndex = word.groupIndex
+				groupStart = len(ret)
+				bSkipGroup = False
+			elif bSkipGroup:
+				continue
+
+			if (word.constant is not None) and not bShell:
+				ret.append(word.constant)
+				continue
+
+			items = word.render(values, bShell)
+			if items is None:
+				if groupIndex is not None:
+					del ret[groupStart:]
+					bSkipGroup = True
+				continue
+			if bShell:
+				items[0] = word.separator + items[0]
+				for i in range(1, len(items)):
+					items[i] = " " + items[i]
+			ret.extend(items)
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Render the template to an argument vector.
+	#
+	# @param		dict values					(optional) The values of the placeholders. (Alternatively they can be specified as named arguments.)
+	# @return		str[]						The argument vector including the program in the first place. If the template requires a shell this is
+	#											<c>[ "/bin/sh", "-c", script ]</c>.
+	#
+	def render(self, values:dict = None, **kwargs) -> typing.List[str]:
+		if kwargs:
+			values = dict(values, **kwargs) if values else kwargs
+		elif values is None:
+			values = {}
+
+		if self.__shellSyntax:
+			return [ "/bin/sh", "-c", "".join(self.__renderWords(values, True)).strip() ]
+
+		ret = self.__renderWords(values, False)
+		if not ret:
+			raise Exception("The command is empty: " + repr(self.__template))
+		return ret
+	#
+
+	#
+	# Render the template to a command line to be interpreted by a shell (e.g. for <c>runCmd()</c> with a remote connection). All values are quoted.
+	#
+	# @param		dict values					(optional) The values of the placeholders. (Alternatively they can be specified as named arguments.)
+	# @return		str							The command line.
+	#
+	def renderCommandLine(self, values:dict = None, **kwargs) -> str:
+		if kwargs:
+			values = dict(values, **kwargs) if values else kwargs
+		elif values is None:
+			values = {}
+
+		if self.__shellSyntax:
+			return "".join(self.__renderWords(values, True)).strip()
+		return " ".join([ shlex.quote(x) for x in self.__renderWords(values, False) ])
+	#
+
+	#
+	# Render the template and run the command via <c>invokeCmd2()</c>.
+	#
+	# @param		dict values					(optional) The values of the placeholders.
+	# @param		dict invokeArgs				(optional) Additional arguments for <c>invokeCmd2()</c> (e.g. <c>timeout</c> or <c>stdOutProcessing</c>).
+	# @return		CommandResult				The result.
+	#
+	def invoke(self, values:dict = None, **invokeArgs):
+		from .simpleexec import invokeCmd2
+
+		argv = self.render(values)
+		return invokeCmd2(cmdPath=argv[0], cmdArgs=argv[1:], **invokeArgs)
+	#
+
+#
+
+
+
@@ -0,0 +1,151 @@
+
+
+import os
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# An immutable, precomputed environment for child processes.
+#
+# Building the environment for a child process requires copying and merging the environment of the current process for every
+# invocation. If many commands are run with the same environment create an instance of this class once and pass it to
+# <c>invokeCmd2(env=...)</c> again and again: The mapping is built only once here and then passed on to the child process as it is.
+#
+# Example:
+#
+#	envC = jk_simpleexec.EnvSnapshot(envOverrides={ "LC_ALL": "C" })
+#	for path in paths:
+#		r = jk_simpleexec.invokeCmd2(cmdPath="/usr/bin/stat", cmdArgs=[ path ], env=envC)
+#
+class EnvSnapshot(jk_prettyprintobj.DumpMixin):
+
+	__slots__ = (
+		"__env",
+	)
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		dict env				(optional) The environment to start with. If <c>None</c> is specified the environment of the current process
+	#										(or an empty environment if <c>clearEnv</c> is <c>True</c>) is used.
+	# @param		dict envOverrides		(optional) Variables to set (or to remove if <c>None</c> is specified as value).
+	# @param		bool clearEnv			(optional) If <c>True</c> the environment of the current process is not inherited.
+	#
+	def __init__(self,
+			env:typing.Union[typing.Mapping[str,str],"EnvSnapshot"] = None,
+			envOverrides:typing.Mapping[str,typing.Union[str,None]] = None,
+			clearEnv:bool = False,
+		):
+
+		self.__env = EnvSnapshot.__build(env, envOverrides, clearEnv)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The environment mapping. Do not modify this dictionary.
+	#
+	@property
+	def env(self) -> typing.Dict[str,str]:
+		return self.__env
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"env",
+		]
+	#
+
+	@staticmethod
+	def __build(env, envOverrides, clearEnv:bool) -> typing.Dict[str,str]:
+		if env is None:
+			ret = {} if clearEnv else dict(os.environ)
+		elif isinstance(env, EnvSnapshot):
+			ret = dict(env.env)
+		else:
+			ret = dict(env)
+
+		if envOverrides:
+			for k, v in envOverrides.items():
+				if v is None:
+					ret.pop(k, None)
+				else:
+					ret[k] = v
+
+		for k, v in ret.items():
+			assert isinstance(k, str)
+			assert isinstance(v, str)
+
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Create a new snapshot based on this one.
+	#
+	# @param		dict envOverrides		(required) Variables to set (or to remove if <c>None</c> is specified as value).
+	# @return		EnvSnapshot				The new snapshot.
+	#
+	def derive(self, envOverrides:typing.Mapping[str,typing.Union[str,None]]) -> "EnvSnapshot":
+		return EnvSnapshot(self, envOverrides)
+	#
+
+	def __len__(self):
+		return len(self.__env)
+	#
+
+	def __getitem__(self, key:str) -> str:
+		return self.__env[key]
+	#
+
+	def __contains__(self, key:str) -> bool:
+		return key in self.__env
+	#
+
+	#
+	# Get the environment mapping to pass to <c>subprocess.Popen(env=...)</c>. This method is used by <c>invokeCmd2()</c>.
+	#
+	# @param		dict|EnvSnapshot env	(optional) The environment to use. If an <c>EnvSnapshot</c> is specified and no other arguments are specified
+	#										its mapping is returned as it is.
+	# @param		dict envOverrides		(optional) Variables to set (or to remove if <c>None</c> is specified as value).
+	# @param		bool clearEnv			(optional) If <c>True</c> the environment of the current process is not inherited.
+	# @return		dict					The environment mapping or <c>None</c> if the child process should simply inherit the current environment.
+	#
+	@staticmethod
+	def resolve(
+			env:typing.Union[typing.Mapping[str,str],"EnvSnapshot"] = None,
+			envOverrides:typing.Mapping[str,typing.Union[str,None]] = None,
+			clearEnv:bool = False,
+		) -> typing.Union[typing.Dict[str,str],None]:
+
+		if not envOverrides:
+			if isinstance(env, EnvSnapshot):
+				return env.env
+			if (env is None) and not clearEnv:
+				return None
+
+		return EnvSnapshot.__build(env, envOverrides, clearEnv)
+	#
+
+#
+
+
+
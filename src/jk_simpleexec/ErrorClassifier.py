@@ -0,0 +1,268 @@
+
+
+import re
+import codecs
+import typing
+
+
+
+
+_GROUP_NAME_PREFIX = "_jkc"
+_INLINE_FLAGS = "aiLmsux"
+
+
+
+#
+# Find constructs in a regular expression that would refer to or affect other patterns once all patterns are combined into a single expression:
+# numeric group references (these would refer to the wrong groups) and global inline flags (these are not allowed within an expression).
+#
+# @return		str				A description of the first construct found or <c>None</c>.
+#
+def _findNonLocalConstruct(pattern:str) -> typing.Union[str,None]:
+	n = len(pattern)
+	bInClass = False
+	i = 0
+	while i < n:
+		c = pattern[i]
+		if c == "\\":
+			if not bInClass and (i + 1 < n) and (pattern[i + 1] in "123456789"):
+				# three octal digits denote a character
+				if not ((i + 3 < n) and all(x in "01234567" for x in pattern[i + 1:i + 4])):
+					j = i + 3 if pattern[i + 2:i + 3].isdigit() else i + 2
+					return "numeric group reference " + pattern[i:j]
+			i += 2
+			continue
+		if bInClass:
+			if c == "]":
+				bInClass = False
+		elif c == "[":
+			bInClass = True
+			# a "]" at the beginning of a class is a literal
+			if pattern.startswith("^", i + 1):
+				i += 1
+			if pattern.startswith("]", i + 1):
+				i += 1
+		elif pattern.startswith("(?(", i) and (i + 3 < n) and pattern[i + 3].isdigit():
+			return "numeric group reference in a conditional expression"
+		elif pattern.startswith("(?", i):
+			j = i + 2
+			while (j < n) and (pattern[j] in _INLINE_FLAGS):
+				j += 1
+			if (j > i + 2) and (j < n) and (pattern[j] == ")"):
+				return "global inline flags " + pattern[i:j + 1]
+		i += 1
+	return None
+#
+
+
+
+#
+# The state of a single classification: data is fed in chunks as it arrives.
+#
+class _ErrorMatcher(object):
+
+	# the maximum length of an incomplete line kept for matching: longer data is matched without waiting for the end of the line
+	MAX_PENDING_LINE_LENGTH = 65536
+
+	def __init__(self, regex:typing.Pattern, groupClassNames:typing.Dict[str,str], fatalClasses:typing.FrozenSet[str], maxMatches:int):
+		self.__regex = regex
+		self.__groupClassNames = groupClassNames
+		self.__fatalClasses = fatalClasses
+		self.__maxMatches = maxMatches
+		self.__decoder = codecs.getincrementaldecoder("utf-8")("replace")
+		self.__pending = ""
+		self.__classSet = set()
+
+		self.classes = []				# the classes matched (in the order of their first match)
+		self.matches = []				# (className, line) for the first matches
+		self.fatalMatch = None			# (className, line) of the first match of a fatal class
+	#
+
+	def __scan(self, text:str, end:int):
+		for m in self.__regex.finditer(text, 0, end):
+			className = self.__groupClassNames[m.lastgroup]
+			bFatal = (self.fatalMatch is None) and (className in self.__fatalClasses)
+			if className not in self.__classSet:
+				self.__classSet.add(className)
+				self.classes.append(className)
+			elif not bFatal and (len(self.matches) >= self.__maxMatches):
+				continue
+
+			iLineStart = text.rfind("\n", 0, m.start()) + 1
+			iLineEnd = text.find("\n", m.end(), end)
+			line = text[iLineStart:end if iLineEnd < 0 else iLineEnd]
+			if len(self.matches) < self.__maxMatches:
+				self.matches.append((className, line))
+			if bFatal:
+				self.fatalMatch = (className, line)
+	#
+
+	#
+	# Match the complete lines of the data received so far.
+	#
+	def feed(self, chunk:bytes):
+		text = self.__decoder.decode(chunk)
+		if self.__pending:
+			text = self.__pending + text
+		# progress output often ends with a carriage return only
+		i = max(text.rfind("\n"), text.rfind("\r"))
+		if i < 0:
+			if len(text) <= _ErrorMatcher.MAX_PENDING_LINE_LENGTH:
+				self.__pending = text
+				return
+			i = len(text)
+		self.__pending = text[i + 1:]
+		self.__scan(text, i)
+	#
+
+	#
+	# Match the rest of the data.
+	#
+	def close(self):
+		text = self.__pending + self.__decoder.decode(b"", True)
+		self.__pending = ""
+		if text:
+			self.__scan(text, len(text))
+	#
+
+#
+
+
+
+#
+# Classifies the error output of commands. Every class is defined by one or more regular expressions that are matched against single lines.
+# All patterns are compiled into a single regular expression once, so the output is scanned in a single pass no matter how many classes
+# are defined.
+#
+# Specify a classifier with <c>invokeCmd2(stdErrClassifier=...)</c> or <c>ExecutionEngine.submit(stdErrClassifier=...)</c>: STDERR is then
+# classified while it arrives and the classes matched are provided by <c>CommandResult.errorClasses</c> and <c>CommandResult.errorMatches</c>.
+# If a class is declared as fatal the command is killed as soon as such a match occurs (with "fatalError" as <c>limitKillReason</c>).
+#
+# Example:
+#
+#	classifier = ErrorClassifier({
+#		"permission": r"[Pp]ermission denied",
+#		"notFound": [ r"No such file or directory", r"command not found" ],
+#		"disk": r"No space left on device",
+#	}, fatalClasses=[ "disk" ])
+#
+# NOTE: Where patterns of several classes match at the same position only the class specified first is reported. Matches do not overlap.
+#
+# As all patterns are combined the following restrictions apply:
+# * Numeric group references (e.g. <c>(\w+) \1</c>) are not supported: use named groups instead (e.g. <c>(?P<word>\w+) (?P=word)</c>).
+# * Every group name may be used by a single pattern only.
+# * Global inline flags (e.g. <c>(?i)</c>) are not supported: use <c>ignoreCase</c> or scoped flags (e.g. <c>(?i:...)</c>) instead.
+#
+class ErrorClassifier(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		dict patterns				(required) The class names and their regular expression(s) (a <c>str</c> or a list of <c>str</c>).
+	#											The expressions are matched with <c>re.MULTILINE</c> so that <c>^</c> and <c>$</c> refer to single lines.
+	# @param		str[] fatalClasses			(optional) The classes that abort the command.
+	# @param		bool ignoreCase				(optional) If <c>True</c> the expressions are matched case insensitively.
+	# @param		int maxMatches				(optional) The maximum number of matching lines to keep for <c>CommandResult.errorMatches</c>.
+	#
+	def __init__(self,
+			patterns:typing.Mapping[str,typing.Union[str,typing.List[str]]],
+			fatalClasses:typing.Iterable[str] = None,
+			ignoreCase:bool = False,
+			maxMatches:int = 100,
+		):
+
+		assert isinstance(patterns, dict) and patterns
+		assert isinstance(maxMatches, int) and (maxMatches >= 0)
+
+		alternatives = []
+		self.__groupClassNames = {}
+		userGroupNames = set()
+		for className, classPatterns in patterns.items():
+			assert isinstance(className, str)
+			if isinstance(classPatterns, str):
+				classPatterns = [ classPatterns ]
+			for pattern in classPatterns:
+				assert isinstance(pattern, str)
+				# validate every pattern on its own to get a meaningful error message
+				errorMessage = _findNonLocalConstruct(pattern)
+				if errorMessage is None:
+					try:
+						for groupName in re.compile(pattern).groupindex:
+							if groupName.startswith(_GROUP_NAME_PREFIX) or (groupName in userGroupNames):
+								errorMessage = "group name " + repr(groupName) + " already in use"
+								break
+							userGroupNames.add(groupName)
+					except re.error as ee:
+						errorMessage = str(ee)
+				if errorMessage is not None:
+					raise Exception("Invalid pattern for class " + repr(className) + ": " + repr(pattern) + " (" + errorMessage + ")")
+				groupName = _GROUP_NAME_PREFIX + str(len(self.__groupClassNames))
+				self.__groupClassNames[groupName] = className
+				alternatives.append("(?P<" + groupName + ">" + pattern + ")")
+
+		self.__fatalClasses = frozenset(fatalClasses or [])
+		for className in self.__fatalClasses:
+			if className not in patterns:
+				raise Exception("Unknown fatal class: " + repr(className))
+
+		self.__classNames = list(patterns.keys())
+		self.__maxMatches = maxMatches
+		flags = re.MULTILINE | (re.IGNORECASE if ignoreCase else 0)
+		try:
+			self.__regex = re.compile("|".join(alternatives), flags)
+		except re.error as ee:
+			# identify the pattern that can't be combined with the patterns before
+			for i, groupName in enumerate(self.__groupClassNames):
+				try:
+					re.compile("|".join(alternatives[:i + 1]), flags)
+				except re.error:
+					raise Exception("Invalid pattern for class " + repr(self.__groupClassNames[groupName]) + ": "
+						+ repr(alternatives[i][len(groupName) + 5:-1]) + " (" + str(ee) + ")")
+			raise
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def classNames(self) -> typing.List[str]:
+		return list(self.__classNames)
+	#
+
+	@property
+	def fatalClasses(self) -> typing.FrozenSet[str]:
+		return self.__fatalClasses
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def _createMatcher(self) -> _ErrorMatcher:
+		return _ErrorMatcher(self.__regex, self.__groupClassNames, self.__fatalClasses, self.__maxMatches)
+	#
+
+	#
+	# Classify output after the fact (e.g. the output of commands run remotely).
+	#
+	# @param		str|str[]|bytes data		(required) The output.
+	# @return		str[]						The classes matched (in the order of their first match).
+	#
+	def classify(self, data:typing.Union[str,typing.List[str],bytes]) -> typing.List[str]:
+		if not isinstance(data, str):
+			data = str(data, "utf-8", "replace") if isinstance(data, (bytes, bytearray)) else "\n".join(data)
+		matcher = self._createMatcher()
+		matcher.feed(data.encode("utf-8", "surrogateescape"))
+		matcher.close()
+		return matcher.classes
+	#
+
+#
+
+
+
@@ -0,0 +1,718 @@
+
+
+import os
+import time
+import heapq
+import itertools
+import selectors
+import subprocess
+import threading
+import collections
+import concurrent.futures
+import typing
+
+from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from .EnvSnapshot import EnvSnapshot
+from .ResourceLimits import ResourceLimits
+from .OutputForwarder import OutputForwarder
+from .OutputTimeline import OutputTimeline
+from .ErrorClassifier import ErrorClassifier
+from .simpleexec import _buildCommandResult
+from . import _common as _common
+from . import _communicate as _communicate
+
+
+
+
+#
+# The state of a single command run by the <c>ExecutionEngine</c>.
+#
+class _Child(object):
+
+	def __init__(self, future:concurrent.futures.Future, args:dict):
+		self.future = future
+		self.args = args
+		self.p = None
+		self.cgroup = None
+		self.pidfd = None
+		self.stdOutChunks = []
+		self.stdErrChunks = []
+		self.timeline = None
+		self.stdErrMatcher = None
+		self.nOpenPipes = 0
+		self.bExited = False
+		self.status = None
+		self.rusage = None
+		self.killReason = None
+		self.tStart = None
+		self.tStartMonotonic = None
+		self.timers = []				# the entries of this child in the timer heap
+	#
+
+	#
+	# Release everything no longer needed after the future has been resolved. Timer entries that are still queued no longer refer
+	# to this child then.
+	#
+	def release(self):
+		for entry in self.timers:
+			entry[2] = None
+		self.timers = []
+		self.args = None
+		self.stdOutChunks = None
+		self.stdErrChunks = None
+	#
+
+#
+
+
+
+#
+# Runs many commands concurrently with a single thread. All pipes of all child processes are multiplexed by a single selector (epoll
+# on Linux). The termination of the child processes is detected via <c>pidfd_open()</c> where available (Linux 5.3+, Python 3.9+);
+# otherwise terminated children are polled.
+#
+# Commands are submitted with the same arguments as <c>invokeCmd2()</c> and return a <c>concurrent.futures.Future</c> that resolves
+# to the <c>CommandResult</c>. Synchronous callers can use <c>run()</c>.
+#
+# Example:
+#
+#	with ExecutionEngine() as engine:
+#		futures = [ engine.submit(cmdPath="/usr/bin/ping", cmdArgs=[ "-c", "1", host ], timeout=5) for host in hosts ]
+#		for f in concurrent.futures.as_completed(futures):
+#			r = f.result()
+#			...
+#
+# NOTE: Output processing, callbacks of forwarders and future callbacks run in the thread of the engine: they should return quickly.
+#
+class ExecutionEngine(object):
+
+	_READ_SIZE = 65536
+	_WRITE_SIZE = 65536
+
+	# the interval in seconds terminated children are polled for if pidfds are not available
+	_EXIT_POLL_INTERVAL = 0.01
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. The thread of the engine is started immediately.
+	#
+	# @param		int maxProcesses				(optional) The maximum number of child processes to run at the same time. Further commands are
+	#												queued. If <c>None</c> is specified all commands are started immediately.
+	#
+	def __init__(self, maxProcesses:int = None):
+		if maxProcesses is not None:
+			assert isinstance(maxProcesses, int)
+			assert maxProcesses >= 1
+
+		self.__maxProcesses = maxProcesses
+		self.__bUsePidFD = hasattr(os, "pidfd_open")
+
+		self.__lock = threading.Lock()
+		self.__submitted = collections.deque()
+		self.__cancelRequests = collections.deque()
+		self.__bShutdown = False
+
+		self.__selector = selectors.DefaultSelector()
+		self.__wakeupReadFD, self.__wakeupWriteFD = os.pipe()
+		os.set_blocking(self.__wakeupReadFD, False)
+		os.set_blocking(self.__wakeupWriteFD, False)
+		self.__selector.register(self.__wakeupReadFD, selectors.EVENT_READ, None)
+
+		# the following is only accessed by the thread of the engine
+		self.__pending = collections.deque()
+		self.__children = {}						# future -> _Child
+		self.__awaitingExit = []					# children without pidfd that closed their pipes but did not yet terminate
+		self.__timers = []							# [ t, seq, child ] (child is None if the child finished before)
+		self.__seq = itertools.count()
+
+		self.__thread = threading.Thread(target=self.__run, name="jk_simpleexec-engine", daemon=True)
+		self.__thread.start()
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def maxProcesses(self) -> typing.Union[int,None]:
+		return self.__maxProcesses
+	#
+
+	#
+	# The number of child processes currently running.
+	#
+	@property
+	def runningCount(self) -> int:
+		return len(self.__children)
+	#
+
+	#
+	# The number of commands waiting to be started.
+	#
+	@property
+	def queueDepth(self) -> int:
+		return len(self.__pending) + len(self.__submitted)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	#
+	# Wake up the thread of the engine. The lock must be held.
+	#
+	def __wakeup(self):
+		if self.__wakeupWriteFD is None:
+			return
+		try:
+			os.write(self.__wakeupWriteFD, b"\0")
+		except BlockingIOError:
+			# the pipe is full: the engine will wake up anyway
+			pass
+	#
+
+	def __start(self, child:_Child):
+		args = child.args
+		if not child.future.set_running_or_notify_cancel():
+			return
+
+		resourceLimits = args["resourceLimits"]
+		dataToPipeAsStdIn = args["dataToPipeAsStdIn"]
+
+		try:
+			if _common.debugValve:
+				_common.debugValve("================================================================================================================================")
+				_common.debugValve("EXECUTING: " + str(args["cmd"]))
+
+			child.cgroup = resourceLimits._createCGroup() if resourceLimits else None
+			child.timeline = OutputTimeline() if args["recordTimeline"] else None
+			child.stdErrMatcher = args["stdErrClassifier"]._createMatcher() if args["stdErrClassifier"] else None
+			child.tStart = time.time()
+			child.tStartMonotonic = time.monotonic()
+			child.p = subprocess.Popen(
+				args["cmd"],
+				shell=args["shell"],
+				stdout=subprocess.PIPE,
+				stderr=subprocess.PIPE,
+				stdin=subprocess.PIPE if dataToPipeAsStdIn else None,
+				env=args["env"],
+				cwd=args["workingDirectory"] or None,
+				preexec_fn=resourceLimits._createPreExecFunction(child.cgroup) if resourceLimits else None,
+			)
+		except BaseException as ee:
+			if child.cgroup:
+				child.cgroup.remove()
+			child.future.set_exception(ee)
+			return
+
+		p = child.p
+		self.__children[child.future] = child
+		sel = self.__selector
+
+		if dataToPipeAsStdIn:
+			os.set_blocking(p.stdin.fileno(), False)
+			sel.register(p.stdin.fileno(), selectors.EVENT_WRITE, (self.__onWritable, child, memoryview(dataToPipeAsStdIn)))
+		for f, chunks, forwarder, streamID, matcher in [
+				(p.stdout, child.stdOutChunks, args["stdOutForwarder"], 1, None),
+				(p.stderr, child.stdErrChunks, args["stdErrForwarder"], 2, child.stdErrMatcher),
+			]:
+			sink, forwarder = _communicate._createSink(chunks, forwarder, child.timeline, streamID, matcher)
+			sel.register(f.fileno(), selectors.EVENT_READ, (self.__onReadable, child, (sink, forwarder)))
+			child.nOpenPipes += 1
+
+		if self.__bUsePidFD:
+			try:
+				child.pidfd = os.pidfd_open(p.pid)
+				sel.register(child.pidfd, selectors.EVENT_READ, (self.__onPidFD, child, None))
+			except OSError:
+				# e.g. not supported by the kernel
+				self.__bUsePidFD = False
+				child.pidfd = None
+
+		if args["timeout"] is not None:
+			self.__addTimer(child, child.tStartMonotonic + args["timeout"])
+	#
+
+	def __onWritable(self, fd:int, child:_Child, data:memoryview):
+		try:
+			n = os.write(fd, data[:ExecutionEngine._WRITE_SIZE])
+		except BlockingIOError:
+			return
+		except BrokenPipeError:
+			n = len(data)
+		data = data[n:]
+		if data:
+			self.__selector.modify(fd, selectors.EVENT_WRITE, (self.__onWritable, child, data))
+		else:
+			self.__selector.unregister(fd)
+			try:
+				child.p.stdin.close()
+			except BrokenPipeError:
+				pass
+	#
+
+	def __onReadable(self, fd:int, child:_Child, sinkAndForwarder:tuple):
+		chunk = os.read(fd, ExecutionEngine._READ_SIZE)
+		if chunk:
+			sinkAndForwarder[0](chunk)
+			if (child.stdErrMatcher is not None) and (child.stdErrMatcher.fatalMatch is not None):
+				self.__kill(child, "fatalError")
+		else:
+			self.__closePipe(fd, child, sinkAndForwarder[1])
+	#
+
+	def __closePipe(self, fd:int, child:_Child, forwarder):
+		self.__selector.unregister(fd)
+		if forwarder is not None:
+			forwarder._close()
+		child.nOpenPipes -= 1
+		if child.nOpenPipes == 0:
+			self.__onPipesClosed(child)
+	#
+
+	def __onPidFD(self, fd:int, child:_Child, _):
+		self.__selector.unregister(fd)
+		os.close(fd)
+		child.pidfd = None
+		self.__reap(child, 0)
+		if child.bExited and (child.nOpenPipes == 0):
+			self.__finish(child)
+	#
+
+	def __onPipesClosed(self, child:_Child):
+		if child.bExited:
+			self.__finish(child)
+		elif child.pidfd is None:
+			# no exit notification available: poll
+			if not self.__reap(child, os.WNOHANG):
+				self.__awaitingExit.append(child)
+			else:
+				self.__finish(child)
+	#
+
+	#
+	# Try to reap a child process.
+	#
+	# @return		bool			Returns <c>True</c> if the child has terminated.
+	#
+	def __reap(self, child:_Child, options:int) -> bool:
+		if child.bExited:
+			return True
+		pid, status, rusage = os.wait4(child.p.pid, options)
+		if pid == 0:
+			return False
+		child.bExited = True
+		child.status = status
+		child.rusage = rusage
+		child.p.returncode = _communicate.waitStatusToReturnCode(status)
+		return True
+	#
+
+	def __kill(self, child:_Child, killReason:str):
+		if child.bExited or (child.killReason is not None):
+			return
+		child.killReason = killReason
+		try:
+			child.p.kill()
+		except ProcessLookupError:
+			pass
+		# a grandchild might still hold the pipes open
+		self.__addTimer(child, time.monotonic() + _communicate._KILL_GRACE_PERIOD)
+	#
+
+	def __addTimer(self, child:_Child, t:float):
+		entry = [ t, next(self.__seq), child ]
+		heapq.heappush(self.__timers, entry)
+		child.timers.append(entry)
+	#
+
+	#
+	# Close all pipes of a child that was killed but whose pipes are still held open by other processes.
+	#
+	def __forceClose(self, child:_Child):
+		sel = self.__selector
+		for f in [ child.p.stdin, child.p.stdout, child.p.stderr ]:
+			if (f is not None) and not f.closed:
+				try:
+					key = sel.get_key(f.fileno())
+				except KeyError:
+					continue
+				if key.data[0] == self.__onReadable:
+					self.__closePipe(f.fileno(), child, key.data[2][1])
+				else:
+					sel.unregister(f.fileno())
+	#
+
+	def __finish(self, child:_Child):
+		del self.__children[child.future]
+		p = child.p
+		for f in [ p.stdin, p.stdout, p.stderr ]:
+			if f is not None:
+				try:
+					f.close()
+				except BrokenPipeError:
+					pass
+
+		args = child.args
+		resourceLimits = args["resourceLimits"]
+		try:
+			try:
+				tDuration = time.time() - child.tStart
+				stdout = b"".join(child.stdOutChunks)
+				stderr = b"".join(child.stdErrChunks)
+				if child.stdErrMatcher is not None:
+					child.stdErrMatcher.close()
+				if child.timeline is not None:
+					child.timeline._finish(stdout, stderr)
+				resourceUsage = resourceLimits._buildResourceUsage(p.returncode, child.rusage, child.cgroup) if resourceLimits else None
+			finally:
+				if child.cgroup:
+					child.cgroup.remove()
+
+			r = _buildCommandResult(
+				args["cmdPath"], args["cmdArgs"], stdout, stderr, p.returncode, tDuration, args["stdOutProcessing"], args["stdErrProcessing"],
+				resourceUsage, child.killReason, child.timeline, child.stdErrMatcher)
+		except BaseException as ee:
+			child.release()
+			child.future.set_exception(ee)
+		else:
+			child.release()
+			child.future.set_result(r)
+	#
+
+	#
+	# Terminate a child because processing its output failed (e.g. a forwarder raised an exception): the child is killed and reaped,
+	# all its pipes are closed and the exception is passed on to the future. Other children are not affected.
+	#
+	def __abort(self, child:_Child, ee:BaseException):
+		if child.future not in self.__children:
+			# already finished
+			return
+		del self.__children[child.future]
+		if child in self.__awaitingExit:
+			self.__awaitingExit.remove(child)
+
+		sel = self.__selector
+		p = child.p
+		for f in [ p.stdin, p.stdout, p.stderr ]:
+			if (f is None) or f.closed:
+				continue
+			try:
+				key = sel.get_key(f.fileno())
+			except KeyError:
+				key = None
+			if key is not None:
+				sel.unregister(f.fileno())
+				if (key.data[0] == self.__onReadable) and (key.data[2][1] is not None):
+					try:
+						key.data[2][1]._close()
+					except Exception:
+						pass
+			try:
+				f.close()
+			except BrokenPipeError:
+				pass
+		if child.pidfd is not None:
+			sel.unregister(child.pidfd)
+			os.close(child.pidfd)
+			child.pidfd = None
+
+		if not child.bExited:
+			try:
+				p.kill()
+			except ProcessLookupError:
+				pass
+			self.__reap(child, 0)
+		if child.cgroup:
+			try:
+				child.cgroup.remove()
+			except Exception:
+				pass
+
+		child.release()
+		child.future.set_exception(ee)
+	#
+
+	def __processRequests(self):
+		try:
+			while os.read(self.__wakeupReadFD, 4096):
+				pass
+		except BlockingIOError:
+			pass
+
+		with self.__lock:
+			submitted = list(self.__submitted)
+			self.__submitted.clear()
+			cancelRequests = list(self.__cancelRequests)
+			self.__cancelRequests.clear()
+
+		self.__pending.extend(submitted)
+
+		for future in cancelRequests:
+			child = self.__children.get(future)
+			if child is not None:
+				self.__kill(child, "cancelled")
+			else:
+				for child in self.__pending:
+					if child.future is future:
+						self.__pending.remove(child)
+						future.cancel()
+						# this notifies concurrent.futures.wait() and as_completed() (cancel() alone does not)
+						future.set_running_or_notify_cancel()
+						break
+	#
+
+	def __processTimers(self):
+		tNow = time.monotonic()
+		while self.__timers and (self.__timers[0][0] <= tNow):
+			_, _, child = heapq.heappop(self.__timers)
+			if (child is None) or (child.future not in self.__children):
+				continue
+			try:
+				self.__processTimer(child)
+			except Exception as ee:
+				self.__abort(child, ee)
+	#
+
+	def __processTimer(self, child:_Child):
+		if child.killReason is None:
+			self.__kill(child, "timeout")
+		else:
+			self.__forceClose(child)
+			if not child.bExited:
+				# the child has been killed, so this won't block for long
+				self.__reap(child, 0)
+			if child.nOpenPipes == 0 and child.bExited and (child.future in self.__children):
+				if child in self.__awaitingExit:
+					self.__awaitingExit.remove(child)
+				if child.pidfd is not None:
+					self.__selector.unregister(child.pidfd)
+					os.close(child.pidfd)
+					child.pidfd = None
+				self.__finish(child)
+	#
+
+	def __processAwaitingExit(self):
+		stillWaiting = []
+		for child in self.__awaitingExit:
+			if self.__reap(child, os.WNOHANG):
+				self.__finish(child)
+			else:
+				stillWaiting.append(child)
+		self.__awaitingExit = stillWaiting
+	#
+
+	def __run(self):
+		sel = self.__selector
+		while True:
+			self.__processRequests()
+
+			while self.__pending and ((self.__maxProcesses is None) or (len(self.__children) < self.__maxProcesses)):
+				self.__start(self.__pending.popleft())
+
+			if self.__bShutdown and not self.__children and not self.__pending and not self.__submitted:
+				break
+
+			timeout = None
+			if self.__timers:
+				timeout = max(0, self.__timers[0][0] - time.monotonic())
+			if self.__awaitingExit:
+				timeout = ExecutionEngine._EXIT_POLL_INTERVAL if timeout is None else min(timeout, ExecutionEngine._EXIT_POLL_INTERVAL)
+
+			for key, events in sel.select(timeout):
+				if key.data is None:
+					# wakeup: processed at the beginning of the next iteration
+					continue
+				handler, child, data = key.data
+				try:
+					handler(key.fd, child, data)
+				except Exception as ee:
+					# e.g. raised by a forwarder: only this child is affected
+					self.__abort(child, ee)
+
+			self.__processTimers()
+			if self.__awaitingExit:
+				self.__processAwaitingExit()
+
+		with self.__lock:
+			sel.close()
+			os.close(self.__wakeupReadFD)
+			os.close(self.__wakeupWriteFD)
+			self.__wakeupWriteFD = None
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Submit a command. The arguments are the same as for <c>invokeCmd2()</c> (except for <c>log</c> and <c>cancelEvent</c>: use <c>cancel()</c> instead).
+	#
+	# @return		concurrent.futures.Future			A future that resolves to the <c>CommandResult</c>.
+	#
+	def submit(self,
+			*argv,
+			cmdPath:str,
+			cmdArgs:list,
+			dataToPipeAsStdIn:typing.Union[str,bytes,bytearray] = None,
+			workingDirectory:str = None,
+			stdOutProcessing:TextDataProcessingPolicy = None,
+			stdErrProcessing:TextDataProcessingPolicy = None,
+			shell:bool = False,
+			env:typing.Union[typing.Mapping[str,str],EnvSnapshot] = None,
+			envOverrides:typing.Mapping[str,typing.Union[str,None]] = None,
+			clearEnv:bool = False,
+			resourceLimits:ResourceLimits = None,
+			timeout:float = None,
+			stdOutForwarder:OutputForwarder = None,
+			stdErrForwarder:OutputForwarder = None,
+			recordTimeline:bool = False,
+			stdErrClassifier:ErrorClassifier = None,
+		) -> concurrent.futures.Future:
+
+		if len(argv) > 0:
+			raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+
+		assert isinstance(cmdPath, str)
+		if cmdArgs is not None:
+			assert isinstance(cmdArgs, (list, tuple))
+			for x in cmdArgs:
+				assert isinstance(x, str)
+		if workingDirectory is not None:
+			assert isinstance(workingDirectory, str)
+		if stdErrClassifier is not None:
+			assert isinstance(stdErrClassifier, ErrorClassifier)
+
+		if dataToPipeAsStdIn:
+			if isinstance(dataToPipeAsStdIn, str):
+				dataToPipeAsStdIn = dataToPipeAsStdIn.encode("utf-8")
+			elif not isinstance(dataToPipeAsStdIn, (bytes, bytearray)):
+				raise Exception("Can only pipe string data and byte arrays!")
+
+		cmd = [ cmdPath ]
+		if cmdArgs is not None:
+			cmd.extend(cmdArgs)
+
+		future = concurrent.futures.Future()
+		child = _Child(future, {
+			"cmdPath": cmdPath,
+			"cmdArgs": cmdArgs,
+			"cmd": cmd,
+			"dataToPipeAsStdIn": dataToPipeAsStdIn,
+			"workingDirectory": workingDirectory,
+			"stdOutProcessing": _common.DEFAULT_STDOUT_PROCESSING.override(stdOutProcessing),
+			"stdErrProcessing": _common.DEFAULT_STDERR_PROCESSING.override(stdErrProcessing),
+			"shell": shell,
+			"env": EnvSnapshot.resolve(env, envOverrides, clearEnv),
+			"resourceLimits": resourceLimits,
+			"timeout": timeout,
+			"stdOutForwarder": stdOutForwarder,
+			"stdErrForwarder": stdErrForwarder,
+			"recordTimeline": recordTimeline,
+			"stdErrClassifier": stdErrClassifier,
+		})
+
+		with self.__lock:
+			if self.__bShutdown:
+				raise Exception("The engine has been shut down!")
+			self.__submitted.append(child)
+			self.__wakeup()
+
+		return future
+	#
+
+	#
+	# Run a command and wait for its result. The arguments are the same as for <c>submit()</c>.
+	#
+	def run(self, *argv, **kwargs):
+		return self.submit(*argv, **kwargs).result()
+	#
+
+	#
+	# Cancel a command. If it is still queued it will not be started; if it is running it is killed and its <c>CommandResult</c> will have
+	# "cancelled" as <c>limitKillReason</c>.
+	#
+	def cancel(self, future:concurrent.futures.Future):
+		if future.done():
+			return
+		with self.__lock:
+			self.__cancelRequests.append(future)
+			self.__wakeup()
+	#
+
+	#
+	# Iterate over the results of commands in the order of their completion. If a result matches <c>stopWhen</c> all other commands are
+	# cancelled immediately: running child processes are killed and queued commands are not started. The iteration ends with the matching
+	# result. Commands are cancelled as well if the iteration is not completed (e.g. if the caller leaves the loop early).
+	# Before the iteration ends all cancelled child processes have been reaped.
+	#
+	# Example:
+	#
+	#	futures = [ engine.submit(cmdPath="curl", cmdArgs=[ "-sfI", url ], timeout=10) for url in mirrorURLs ]
+	#	for r in engine.asCompleted(futures, stopWhen=lambda r: r.returnCode == 0):
+	#		...
+	#
+	# @param		Future[] futures				(required) The futures as returned by <c>submit()</c>.
+	# @param		callable stopWhen				(optional) A predicate that receives a <c>CommandResult</c>. If it returns <c>True</c> all other commands are cancelled.
+	# @param		bool ignoreErrors				(optional) If <c>True</c> commands that could not be run (e.g. because the program does not exist)
+	#												are skipped. Otherwise (default) their exception is raised (and all other commands are cancelled).
+	# @return		CommandResult[]					An iterator over the results. Commands cancelled by other means are skipped.
+	#
+	def asCompleted(self, futures:typing.Iterable[concurrent.futures.Future], stopWhen:typing.Callable = None, ignoreErrors:bool = False) -> typing.Iterator:
+		futures = list(futures)
+		remaining = set(futures)
+		bCancelled = False
+		try:
+			for f in concurrent.futures.as_completed(futures):
+				remaining.discard(f)
+				if f.cancelled():
+					continue
+				if f.exception() is not None:
+					if ignoreErrors:
+						continue
+					raise f.exception()
+				r = f.result()
+				if (stopWhen is not None) and stopWhen(r):
+					# cancel before the caller processes the result
+					for other in remaining:
+						self.cancel(other)
+					bCancelled = True
+					yield r
+					return
+				yield r
+		finally:
+			if remaining:
+				if not bCancelled:
+					for other in remaining:
+						self.cancel(other)
+				concurrent.futures.wait(remaining)
+	#
+
+	#
+	# Shut down this engine. No new commands are accepted. Commands already submitted are still run.
+	#
+	# @param		bool wait				(optional) If <c>True</c> (default) wait until all commands have completed.
+	#
+	def shutdown(self, wait:bool = True):
+		with self.__lock:
+			self.__bShutdown = True
+			self.__wakeup()
+		if wait:
+			self.__thread.join()
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.shutdown(wait=True)
+	#
+
+#
+
+
+
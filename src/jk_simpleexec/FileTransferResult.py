@@ -0,0 +1,107 @@
+
+
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# Information about a file transfer performed by <c>getFile()</c> or <c>putFile()</c>.
+#
+class FileTransferResult(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str sourceFilePath			(required) The path of the source file.
+	# @param		str destinationFilePath		(required) The path of the destination file.
+	# @param		int fileSize				(required) The size of the file in bytes.
+	# @param		int bytesTransferred		(required) The number of bytes actually transferred. This is less than <c>fileSize</c> if
+	#											an interrupted transfer has been resumed.
+	# @param		int nChunks					(required) The number of chunks the file has been split into.
+	# @param		float duration				(required) The duration of the transfer in seconds.
+	# @param		str sha256					(optional) The SHA-256 checksum of the file if it has been verified.
+	#
+	def __init__(self,
+			sourceFilePath:str,
+			destinationFilePath:str,
+			fileSize:int,
+			bytesTransferred:int,
+			nChunks:int,
+			duration:float,
+			sha256:str = None,
+		):
+
+		self.sourceFilePath = sourceFilePath
+		self.destinationFilePath = destinationFilePath
+		self.fileSize = fileSize
+		self.bytesTransferred = bytesTransferred
+		self.nChunks = nChunks
+		self.duration = duration
+		self.sha256 = sha256
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# Returns <c>True</c> if an interrupted transfer has been resumed.
+	#
+	@property
+	def isResumed(self) -> bool:
+		return self.bytesTransferred < self.fileSize
+	#
+
+	#
+	# The throughput in bytes per second.
+	#
+	@property
+	def throughput(self) -> float:
+		return self.bytesTransferred / self.duration if self.duration > 0 else 0.0
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"sourceFilePath",
+			"destinationFilePath",
+			"fileSize",
+			"bytesTransferred",
+			"nChunks",
+			"duration",
+			"throughput",
+			"sha256",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def toJSON(self) -> dict:
+		return {
+			"sourceFilePath": self.sourceFilePath,
+			"destinationFilePath": self.destinationFilePath,
+			"fileSize": self.fileSize,
+			"bytesTransferred": self.bytesTransferred,
+			"nChunks": self.nChunks,
+			"duration": self.duration,
+			"sha256": self.sha256,
+		}
+	#
+
+#
+
+
+
@@ -0,0 +1,242 @@
+
+
+import threading
+import typing
+
+import jk_prettyprintobj
+
+from .CommandResult import CommandResult
+from .RetryPolicy import RetryPolicy
+
+
+
+
+
+#
+# A command submitted to a <c>JobScheduler</c>. Objects of this class are created by <c>JobScheduler.submit()</c>.
+#
+# A job is in one of the following states:
+#
+# * "queued" - the job waits for a worker (or for the next attempt after a failed one)
+# * "running" - the command is running
+# * "succeeded" - the command completed successfully
+# * "failed" - the command failed and no (further) retries were possible
+# * "cancelled" - the job has been cancelled
+# * "expired" - the deadline of the job has been reached before the command could complete successfully
+#
+class Job(jk_prettyprintobj.DumpMixin):
+
+	FINAL_STATES = frozenset([ "succeeded", "failed", "cancelled", "expired" ])
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. Don't invoke this directly: use <c>JobScheduler.submit()</c>.
+	#
+	def __init__(self,
+			jobID:int,
+			invokeArgs:dict,
+			priority:int,
+			retryPolicy:typing.Union[RetryPolicy,None],
+			tDeadline:typing.Union[float,None],
+			timeout:typing.Union[float,None],
+			onDone:typing.Union[typing.Callable,None],
+			tSubmitted:float,
+		):
+
+		self.__jobID = jobID
+		self.__priority = priority
+		self.__retryPolicy = retryPolicy
+		self.__onDone = onDone
+
+		self._invokeArgs = invokeArgs
+		self._tDeadline = tDeadline
+		self._timeout = timeout
+		self._tSubmitted = tSubmitted
+		self._tStarted = None
+		self._tFinished = None
+		self._cancelEvent = threading.Event()
+		self._scheduler = None
+
+		self.__state = "queued"
+		self.__attempts = 0
+		self.__result = None
+		self.__exception = None
+		self.__doneEvent = threading.Event()
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def jobID(self) -> int:
+		return self.__jobID
+	#
+
+	#
+	# The priority of this job. Jobs with higher values are run first.
+	#
+	@property
+	def priority(self) -> int:
+		return self.__priority
+	#
+
+	@property
+	def retryPolicy(self) -> typing.Union[RetryPolicy,None]:
+		return self.__retryPolicy
+	#
+
+	#
+	# The state of this job: "queued", "running", "succeeded", "failed", "cancelled" or "expired".
+	#
+	@property
+	def state(self) -> str:
+		return self.__state
+	#
+
+	@property
+	def isDone(self) -> bool:
+		return self.__state in Job.FINAL_STATES
+	#
+
+	#
+	# The number of attempts made so far.
+	#
+	@property
+	def attempts(self) -> int:
+		return self.__attempts
+	#
+
+	#
+	# The result of the last attempt (or <c>None</c> if no attempt has completed yet).
+	#
+	@property
+	def result(self) -> typing.Union[CommandResult,None]:
+		return self.__result
+	#
+
+	#
+	# If running the command raised an exception (e.g. because the program does not exist) this exception. The job has failed then.
+	#
+	@property
+	def exception(self) -> typing.Union[BaseException,None]:
+		return self.__exception
+	#
+
+	#
+	# The time in seconds between submitting the job and starting the first attempt (or <c>None</c> if not yet started).
+	#
+	@property
+	def waitTime(self) -> typing.Union[float,None]:
+		return None if self._tStarted is None else self._tStarted - self._tSubmitted
+	#
+
+	#
+	# The time in seconds between submitting the job and completion (or <c>None</c> if not yet done).
+	#
+	@property
+	def latency(self) -> typing.Union[float,None]:
+		return None if self._tFinished is None else self._tFinished - self._tSubmitted
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"jobID",
+			"priority",
+			"state",
+			"attempts",
+			"waitTime",
+			"latency",
+			"result",
+			"exception",
+		]
+	#
+
+	def _setRunning(self, tNow:float):
+		self.__state = "running"
+		self.__attempts += 1
+		if self._tStarted is None:
+			self._tStarted = tNow
+	#
+
+	def _setQueued(self, r:CommandResult):
+		self.__state = "queued"
+		self.__result = r
+	#
+
+	#
+	# Set the final state. Returns <c>False</c> if the job already was in a final state.
+	#
+	def _finish(self, state:str, tNow:float, r:CommandResult = None, exception:BaseException = None) -> bool:
+		assert state in Job.FINAL_STATES
+		if self.__state in Job.FINAL_STATES:
+			return False
+		self.__state = state
+		if r is not None:
+			self.__result = r
+		self.__exception = exception
+		self._tFinished = tNow
+		self.__doneEvent.set()
+		return True
+	#
+
+	#
+	# Invoke the <c>onDone</c> callback. Like <c>concurrent.futures</c> does with its callbacks exceptions are logged and then ignored:
+	# the callback is invoked by worker threads (or by <c>cancel()</c>) that must not be affected by errors of the callback.
+	#
+	def _notifyDone(self):
+		if self.__onDone is not None:
+			try:
+				self.__onDone(self)
+			except Exception:
+				import logging
+				logging.getLogger("jk_simpleexec").exception("Exception in onDone callback of job %d", self.__jobID)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Wait until this job is done.
+	#
+	# @param		float timeout				(optional) The maximum time to wait in seconds.
+	# @return		bool						Returns <c>True</c> if the job is done, <c>False</c> if the timeout has been reached.
+	#
+	def wait(self, timeout:float = None) -> bool:
+		return self.__doneEvent.wait(timeout)
+	#
+
+	#
+	# Wait until this job is done and return the result of its last attempt. An exception is raised if the job did not succeed.
+	#
+	def getResult(self, timeout:float = None) -> CommandResult:
+		if not self.__doneEvent.wait(timeout):
+			raise Exception("Job " + str(self.__jobID) + " did not complete in time!")
+		if self.__state != "succeeded":
+			raise Exception("Job " + str(self.__jobID) + " " + self.__state + ": " + self._invokeArgs["cmdPath"]) from self.__exception
+		return self.__result
+	#
+
+	#
+	# Cancel this job. A queued job will not be started any more, a running command is killed.
+	#
+	# @return		bool						Returns <c>False</c> if the job was already done.
+	#
+	def cancel(self) -> bool:
+		if self.isDone:
+			return False
+		return self._scheduler._cancel(self)
+	#
+
+#
+
+
+
@@ -0,0 +1,435 @@
+
+
+import time
+import heapq
+import itertools
+import threading
+import collections
+import typing
+
+from .Job import Job
+from .RetryPolicy import RetryPolicy
+from .AdaptiveLimiter import AdaptiveLimiter
+from .simpleexec import invokeCmd2
+
+
+
+
+#
+# Runs commands (via <c>invokeCmd2()</c>) in a pool of worker threads.
+#
+# Jobs are started in the order of their priority (higher values first; jobs of the same priority in the order of submission).
+# At most <c>maxWorkers</c> commands run at the same time. If a job specifies a <c>RetryPolicy</c> failed attempts are queued again
+# after a backoff delay. A job that has not completed successfully before its deadline expires; a command still running at the
+# deadline is killed. If an <c>AdaptiveLimiter</c> is specified the number of commands running concurrently is additionally limited by it.
+#
+# Example:
+#
+#	with JobScheduler(maxWorkers=4) as scheduler:
+#		job = scheduler.submit(cmdPath="/usr/bin/rsync", cmdArgs=[ ... ], priority=10, retryPolicy=RetryPolicy(maxAttempts=5), deadline=600)
+#		...
+#		r = job.getResult()
+#
+class JobScheduler(object):
+
+	# the time window in seconds the throughput is calculated for
+	THROUGHPUT_WINDOW = 60
+
+	# the number of completed jobs the latency statistics are calculated for
+	LATENCY_SAMPLES = 1000
+
+	# the interval in seconds a limiter is polled while the limit has been reached
+	LIMITER_POLL_INTERVAL = 0.05
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. The worker threads are started immediately.
+	#
+	# @param		int maxWorkers						(required) The maximum number of commands to run concurrently.
+	# @param		RetryPolicy defaultRetryPolicy		(optional) The retry policy for jobs that do not specify one. If <c>None</c> is
+	#													specified failed jobs are not retried by default.
+	# @param		AdaptiveLimiter limiter				(optional) Adjusts the number of commands to run concurrently (up to <c>maxWorkers</c>)
+	#													depending on the load of the host.
+	#
+	def __init__(self, maxWorkers:int, defaultRetryPolicy:RetryPolicy = None, limiter:AdaptiveLimiter = None):
+		assert isinstance(maxWorkers, int)
+		assert maxWorkers >= 1
+		if defaultRetryPolicy is not None:
+			assert isinstance(defaultRetryPolicy, RetryPolicy)
+		if limiter is not None:
+			assert isinstance(limiter, AdaptiveLimiter)
+
+		self.__maxWorkers = maxWorkers
+		self.__defaultRetryPolicy = defaultRetryPolicy
+		self.__limiter = limiter
+
+		self.__cond = threading.Condition()
+		self.__seq = itertools.count()
+		self.__readyHeap = []				# (-priority, seq, job)
+		self.__delayedHeap = []				# (tNotBefore, seq, job)
+		self.__nQueued = 0
+		self.__runningJobs = set()
+		self.__bShutdown = False
+
+		self.__counters = collections.Counter()
+		self.__completionTimes = collections.deque()
+		self.__waitTimes = collections.deque(maxlen=JobScheduler.LATENCY_SAMPLES)
+		self.__latencies = collections.deque(maxlen=JobScheduler.LATENCY_SAMPLES)
+		self.__tCreated = time.monotonic()
+
+		self.__workers = []
+		for i in range(maxWorkers):
+			t = threading.Thread(target=self.__workerLoop, name="jk_simpleexec-worker-" + str(i), daemon=True)
+			t.start()
+			self.__workers.append(t)
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def maxWorkers(self) -> int:
+		return self.__maxWorkers
+	#
+
+	@property
+	def limiter(self) -> typing.Union[AdaptiveLimiter,None]:
+		return self.__limiter
+	#
+
+	#
+	# The number of jobs waiting to be run (including jobs waiting for their next attempt).
+	#
+	@property
+	def queueDepth(self) -> int:
+		return self.__nQueued
+	#
+
+	#
+	# The number of commands currently running.
+	#
+	@property
+	def runningCount(self) -> int:
+		return len(self.__runningJobs)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __percentiles(values:typing.Iterable[float]) -> dict:
+		values = sorted(values)
+		if not values:
+			return { "p50": None, "p90": None, "p99": None }
+		n = len(values)
+		return {
+			"p50": values[min(n - 1, int(n * 0.5))],
+			"p90": values[min(n - 1, int(n * 0.9))],
+			"p99": values[min(n - 1, int(n * 0.99))],
+		}
+	#
+
+	#
+	# Record a job that has reached its final state. The lock must be held.
+	#
+	def __recordDone(self, job:Job):
+		self.__counters[job.state] += 1
+		self.__completionTimes.append(job._tFinished)
+		if job.waitTime is not None:
+			self.__waitTimes.append(job.waitTime)
+		self.__latencies.append(job.latency)
+		# wake up waitAll()
+		self.__cond.notify_all()
+	#
+
+	#
+	# Wait for the next job to run. The lock must be held. Jobs that expired while waiting are added to <c>doneJobs</c>.
+	#
+	# @return		Job			The job to run or <c>None</c>. If <c>None</c> is returned and <c>doneJobs</c> is empty the worker should terminate.
+	#
+	def __nextJob(self, doneJobs:list) -> typing.Union[Job,None]:
+		while True:
+			tNow = time.monotonic()
+
+			while self.__delayedHeap and (self.__delayedHeap[0][0] <= tNow):
+				_, seq, job = heapq.heappop(self.__delayedHeap)
+				heapq.heappush(self.__readyHeap, (-job.priority, seq, job))
+
+			bThrottled = False
+			while self.__readyHeap:
+				_, seq, job = heapq.heappop(self.__readyHeap)
+				if job.isDone:
+					# the job has been cancelled while queued
+					continue
+				if (job._tDeadline is not None) and (tNow >= job._tDeadline):
+					self.__nQueued -= 1
+					job._finish("expired", tNow)
+					self.__recordDone(job)
+					doneJobs.append(job)
+					continue
+				if (self.__limiter is not None) and not self.__limiter.tryAcquire():
+					heapq.heappush(self.__readyHeap, (-job.priority, seq, job))
+					bThrottled = True
+					break
+				self.__nQueued -= 1
+				job._setRunning(tNow)
+				self.__runningJobs.add(job)
+				return job
+
+			if doneJobs:
+				# let the caller notify about these jobs first
+				return None
+
+			if self.__bShutdown and not self.__delayedHeap and not bThrottled:
+				return None
+
+			waitTime = self.__delayedHeap[0][0] - tNow if self.__delayedHeap else None
+			if bThrottled and ((waitTime is None) or (waitTime > JobScheduler.LIMITER_POLL_INTERVAL)):
+				# the limit might be raised without a job being completed
+				waitTime = JobScheduler.LIMITER_POLL_INTERVAL
+			self.__cond.wait(waitTime)
+	#
+
+	#
+	# Evaluate the outcome of an attempt. The lock must be held.
+	#
+	# @return		bool		Returns <c>True</c> if the job has reached its final state.
+	#
+	def __evaluateAttempt(self, job:Job, r, exception:BaseException) -> bool:
+		tNow = time.monotonic()
+		self.__runningJobs.discard(job)
+
+		if exception is not None:
+			job._finish("failed", tNow, exception=exception)
+		elif job._cancelEvent.is_set() and (r.limitKillReason == "cancelled"):
+			job._finish("cancelled", tNow, r)
+		else:
+			policy = job.retryPolicy
+			bFailed = r.returnCode != 0
+			bRetryable = False
+			if policy is not None:
+				bRetryable = policy.isRetryable(r)
+				bFailed = bFailed or bRetryable
+
+			if not bFailed:
+				job._finish("succeeded", tNow, r)
+			elif (job._tDeadline is not None) and (tNow >= job._tDeadline):
+				job._finish("expired", tNow, r)
+			elif bRetryable and (job.attempts < policy.maxAttempts):
+				tNotBefore = tNow + policy.getDelay(job.attempts)
+				if (job._tDeadline is not None) and (tNotBefore >= job._tDeadline):
+					job._finish("expired", tNow, r)
+				else:
+					job._setQueued(r)
+					self.__nQueued += 1
+					self.__counters["retries"] += 1
+					heapq.heappush(self.__delayedHeap, (tNotBefore, next(self.__seq), job))
+					self.__cond.notify()
+					return False
+			else:
+				job._finish("failed", tNow, r)
+
+		self.__recordDone(job)
+		return True
+	#
+
+	def __workerLoop(self):
+		while True:
+			doneJobs = []
+			with self.__cond:
+				job = self.__nextJob(doneJobs)
+			for j in doneJobs:
+				j._notifyDone()
+			if job is None:
+				if doneJobs:
+					continue
+				return
+
+			timeout = job._timeout
+			if job._tDeadline is not None:
+				remaining = max(0, job._tDeadline - time.monotonic())
+				timeout = remaining if timeout is None else min(timeout, remaining)
+
+			r = None
+			exception = None
+			try:
+				r = invokeCmd2(timeout=timeout, cancelEvent=job._cancelEvent, **job._invokeArgs)
+			except Exception as ee:
+				exception = ee
+
+			with self.__cond:
+				if self.__limiter is not None:
+					self.__limiter.release(r)
+					self.__cond.notify()
+				bDone = self.__evaluateAttempt(job, r, exception)
+			if bDone:
+				job._notifyDone()
+	#
+
+	#
+	# Cancel the specified job. (Invoked by <c>Job.cancel()</c>.)
+	#
+	def _cancel(self, job:Job) -> bool:
+		with self.__cond:
+			if job.isDone:
+				return False
+			if job.state == "queued":
+				job._finish("cancelled", time.monotonic())
+				self.__nQueued -= 1
+				self.__recordDone(job)
+			else:
+				# the worker kills the command and finishes the job
+				job._cancelEvent.set()
+				return True
+		job._notifyDone()
+		return True
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Submit a command to run. Please invoke this method with named arguments only.
+	#
+	# @param		str cmdPath					(required) The program to invoke.
+	# @param		str[] cmdArgs				(required) The arguments of the program.
+	# @param		int priority				(optional) The priority of the job. Jobs with higher values are run first. (Default: 0)
+	# @param		RetryPolicy retryPolicy		(optional) The retry policy of this job. If not specified the default retry policy of the scheduler is used.
+	# @param		float deadline				(optional) The time in seconds (from now) the job must be completed in. If the deadline is reached
+	#											the job expires: it is not started (or retried) any more and a running command is killed.
+	# @param		float timeout				(optional) The maximum time in seconds a single attempt may run.
+	# @param		callable onDone				(optional) A callable that receives the job after it has reached its final state. It is invoked
+	#											by the thread that completed (or cancelled) the job. Exceptions raised by the callback are
+	#											logged (logger "jk_simpleexec") and ignored otherwise.
+	# @param		* invokeArgs				(optional) Further named arguments for <c>invokeCmd2()</c> (e.g. <c>workingDirectory</c> or <c>envOverrides</c>).
+	# @return		Job							The job object.
+	#
+	def submit(self,
+			*argv,
+			cmdPath:str,
+			cmdArgs:list,
+			priority:int = 0,
+			retryPolicy:RetryPolicy = None,
+			deadline:float = None,
+			timeout:float = None,
+			onDone:typing.Callable[[Job],None] = None,
+			**invokeArgs,
+		) -> Job:
+
+		if len(argv) > 0:
+			raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+		assert isinstance(priority, int)
+		if retryPolicy is None:
+			retryPolicy = self.__defaultRetryPolicy
+		else:
+			assert isinstance(retryPolicy, RetryPolicy)
+		if "cancelEvent" in invokeArgs:
+			raise Exception("The scheduler manages cancellation itself: use Job.cancel()!")
+
+		invokeArgs["cmdPath"] = cmdPath
+		invokeArgs["cmdArgs"] = cmdArgs
+
+		with self.__cond:
+			if self.__bShutdown:
+				raise Exception("The scheduler has been shut down!")
+
+			tNow = time.monotonic()
+			seq = next(self.__seq)
+			job = Job(seq, invokeArgs, priority, retryPolicy, None if deadline is None else tNow + deadline, timeout, onDone, tNow)
+			job._scheduler = self
+
+			heapq.heappush(self.__readyHeap, (-priority, seq, job))
+			self.__nQueued += 1
+			self.__counters["submitted"] += 1
+			self.__cond.notify()
+
+		return job
+	#
+
+	#
+	# Get statistics about this scheduler.
+	#
+	# @return		dict			Returns a dictionary with the following keys:
+	#								* "queueDepth", "running" - the number of jobs currently queued and running
+	#								* "submitted", "succeeded", "failed", "cancelled", "expired", "retries" - counters since the scheduler was created
+	#								* "throughput" - the number of jobs completed per second during the last <c>THROUGHPUT_WINDOW</c> seconds
+	#								* "waitTime", "latency" - dictionaries with the percentiles "p50", "p90" and "p99" in seconds of the time
+	#								  between submission and start resp. completion of the most recent jobs
+	#								* "limit" - the current limit of the limiter (or <c>maxWorkers</c> if no limiter is used)
+	#
+	def getStats(self) -> dict:
+		with self.__cond:
+			tNow = time.monotonic()
+			while self.__completionTimes and (self.__completionTimes[0] < tNow - JobScheduler.THROUGHPUT_WINDOW):
+				self.__completionTimes.popleft()
+			window = min(JobScheduler.THROUGHPUT_WINDOW, tNow - self.__tCreated)
+
+			ret = {
+				"queueDepth": self.__nQueued,
+				"running": len(self.__runningJobs),
+				"limit": self.__maxWorkers if self.__limiter is None else min(self.__maxWorkers, self.__limiter.limit),
+			}
+			for key in [ "submitted", "succeeded", "failed", "cancelled", "expired", "retries" ]:
+				ret[key] = self.__counters[key]
+			ret["throughput"] = len(self.__completionTimes) / window if window > 0 else 0.0
+			ret["waitTime"] = JobScheduler.__percentiles(self.__waitTimes)
+			ret["latency"] = JobScheduler.__percentiles(self.__latencies)
+			return ret
+	#
+
+	#
+	# Cancel all jobs that are queued or running.
+	#
+	def cancelAll(self):
+		with self.__cond:
+			jobs = [ e[2] for e in self.__readyHeap ] + [ e[2] for e in self.__delayedHeap ] + list(self.__runningJobs)
+		for job in jobs:
+			job.cancel()
+	#
+
+	#
+	# Wait until no job is queued or running any more.
+	#
+	# @param		float timeout				(optional) The maximum time to wait in seconds.
+	# @return		bool						Returns <c>False</c> if the timeout has been reached.
+	#
+	def waitAll(self, timeout:float = None) -> bool:
+		with self.__cond:
+			return self.__cond.wait_for(lambda: (self.__nQueued == 0) and not self.__runningJobs, timeout)
+	#
+
+	#
+	# Shut down this scheduler. No new jobs are accepted.
+	#
+	# @param		bool wait					(optional) If <c>True</c> wait until the worker threads have terminated.
+	# @param		bool cancelPending			(optional) If <c>True</c> all queued and running jobs are cancelled. Otherwise the queued jobs are still run.
+	#
+	def shutdown(self, wait:bool = True, cancelPending:bool = False):
+		with self.__cond:
+			self.__bShutdown = True
+			self.__cond.notify_all()
+		if cancelPending:
+			self.cancelAll()
+		if wait:
+			for t in self.__workers:
+				t.join()
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.shutdown(wait=True, cancelPending=exType is not None)
+	#
+
+#
+
+
+
@@ -0,0 +1,156 @@
+
+
+import os
+import io
+import typing
+
+from ._TextDecoder import _TextDecoder
+
+
+
+
+#
+# Forwards the output of a running command as soon as it is produced. Specify an instance of this class for <c>stdOutForwarder</c> or
+# <c>stdErrForwarder</c> of <c>invokeCmd2()</c>. The output is still captured and returned by the <c>CommandResult</c> as usual.
+#
+# The callbacks are invoked by the thread that called <c>invokeCmd2()</c> while the command is running, so they should return quickly.
+#
+# Targets for <c>tee</c> can be:
+# * an <c>int</c> - a file descriptor the raw data is written to
+# * a binary file object (e.g. opened with "wb" or <c>sys.stdout.buffer</c>) - the raw data is written to it
+# * a text file object (e.g. opened with "w" or <c>sys.stdout</c>) - the decoded text is written to it
+# * a logger - it receives every line via <c>notice()</c> or (if that does not exist) <c>info()</c>
+#
+# If only chunk based targets are used no decoding and line splitting takes place.
+#
+class OutputForwarder(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		callable onChunk				(optional) Receives every chunk of raw data (<c>bytes</c>) as read from the pipe.
+	# @param		callable onLine					(optional) Receives every line of text (<c>str</c>, without line feed). An incomplete last line
+	#												is provided after the command has terminated.
+	# @param		*|*[] tee						(optional) A target or a list of targets the output is written to. (See above.)
+	# @param		str encoding					(optional) The encoding used for decoding lines and text. (Default: "utf-8")
+	# @param		str errors						(optional) The error handling used for decoding: "strict", "replace" or "surrogateescape" (or any other
+	#												error handler registered with <c>codecs</c>). (Default: "replace")
+	#
+	def __init__(self,
+			onChunk:typing.Callable[[bytes],None] = None,
+			onLine:typing.Callable[[str],None] = None,
+			tee = None,
+			encoding:str = "utf-8",
+			errors:str = "replace",
+		):
+
+		if tee is None:
+			tee = []
+		elif not isinstance(tee, (list, tuple)):
+			tee = [ tee ]
+
+		chunkFunctions = []
+		textFunctions = []
+		lineFunctions = []
+
+		if onChunk is not None:
+			assert callable(onChunk)
+			chunkFunctions.append(onChunk)
+		if onLine is not None:
+			assert callable(onLine)
+			lineFunctions.append(onLine)
+
+		for target in tee:
+			if isinstance(target, int):
+				chunkFunctions.append(self.__createFDWriteFunction(target))
+			elif isinstance(target, io.TextIOBase):
+				textFunctions.append(target.write)
+			elif hasattr(target, "write"):
+				chunkFunctions.append(target.write)
+			else:
+				printFunc = getattr(target, "notice", None)
+				if printFunc is None:
+					printFunc = getattr(target, "info", None)
+				if printFunc is None:
+					raise Exception("Don't know how to forward output to " + repr(target))
+				lineFunctions.append(printFunc)
+
+		self.__chunkFunctions = chunkFunctions
+		self.__textFunctions = textFunctions
+		self.__lineFunctions = lineFunctions
+		self.__decoder = _TextDecoder(encoding, errors) if (textFunctions or lineFunctions) else None
+		self.__partialLine = ""
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The number of decoding errors that occurred so far. (This is always 0 if only chunk based targets are used as no decoding takes place then.)
+	#
+	@property
+	def nDecodeErrors(self) -> int:
+		return 0 if self.__decoder is None else self.__decoder.nErrors
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __createFDWriteFunction(fd:int) -> typing.Callable[[bytes],None]:
+		def writeAll(chunk:bytes):
+			view = memoryview(chunk)
+			while view:
+				n = os.write(fd, view)
+				view = view[n:]
+		#
+		return writeAll
+	#
+
+	def __processText(self, text:str):
+		for f in self.__textFunctions:
+			f(text)
+		if self.__lineFunctions:
+			if "\n" in text:
+				lines = (self.__partialLine + text).split("\n")
+				self.__partialLine = lines.pop()
+				for line in lines:
+					for f in self.__lineFunctions:
+						f(line)
+			else:
+				self.__partialLine += text
+	#
+
+	#
+	# Forward a chunk of data. (Invoked while reading the output of the command.)
+	#
+	def _feed(self, chunk:bytes):
+		for f in self.__chunkFunctions:
+			f(chunk)
+		if self.__decoder is not None:
+			self.__processText(self.__decoder.decode(chunk))
+	#
+
+	#
+	# Forward remaining data after the end of the output has been reached.
+	#
+	def _close(self):
+		if self.__decoder is not None:
+			self.__processText(self.__decoder.decode(b"", True))
+			if self.__partialLine:
+				for f in self.__lineFunctions:
+					f(self.__partialLine)
+				self.__partialLine = ""
+			self.__decoder.reset()
+	#
+
+#
+
+
+
@@ -0,0 +1,236 @@
+
+
+import time
+import array
+import heapq
+import typing
+
+
+
+
+#
+# A record of when the output of a command arrived. This is provided by <c>CommandResult.timeline</c> if <c>invokeCmd2()</c> has been
+# invoked with <c>recordTimeline=True</c>.
+#
+# For every chunk read from STDOUT or STDERR the stream, the time of arrival (in seconds since the command has been started, measured with
+# a monotonic clock) and the end offset within the output of the stream are recorded in compact arrays. The raw output is referenced, not
+# copied. Lines are reconstructed from this on demand: the time of a line is the time the chunk with its terminating line feed arrived.
+# (This means the resolution is limited to chunks: lines written by a command at once arrive at the same time.)
+#
+class OutputTimeline(object):
+
+	STDOUT = 1
+	STDERR = 2
+
+	STREAM_NAMES = {
+		1: "stdout",
+		2: "stderr",
+	}
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. Don't invoke this directly: objects of this class are created by <c>invokeCmd2()</c>.
+	#
+	def __init__(self):
+		self.__tStart = time.monotonic()
+		self.__times = array.array("d")
+		self.__streams = array.array("B")
+		self.__ends = array.array("Q")
+		self.__lengths = { OutputTimeline.STDOUT: 0, OutputTimeline.STDERR: 0 }
+		self.__data = { OutputTimeline.STDOUT: b"", OutputTimeline.STDERR: b"" }
+		self.__lineCache = {}
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The number of chunks recorded.
+	#
+	@property
+	def chunkCount(self) -> int:
+		return len(self.__times)
+	#
+
+	#
+	# The time in seconds between starting the command and the arrival of the first output on any stream (or <c>None</c> if there was no output).
+	#
+	@property
+	def timeToFirstOutput(self) -> typing.Union[float,None]:
+		return self.__times[0] if self.__times else None
+	#
+
+	@property
+	def timeToFirstStdOut(self) -> typing.Union[float,None]:
+		return self.__timeToFirst(OutputTimeline.STDOUT)
+	#
+
+	@property
+	def timeToFirstStdErr(self) -> typing.Union[float,None]:
+		return self.__timeToFirst(OutputTimeline.STDERR)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __timeToFirst(self, stream:int) -> typing.Union[float,None]:
+		try:
+			return self.__times[self.__streams.index(stream)]
+		except ValueError:
+			return None
+	#
+
+	@staticmethod
+	def __parseStream(stream:typing.Union[int,str,None]) -> typing.List[int]:
+		if stream is None:
+			return [ OutputTimeline.STDOUT, OutputTimeline.STDERR ]
+		if stream in ("stdout", OutputTimeline.STDOUT):
+			return [ OutputTimeline.STDOUT ]
+		if stream in ("stderr", OutputTimeline.STDERR):
+			return [ OutputTimeline.STDERR ]
+		raise Exception("Invalid stream: " + repr(stream))
+	#
+
+	#
+	# Record the arrival of a chunk. (Invoked while reading the output of the command.)
+	#
+	def _record(self, stream:int, chunkLength:int):
+		self.__times.append(time.monotonic() - self.__tStart)
+		self.__streams.append(stream)
+		n = self.__lengths[stream] + chunkLength
+		self.__lengths[stream] = n
+		self.__ends.append(n)
+	#
+
+	#
+	# Set the complete output after the command has terminated.
+	#
+	def _finish(self, stdOutData:bytes, stdErrData:bytes):
+		self.__data[OutputTimeline.STDOUT] = stdOutData
+		self.__data[OutputTimeline.STDERR] = stdErrData
+		self.__lineCache.clear()
+	#
+
+	#
+	# Build the lines of a single stream.
+	#
+	# @return		tuple[]			A list of tuples: the index of the chunk the line was completed with, the time and the line.
+	#
+	def __buildLines(self, stream:int) -> typing.List[tuple]:
+		ret = self.__lineCache.get(stream)
+		if ret is not None:
+			return ret
+
+		data = self.__data[stream]
+		times = self.__times
+		ends = self.__ends
+		streamName = OutputTimeline.STREAM_NAMES[stream]
+		chunkIndices = [ i for i, s in enumerate(self.__streams) if s == stream ]
+
+		ret = []
+		pos = 0
+		for i in chunkIndices:
+			end = ends[i]
+			while True:
+				j = data.find(b"\n", pos, end)
+				if j < 0:
+					break
+				ret.append((i, times[i], streamName, str(data[pos:j], "utf-8", "replace")))
+				pos = j + 1
+		if pos < len(data):
+			i = chunkIndices[-1]
+			ret.append((i, times[i], streamName, str(data[pos:], "utf-8", "replace")))
+
+		self.__lineCache[stream] = ret
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get the recorded chunks.
+	#
+	# @param		str|int stream			(optional) "stdout" or "stderr" to get the chunks of a single stream only.
+	# @return		tuple[]					A list of tuples: the time of arrival, the name of the stream and the raw data.
+	#
+	def getChunks(self, stream:typing.Union[int,str] = None) -> typing.List[typing.Tuple[float,str,bytes]]:
+		streams = OutputTimeline.__parseStream(stream)
+		starts = { OutputTimeline.STDOUT: 0, OutputTimeline.STDERR: 0 }
+		ret = []
+		for t, s, end in zip(self.__times, self.__streams, self.__ends):
+			if s in streams:
+				ret.append((t, OutputTimeline.STREAM_NAMES[s], self.__data[s][starts[s]:end]))
+			starts[s] = end
+		return ret
+	#
+
+	#
+	# Get the lines of the output in the order they arrived.
+	#
+	# @param		str|int stream			(optional) "stdout" or "stderr" to get the lines of a single stream only. By default the lines of both streams
+	#										are merged.
+	# @return		tuple[]					A list of tuples: the time of arrival, the name of the stream and the line (without line feed).
+	#
+	def getLines(self, stream:typing.Union[int,str] = None) -> typing.List[typing.Tuple[float,str,str]]:
+		lineLists = [ self.__buildLines(s) for s in OutputTimeline.__parseStream(stream) ]
+		if len(lineLists) == 1:
+			return [ x[1:] for x in lineLists[0] ]
+		return [ x[1:] for x in heapq.merge(*lineLists, key=lambda x: x[0]) ]
+	#
+
+	#
+	# Get statistics about the gaps between consecutive lines.
+	#
+	# @param		str|int stream			(optional) "stdout" or "stderr" to consider the lines of a single stream only.
+	# @return		dict					A dictionary with the keys "count", "min", "max", "mean", "p50", "p90" and "p99" (in seconds) and
+	#										"maxGapLineIndex", the index of the line that arrived after the largest gap.
+	#										If there are less than two lines all values are <c>None</c> except for "count".
+	#
+	def getGapStats(self, stream:typing.Union[int,str] = None) -> dict:
+		times = [ x[0] for x in self.getLines(stream) ]
+		gaps = [ b - a for a, b in zip(times, times[1:]) ]
+		if not gaps:
+			return {
+				"count": 0,
+				"min": None,
+				"max": None,
+				"mean": None,
+				"p50": None,
+				"p90": None,
+				"p99": None,
+				"maxGapLineIndex": None,
+			}
+
+		maxGap = max(gaps)
+		sortedGaps = sorted(gaps)
+		n = len(sortedGaps)
+		return {
+			"count": n,
+			"min": sortedGaps[0],
+			"max": maxGap,
+			"mean": sum(gaps) / n,
+			"p50": sortedGaps[min(n - 1, int(n * 0.5))],
+			"p90": sortedGaps[min(n - 1, int(n * 0.9))],
+			"p99": sortedGaps[min(n - 1, int(n * 0.99))],
+			"maxGapLineIndex": gaps.index(maxGap) + 1,
+		}
+	#
+
+	#
+	# Get the merged output as text. Every line is prefixed with its time of arrival and the stream.
+	#
+	def toText(self) -> str:
+		return "\n".join("{:10.6f} {} {}".format(t, s, line) for t, s, line in self.getLines())
+	#
+
+#
+
+
+
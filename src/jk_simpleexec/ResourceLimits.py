@@ -0,0 +1,251 @@
+
+
+import os
+import sys
+import signal
+import typing
+
+import jk_prettyprintobj
+
+from ._TransientCGroup import _TransientCGroup
+from .ResourceUsage import ResourceUsage
+
+
+
+
+IOPRIO_CLASS_REALTIME = 1
+IOPRIO_CLASS_BEST_EFFORT = 2
+IOPRIO_CLASS_IDLE = 3
+
+_IOPRIO_WHO_PROCESS = 1
+_IOPRIO_CLASS_SHIFT = 13
+
+#
+# Linux has no python API for setting the I/O priority, so the system call is invoked directly. The number of this system call
+# depends on the architecture.
+#
+_IOPRIO_SET_SYSCALL_NUMBERS = {
+	"x86_64": 251,
+	"amd64": 251,
+	"i386": 289,
+	"i686": 289,
+	"aarch64": 30,
+	"arm64": 30,
+	"riscv64": 30,
+	"armv7l": 314,
+	"ppc64le": 273,
+	"ppc64": 273,
+	"s390x": 282,
+}
+
+
+
+def _getIOPrioSetFunction() -> typing.Callable:
+	import ctypes
+	import ctypes.util
+	import platform
+
+	syscallNo = _IOPRIO_SET_SYSCALL_NUMBERS.get(platform.machine())
+	if syscallNo is None:
+		raise Exception("Setting the I/O priority is not supported on this architecture: " + repr(platform.machine()))
+
+	libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+	syscall = libc.syscall
+
+	def ioprio_set(ioprio:int):
+		if syscall(syscallNo, _IOPRIO_WHO_PROCESS, 0, ioprio) != 0:
+			raise OSError(ctypes.get_errno(), "ioprio_set() failed")
+	#
+
+	return ioprio_set
+#
+
+
+
+
+
+
+#
+# This class defines resource limits for a single command. The limits are applied in the child process before the program
+# is executed, so they only affect the command (and the processes it spawns itself).
+#
+# If cgroup limits are specified a transient cgroup v2 is created for the command below <c>cgroupParentDirPath</c>. This parent
+# must be a cgroup delegated to the current user that does not contain any processes itself and has the controllers "memory" and
+# "cpu" enabled in its <c>cgroup.subtree_control</c>. The cgroup is removed after the command has terminated.
+#
+# NOTE: Applying limits requires to run code in the child process before <c>exec()</c> (see <c>preexec_fn</c> of <c>subprocess.Popen</c>).
+# The Python documentation considers <c>preexec_fn</c> not to be safe in the presence of threads: after <c>fork()</c> the child only
+# contains the forking thread, so a lock held by another thread at that moment is never released in the child. As commands are
+# run from threads by <c>JobScheduler</c> and <c>ExecutionEngine</c> everything is prepared in the parent process: in the child
+# process no modules are imported, no files are opened and no Python locks are acquired, only the system calls setting the limits
+# are performed. As the interpreter itself still runs in the child (e.g. the garbage collector might be triggered) this reduces the risk
+# but does not eliminate it. Additionally <c>subprocess</c> cannot use <c>vfork()</c> if <c>preexec_fn</c> is specified, so starting
+# commands with resource limits is slower, especially for large parent processes.
+#
+class ResourceLimits(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int cpuSeconds				(optional) The maximum CPU time in seconds (RLIMIT_CPU). The command receives SIGXCPU if exceeded
+	#											and is killed one second later.
+	# @param		int addressSpace			(optional) The maximum size of the virtual address space in bytes (RLIMIT_AS).
+	# @param		int maxOpenFiles			(optional) The maximum number of open file descriptors (RLIMIT_NOFILE).
+	# @param		int nice					(optional) The nice value for the command (-20 .. 19). Please note that decreasing the nice value
+	#											requires privileges.
+	# @param		int ioniceClass				(optional) The I/O scheduling class: <c>IOPRIO_CLASS_REALTIME</c>, <c>IOPRIO_CLASS_BEST_EFFORT</c>
+	#											or <c>IOPRIO_CLASS_IDLE</c>.
+	# @param		int ioniceLevel				(optional) The I/O priority within the class (0 .. 7, default: 4).
+	# @param		str cgroupParentDirPath		(optional) The directory of a delegated cgroup v2 below which transient cgroups are created.
+	#											Required if <c>cgroupMemoryMax</c> or <c>cgroupCpuMax</c> is specified.
+	# @param		int cgroupMemoryMax			(optional) The maximum memory of the command's cgroup in bytes. If exceeded the OOM killer kills the command.
+	# @param		float cgroupCpuMax			(optional) The maximum CPU bandwidth in number of CPUs (e.g. 0.5 for half a CPU).
+	#
+	def __init__(self,
+			cpuSeconds:int = None,
+			addressSpace:int = None,
+			maxOpenFiles:int = None,
+			nice:int = None,
+			ioniceClass:int = None,
+			ioniceLevel:int = None,
+			cgroupParentDirPath:str = None,
+			cgroupMemoryMax:int = None,
+			cgroupCpuMax:float = None,
+		):
+
+		self.cpuSeconds = cpuSeconds
+		self.addressSpace = addressSpace
+		self.maxOpenFiles = maxOpenFiles
+		self.nice = nice
+		self.ioniceClass = ioniceClass
+		self.ioniceLevel = ioniceLevel
+		self.cgroupParentDirPath = cgroupParentDirPath
+		self.cgroupMemoryMax = cgroupMemoryMax
+		self.cgroupCpuMax = cgroupCpuMax
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def usesCGroup(self) -> bool:
+		return (self.cgroupMemoryMax is not None) or (self.cgroupCpuMax is not None)
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"cpuSeconds",
+			"addressSpace",
+			"maxOpenFiles",
+			"nice",
+			"ioniceClass",
+			"ioniceLevel",
+			"cgroupParentDirPath",
+			"cgroupMemoryMax",
+			"cgroupCpuMax",
+		]
+	#
+
+	#
+	# Create the transient cgroup for a command (if required).
+	#
+	def _createCGroup(self) -> typing.Union[_TransientCGroup,None]:
+		if not self.usesCGroup:
+			return None
+		if not self.cgroupParentDirPath:
+			raise Exception("cgroupParentDirPath is required for cgroup limits!")
+		return _TransientCGroup(self.cgroupParentDirPath, self.cgroupMemoryMax, self.cgroupCpuMax)
+	#
+
+	#
+	# Create the function to invoke in the child process before <c>exec()</c>. Everything that can be prepared is prepared here in the parent process.
+	#
+	# @return		callable				The function or <c>None</c> if there is nothing to apply (e.g. if the resource usage is only measured):
+	#										this way <c>subprocess</c> can use its fast way of starting the command.
+	#
+	def _createPreExecFunction(self, cgroup:typing.Union[_TransientCGroup,None]) -> typing.Union[typing.Callable,None]:
+		import resource
+
+		rlimits = []
+		if self.cpuSeconds is not None:
+			rlimits.append((resource.RLIMIT_CPU, (int(self.cpuSeconds), int(self.cpuSeconds) + 1)))
+		if self.addressSpace is not None:
+			rlimits.append((resource.RLIMIT_AS, (int(self.addressSpace), int(self.addressSpace))))
+		if self.maxOpenFiles is not None:
+			rlimits.append((resource.RLIMIT_NOFILE, (int(self.maxOpenFiles), int(self.maxOpenFiles))))
+
+		nice = self.nice
+
+		if self.ioniceClass is not None:
+			ioprio = (self.ioniceClass << _IOPRIO_CLASS_SHIFT) | (4 if self.ioniceLevel is None else self.ioniceLevel)
+			ioprio_set = _getIOPrioSetFunction()
+		else:
+			ioprio = None
+
+		if (cgroup is None) and not rlimits and (nice is None) and (ioprio is None):
+			return None
+
+		def preexec():
+			if cgroup is not None:
+				cgroup.enter()
+			for rlimitID, limits in rlimits:
+				resource.setrlimit(rlimitID, limits)
+			if nice is not None:
+				os.setpriority(os.PRIO_PROCESS, 0, nice)
+			if ioprio is not None:
+				ioprio_set(ioprio)
+		#
+
+		return preexec
+	#
+
+	#
+	# Build the <c>ResourceUsage</c> object for a terminated command.
+	#
+	# @param		int returnCode				(required) The return code as provided by <c>subprocess.Popen</c>: negative values indicate termination by a signal.
+	# @param		resource.struct_rusage rusage	(required) The resource usage as returned by <c>os.wait4()</c>.
+	# @param		_TransientCGroup cgroup		(optional) The cgroup of the command.
+	#
+	def _buildResourceUsage(self, returnCode:int, rusage, cgroup:typing.Union[_TransientCGroup,None]) -> ResourceUsage:
+		cgroupMemoryPeak = None
+		cgroupCpuTime = None
+		cgroupOOMKills = None
+		if cgroup is not None:
+			cgroupMemoryPeak, cgroupOOMKills, cgroupCpuTime = cgroup.readStats()
+
+		limitKillReason = None
+		if returnCode < 0:
+			sig = -returnCode
+			cpuTime = rusage.ru_utime + rusage.ru_stime
+			if cgroupOOMKills:
+				limitKillReason = "cgroupMemoryMax"
+			elif (self.cpuSeconds is not None) and ((sig == signal.SIGXCPU) or ((sig == signal.SIGKILL) and (cpuTime >= self.cpuSeconds))):
+				limitKillReason = "cpuSeconds"
+			elif (self.addressSpace is not None) and (sig in (signal.SIGSEGV, signal.SIGABRT, signal.SIGBUS)):
+				# failing allocations typically end this way; this can't be determined with certainty
+				limitKillReason = "addressSpace"
+
+		return ResourceUsage(
+			maxRSS=rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024,
+			userTime=rusage.ru_utime,
+			systemTime=rusage.ru_stime,
+			cgroupMemoryPeak=cgroupMemoryPeak,
+			cgroupCpuTime=cgroupCpuTime,
+			cgroupOOMKills=cgroupOOMKills,
+			limitKillReason=limitKillReason,
+		)
+	#
+
+#
+
+
+
@@ -0,0 +1,98 @@
+
+
+import typing
+
+import jk_prettyprintobj
+
+
+
+
+
+#
+# This class holds information about the resources a command has used. It is provided by <c>CommandResult.resourceUsage</c>
+# if resource limits have been specified for the command.
+#
+class ResourceUsage(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int maxRSS					(required) The peak resident set size in bytes.
+	# @param		float userTime				(required) The CPU time spent in user mode in seconds.
+	# @param		float systemTime			(required) The CPU time spent in kernel mode in seconds.
+	# @param		int cgroupMemoryPeak		(optional) The peak memory usage of the cgroup in bytes (if a cgroup was used and the kernel supports this).
+	# @param		float cgroupCpuTime			(optional) The CPU time consumed by all processes of the cgroup in seconds (if a cgroup was used).
+	# @param		int cgroupOOMKills			(optional) The number of processes killed by the OOM killer in the cgroup (if a cgroup was used).
+	# @param		str limitKillReason			(optional) If the command was terminated because of a resource limit the name of that limit.
+	#
+	def __init__(self,
+			maxRSS:int,
+			userTime:float,
+			systemTime:float,
+			cgroupMemoryPeak:int = None,
+			cgroupCpuTime:float = None,
+			cgroupOOMKills:int = None,
+			limitKillReason:str = None,
+		):
+
+		self.maxRSS = maxRSS
+		self.userTime = userTime
+		self.systemTime = systemTime
+		self.cgroupMemoryPeak = cgroupMemoryPeak
+		self.cgroupCpuTime = cgroupCpuTime
+		self.cgroupOOMKills = cgroupOOMKills
+		self.limitKillReason = limitKillReason
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The total CPU time in seconds.
+	#
+	@property
+	def cpuTime(self) -> float:
+		return self.userTime + self.systemTime
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"maxRSS",
+			"userTime",
+			"systemTime",
+			"cgroupMemoryPeak",
+			"cgroupCpuTime",
+			"cgroupOOMKills",
+			"limitKillReason",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def toJSON(self) -> dict:
+		return {
+			"maxRSS": self.maxRSS,
+			"userTime": self.userTime,
+			"systemTime": self.systemTime,
+			"cgroupMemoryPeak": self.cgroupMemoryPeak,
+			"cgroupCpuTime": self.cgroupCpuTime,
+			"cgroupOOMKills": self.cgroupOOMKills,
+			"limitKillReason": self.limitKillReason,
+		}
+	#
+
+#
+
+
+
@@ -0,0 +1,118 @@
+
+
+import re
+import random
+import typing
+
+import jk_prettyprintobj
+
+from .CommandResult import CommandResult
+
+
+
+
+
+#
+# This class defines if and when a job of a <c>JobScheduler</c> is to be retried after a failed attempt.
+#
+# An attempt is considered to be retryable if its return code is non-zero (or one of <c>retryOnReturnCodes</c> if specified)
+# or if <c>retryOnStdErrPattern</c> matches the STDERR output. Commands that have been cancelled are never retried.
+#
+# The delay before attempt <c>n + 1</c> is <c>min(maxDelay, initialDelay * backoffFactor ** (n - 1))</c>. With jitter this delay
+# is reduced by a random fraction of up to <c>jitter</c> so that jobs failing at the same time do not retry all at once.
+#
+class RetryPolicy(jk_prettyprintobj.DumpMixin):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int maxAttempts						(optional) The maximum number of attempts including the first one. (Default: 3)
+	# @param		int[] retryOnReturnCodes			(optional) The return codes that indicate a retryable failure. If <c>None</c> is specified
+	#													every non-zero return code is retryable. Specify an empty list to retry on STDERR matches only.
+	# @param		str|re.Pattern retryOnStdErrPattern	(optional) A regular expression. If it matches the STDERR output (via <c>re.search()</c>)
+	#													the attempt is retried, regardless of the return code.
+	# @param		float initialDelay					(optional) The delay in seconds before the first retry. (Default: 0.5)
+	# @param		float maxDelay						(optional) The maximum delay in seconds between two attempts. (Default: 30)
+	# @param		float backoffFactor					(optional) The factor the delay grows by with every attempt. (Default: 2)
+	# @param		float jitter						(optional) The maximum fraction (0 .. 1) the delay is randomly reduced by. (Default: 0.5)
+	#
+	def __init__(self,
+			maxAttempts:int = 3,
+			retryOnReturnCodes:typing.Iterable[int] = None,
+			retryOnStdErrPattern:typing.Union[str,typing.Pattern] = None,
+			initialDelay:float = 0.5,
+			maxDelay:float = 30,
+			backoffFactor:float = 2,
+			jitter:float = 0.5,
+		):
+
+		assert isinstance(maxAttempts, int)
+		assert maxAttempts >= 1
+		assert 0 <= jitter <= 1
+
+		self.maxAttempts = maxAttempts
+		self.retryOnReturnCodes = None if retryOnReturnCodes is None else frozenset(retryOnReturnCodes)
+		if isinstance(retryOnStdErrPattern, str):
+			retryOnStdErrPattern = re.compile(retryOnStdErrPattern)
+		self.retryOnStdErrPattern = retryOnStdErrPattern
+		self.initialDelay = initialDelay
+		self.maxDelay = maxDelay
+		self.backoffFactor = backoffFactor
+		self.jitter = jitter
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def _dumpVarNames(self) -> list:
+		return [
+			"maxAttempts",
+			"retryOnReturnCodes",
+			"retryOnStdErrPattern",
+			"initialDelay",
+			"maxDelay",
+			"backoffFactor",
+			"jitter",
+		]
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Check if the specified result of an attempt is a retryable failure. (This does not consider the number of attempts.)
+	#
+	def isRetryable(self, r:CommandResult) -> bool:
+		if r.limitKillReason == "cancelled":
+			return False
+		if r.returnCode != 0:
+			if (self.retryOnReturnCodes is None) or (r.returnCode in self.retryOnReturnCodes):
+				return True
+		if self.retryOnStdErrPattern is not None:
+			if self.retryOnStdErrPattern.search(r.stdErrStr):
+				return True
+		return False
+	#
+
+	#
+	# Get the delay in seconds to wait before the next attempt.
+	#
+	# @param		int attempt							(required) The number of attempts made so far (starting with 1).
+	#
+	def getDelay(self, attempt:int) -> float:
+		delay = min(self.maxDelay, self.initialDelay * (self.backoffFactor ** (attempt - 1)))
+		if self.jitter:
+			delay *= 1 - random.random() * self.jitter
+		return delay
+	#
+
+#
+
+
+
@@ -6,6 +6,7 @@ import jk_prettyprintobj
 
 
 
+
 #
 # This class defines the defaults for postpocessing text data recieved. 
 #
@@ -18,15 +19,27 @@ class TextDataProcessingPolicy(jk_prettyprintobj.DumpMixin):
 	#
 	# Constructor method.
 	#
+	# @param		bool bRemoveLeadingEmptyLines		(optional) Remove empty lines at the beginning of the output.
+	# @param		bool bRemoveTrailingEmptyLines		(optional) Remove empty lines at the end of the output.
+	# @param		bool bRightTrimLines				(optional) Remove trailing white space from every line.
+	# @param		str decodingErrors					(optional) How to handle data that is not valid UTF-8: "strict" (raise an exception),
+	#													"replace" (replace it by U+FFFD) or "surrogateescape" (keep the original bytes as lone surrogates).
+	#													The number of errors is provided by <c>CommandResult</c>.
+	#
 	def __init__(self,
 			bRemoveLeadingEmptyLines:bool = None,
 			bRemoveTrailingEmptyLines:bool = None,
 			bRightTrimLines:bool = None,
+			decodingErrors:str = None,
 		):
 
+		if decodingErrors is not None:
+			assert decodingErrors in ( "strict", "replace", "surrogateescape" )
+
 		self.bRightTrimLines = bRightTrimLines
 		self.bRemoveLeadingEmptyLines = bRemoveLeadingEmptyLines
 		self.bRemoveTrailingEmptyLines = bRemoveTrailingEmptyLines
+		self.decodingErrors = decodingErrors
 	#
 
 	################################################################################################################################
@@ -42,6 +55,7 @@ class TextDataProcessingPolicy(jk_prettyprintobj.DumpMixin):
 			"bRightTrimLines",
 			"bRemoveLeadingEmptyLines",
 			"bRemoveTrailingEmptyLines",
+			"decodingErrors",
 		]
 	#
 
@@ -54,6 +68,7 @@ class TextDataProcessingPolicy(jk_prettyprintobj.DumpMixin):
 			self.bRemoveLeadingEmptyLines,
 			self.bRemoveTrailingEmptyLines,
 			self.bRightTrimLines,
+			self.decodingErrors,
 		)
 	#
 
@@ -64,7 +79,7 @@ class TextDataProcessingPolicy(jk_prettyprintobj.DumpMixin):
 		assert isinstance(overrides, TextDataProcessingPolicy)
 
 		ret = self.clone()
-		for attrName in [ "bRemoveLeadingEmptyLines", "bRemoveTrailingEmptyLines", "bRightTrimLines" ]:
+		for attrName in [ "bRemoveLeadingEmptyLines", "bRemoveTrailingEmptyLines", "bRightTrimLines", "decodingErrors" ]:
 			v = getattr(overrides, attrName)
 			if v is not None:
 				setattr(ret, attrName, v)
@@ -0,0 +1,314 @@
+
+
+import io
+import mmap
+import array
+import itertools
+import collections.abc
+import typing
+
+from jk_cmdoutputparsinghelper.TextData import TextData
+from jk_cmdoutputparsinghelper.CharMatrix import CharMatrix
+
+from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from . import _common as _common
+
+
+
+
+# the amount of data decoded or indexed at once
+_BLOCK_SIZE = 1024 * 1024
+
+
+
+#
+# Check if a line consists of white space only (as <c>str.strip()</c> understands it).
+#
+def _isBlankLine(buf:mmap.mmap, start:int, end:int, errors:str) -> bool:
+	# most lines are identified by their first character already
+	head = buf[start:min(end, start + 64)].lstrip()
+	if head and (0x20 < head[0] < 0x80):
+		return False
+	return not str(buf[start:end], "utf-8", errors).strip()
+#
+
+#
+# Determine the range of the data that remains if leading and/or trailing empty lines are removed (as specified by the policy).
+# If lines are trimmed lines consisting of white space only are considered to be empty as well.
+#
+# @return		int				The position of the first character to keep.
+# @return		int				The position after the last character to keep.
+# @return		bool			<c>True</c> if no lines remain at all.
+#
+def _getRange(buf:mmap.mmap, policy:TextDataProcessingPolicy, errors:str) -> typing.Tuple[int,int,bool]:
+	if not policy.bRightTrimLines:
+		iFirst, iEnd = _common._getNonEmptyRange(buf, policy, 0x0a)
+		return iFirst, iEnd, (iFirst == iEnd) and (policy.bRemoveLeadingEmptyLines or policy.bRemoveTrailingEmptyLines)
+
+	iFirst = 0
+	iEnd = len(buf)
+	if policy.bRemoveTrailingEmptyLines:
+		while True:
+			j = buf.rfind(b"\n", iFirst, iEnd)
+			if not _isBlankLine(buf, j + 1 if j >= 0 else iFirst, iEnd, errors):
+				break
+			if j < 0:
+				return 0, 0, True
+			iEnd = j
+	if policy.bRemoveLeadingEmptyLines:
+		while True:
+			j = buf.find(b"\n", iFirst, iEnd)
+			if not _isBlankLine(buf, iFirst, j if j >= 0 else iEnd, errors):
+				break
+			if j < 0:
+				return 0, 0, True
+			iFirst = j + 1
+	return iFirst, iEnd, False
+#
+
+
+
+#
+# A read-only file object providing the data of a buffer without copying it as a whole.
+#
+class _BufferReader(io.RawIOBase):
+
+	def __init__(self, view:memoryview):
+		self.__view = view
+		self.__pos = 0
+	#
+
+	def readable(self) -> bool:
+		return True
+	#
+
+	def readinto(self, b) -> int:
+		n = min(len(b), len(self.__view) - self.__pos)
+		b[:n] = self.__view[self.__pos:self.__pos + n]
+		self.__pos += n
+		return n
+	#
+
+#
+
+
+
+#
+# The lines of a memory mapped output. Lines are decoded on access. For random access the offsets of the lines are determined
+# incrementally (8 bytes per line), iterating does not require an index at all.
+#
+class _MappedLines(collections.abc.Sequence):
+
+	def __init__(self, buf:mmap.mmap, iFirst:int, iEnd:int, bNoLines:bool, errors:str, bRightTrim:bool):
+		self.__buf = buf
+		self.__iFirst = iFirst
+		self.__iEnd = iEnd
+		self.__bNoLines = bNoLines
+		self.__errors = errors
+		self.__bRightTrim = bRightTrim
+
+		self.__offsets = array.array("Q")			# the start of every line indexed so far
+		if not bNoLines:
+			self.__offsets.append(iFirst)
+		self.__scanPos = iFirst
+	#
+
+	#
+	# Determine the end of a block of lines starting at <c>pos</c>.
+	#
+	def __getBlockEnd(self, pos:int) -> int:
+		blockEnd = pos + _BLOCK_SIZE
+		if blockEnd >= self.__iEnd:
+			return self.__iEnd
+		j = self.__buf.rfind(b"\n", pos, blockEnd)
+		if j < 0:
+			# a very long line
+			j = self.__buf.find(b"\n", blockEnd, self.__iEnd)
+		return self.__iEnd if j < 0 else j
+	#
+
+	#
+	# Index the lines of the next block.
+	#
+	# @return		bool			Returns <c>False</c> if all lines have been indexed already.
+	#
+	def __indexNextBlock(self) -> bool:
+		pos = self.__scanPos
+		if self.__bNoLines or (pos >= self.__iEnd):
+			return False
+		blockEnd = self.__getBlockEnd(pos)
+		if blockEnd < self.__iEnd:
+			# include the line feed: it starts the next line
+			blockEnd += 1
+		parts = self.__buf[pos:blockEnd].split(b"\n")
+		# every line feed starts a new line
+		parts.pop()
+		self.__offsets.extend(itertools.islice(itertools.accumulate(map((1).__add__, map(len, parts)), initial=pos), 1, None))
+		self.__scanPos = blockEnd
+		return True
+	#
+
+	def __decodeLine(self, i:int) -> str:
+		start = self.__offsets[i]
+		end = self.__offsets[i + 1] - 1 if i + 1 < len(self.__offsets) else self.__iEnd
+		line = str(self.__buf[start:end], "utf-8", self.__errors)
+		return line.rstrip() if self.__bRightTrim else line
+	#
+
+	def __len__(self) -> int:
+		while self.__indexNextBlock():
+			pass
+		return len(self.__offsets)
+	#
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [ self[i] for i in range(*index.indices(len(self))) ]
+		if index < 0:
+			index += len(self)
+		if index < 0:
+			raise IndexError("list index out of range")
+		# the line is complete only if the next line has been indexed as well (or the end of the data has been reached)
+		while (index + 1 >= len(self.__offsets)) and self.__indexNextBlock():
+			pass
+		if index >= len(self.__offsets):
+			raise IndexError("list index out of range")
+		return self.__decodeLine(index)
+	#
+
+	def __iter__(self) -> typing.Iterator[str]:
+		if self.__bNoLines:
+			return
+		pos = self.__iFirst
+		while True:
+			blockEnd = self.__getBlockEnd(pos)
+			lines = str(self.__buf[pos:blockEnd], "utf-8", self.__errors).split("\n")
+			yield from (map(str.rstrip, lines) if self.__bRightTrim else lines)
+			if blockEnd >= self.__iEnd:
+				return
+			pos = blockEnd + 1
+	#
+
+	def __eq__(self, other) -> bool:
+		if isinstance(other, (list, tuple, _MappedLines)):
+			return (len(self) == len(other)) and all(a == b for a, b in zip(self, other))
+		return NotImplemented
+	#
+
+	def __repr__(self) -> str:
+		return "<_MappedLines: " + str(len(self)) + " lines>"
+	#
+
+#
+
+
+
+#
+# The output of a command that has been spilled to disk (see <c>invokeCmd2(spillThreshold=...)</c>). The data remains memory mapped:
+#
+# * <c>lines</c> provides a read-only sequence of lines that are decoded on access (instead of a <c>LineList</c>).
+# * <c>text</c> decodes the whole output on every access (and does not cache it).
+# * <c>buffer</c> and <c>openReader()</c> provide the raw data without decoding it.
+#
+# The processing policy is applied the same way as for data in memory. Decoding errors are not counted.
+#
+class _MappedTextData(TextData):
+
+	__slots__ = (
+		"__buf",
+		"__iFirst",
+		"__iEnd",
+		"__bNoLines",
+		"__policy",
+		"__errors",
+		"__lines",
+	)
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		mmap.mmap buf						(required) The memory mapped output.
+	# @param		TextDataProcessingPolicy policy		(required) The processing policy.
+	#
+	def __init__(self, buf:mmap.mmap, policy:TextDataProcessingPolicy):
+		self.__buf = buf
+		self.__policy = policy
+		self.__errors = policy.decodingErrors or "replace"
+		self.__iFirst, self.__iEnd, self.__bNoLines = _getRange(buf, policy, self.__errors)
+		self.__lines = _MappedLines(buf, self.__iFirst, self.__iEnd, self.__bNoLines, self.__errors, bool(policy.bRightTrimLines))
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def lines(self) -> _MappedLines:
+		return self.__lines
+	#
+
+	@property
+	def text(self) -> str:
+		if self.__bNoLines:
+			return ""
+		if self.__policy.bRightTrimLines:
+			return "\n".join(self.__lines)
+		return str(self.buffer, "utf-8", self.__errors)
+	#
+
+	#
+	# The raw output (without leading and trailing empty lines if the policy specifies so, but without trimming lines).
+	#
+	@property
+	def buffer(self) -> memoryview:
+		return memoryview(self.__buf)[self.__iFirst:self.__iEnd]
+	#
+
+	@property
+	def size(self) -> int:
+		return self.__iEnd - self.__iFirst
+	#
+
+	@property
+	def decodingErrors(self) -> str:
+		return self.__errors
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Get a file object for reading the raw output (see <c>buffer</c>), e.g. for parsing it incrementally.
+	#
+	def openReader(self) -> io.BufferedReader:
+		return io.BufferedReader(_BufferReader(self.buffer), _BLOCK_SIZE)
+	#
+
+	def __str__(self):
+		return self.text
+	#
+
+	def __bool__(self):
+		if self.__bNoLines or (self.__iEnd == self.__iFirst):
+			return False
+		if not self.__policy.bRightTrimLines or (self.__buf.find(b"\n", self.__iFirst, self.__iEnd) >= 0):
+			return True
+		return not _isBlankLine(self.__buf, self.__iFirst, self.__iEnd, self.__errors)
+	#
+
+	def toCharMatrix(self) -> CharMatrix:
+		ret = CharMatrix()
+		for line in self.__lines:
+			ret.addRow(line)
+		return ret
+	#
+
+#
+
+
+
@@ -0,0 +1,88 @@
+
+
+import mmap
+import tempfile
+import typing
+
+
+
+
+#
+# Collects the output of a command. Up to a threshold the data is kept in memory. Beyond that the data is written to an anonymous
+# temporary file (created in the directory specified by <c>TMPDIR</c>) and finally provided as a read-only memory map.
+# This way the output never has to fit into a single <c>bytes</c> object.
+#
+class _SpillBuffer(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		int threshold			(required) The number of bytes to keep in memory at most.
+	#
+	def __init__(self, threshold:int):
+		assert isinstance(threshold, int)
+		assert threshold >= 0
+
+		self.__threshold = threshold
+		self.__chunks = []
+		self.__size = 0
+		self.__f = None
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def size(self) -> int:
+		return self.__size
+	#
+
+	@property
+	def isSpilled(self) -> bool:
+		return self.__f is not None
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def append(self, chunk:bytes):
+		self.__size += len(chunk)
+		if self.__f is not None:
+			self.__f.write(chunk)
+			return
+
+		self.__chunks.append(chunk)
+		if self.__size > self.__threshold:
+			self.__f = tempfile.TemporaryFile()
+			for c in self.__chunks:
+				self.__f.write(c)
+			self.__chunks = None
+	#
+
+	#
+	# Get the data collected.
+	#
+	# @return		bytes|mmap.mmap			The data in memory or a read-only memory map of the temporary file.
+	#
+	def getData(self) -> typing.Union[bytes,mmap.mmap]:
+		if self.__f is None:
+			return b"".join(self.__chunks)
+
+		self.__f.flush()
+		m = mmap.mmap(self.__f.fileno(), 0, access=mmap.ACCESS_READ)
+		# the mapping keeps the (already unlinked) file alive
+		self.__f.close()
+		self.__f = None
+		return m
+	#
+
+#
+
+
+
@@ -0,0 +1,114 @@
+
+
+import codecs
+import threading
+import typing
+
+
+
+
+ERROR_POLICIES = ( "strict", "replace", "surrogateescape" )
+
+# the decoder currently decoding in this thread: the error handlers have no other way to find out whose errors they are counting
+_current = threading.local()
+
+
+
+def _createCountingErrorHandler(baseErrorPolicy:str) -> str:
+	baseHandler = codecs.lookup_error(baseErrorPolicy)
+
+	def handler(ex:UnicodeDecodeError):
+		_current.decoder._nErrors += 1
+		return baseHandler(ex)
+	#
+
+	name = "jk_simpleexec-counting-" + baseErrorPolicy
+	codecs.register_error(name, handler)
+	return name
+#
+
+#
+# Maps the error policies to the names of the error handlers to use for decoding. Only "strict" does not need counting as the first
+# error raises an exception.
+#
+_ERROR_HANDLER_NAMES = {
+	"strict": "strict",
+	"replace": _createCountingErrorHandler("replace"),
+	"surrogateescape": _createCountingErrorHandler("surrogateescape"),
+}
+
+
+
+
+#
+# Decodes the output of a command, either at once or chunk by chunk as it is read. Multi-byte sequences split between two chunks are
+# handled properly and the number of decoding errors is counted.
+#
+# The error handler is invoked by the codec only for invalid data, so valid data is decoded at full speed and counting does not require
+# another pass over the data.
+#
+# Error policies:
+# * "strict" - raise a <c>UnicodeDecodeError</c> on invalid data
+# * "replace" - replace invalid data by U+FFFD
+# * "surrogateescape" - map invalid bytes to lone surrogates; encoding the text with "surrogateescape" reproduces the original data
+#
+# Other error handlers registered with <c>codecs</c> can be used as well but their errors are not counted.
+#
+class _TextDecoder(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str encoding				(optional) The encoding. (Default: "utf-8")
+	# @param		str errors					(optional) The error policy: "strict", "replace" or "surrogateescape". (Default: "replace")
+	#
+	def __init__(self, encoding:str = "utf-8", errors:str = "replace"):
+		# fail early: the codec looks up the error handler only if an error occurs
+		codecs.lookup_error(errors)
+
+		self.encoding = encoding
+		self.errors = errors
+		self._nErrors = 0
+		self.__decoder = codecs.getincrementaldecoder(encoding)(_ERROR_HANDLER_NAMES.get(errors, errors))
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	#
+	# The number of decoding errors that occurred so far (always 0 for the policy "strict" and for error handlers not known to this class).
+	#
+	@property
+	def nErrors(self) -> int:
+		return self._nErrors
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Decode the next chunk of data. An incomplete multi-byte sequence at the end is kept until the next chunk is decoded.
+	#
+	# @param		bytes data					(required) The data to decode.
+	# @param		bool bFinal					(optional) <c>True</c> if this is the last chunk: an incomplete sequence left over is an error then.
+	# @return		str							The text decoded.
+	#
+	def decode(self, data:typing.Union[bytes,bytearray,memoryview], bFinal:bool = False) -> str:
+		_current.decoder = self
+		return self.__decoder.decode(data, bFinal)
+	#
+
+	def reset(self):
+		self.__decoder.reset()
+	#
+
+#
+
+
+
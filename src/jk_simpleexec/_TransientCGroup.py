@@ -0,0 +1,135 @@
+
+
+import os
+import time
+import itertools
+import typing
+
+
+
+
+_counter = itertools.count()
+
+
+
+#
+# A cgroup v2 that is created for a single command and removed after the command has terminated.
+#
+# The cgroup is created below a delegated parent cgroup. As cgroup v2 does not allow processes in inner nodes that distribute
+# resources this parent must not contain any processes itself and the controllers "memory" and "cpu" must be enabled in its
+# <c>cgroup.subtree_control</c>.
+#
+class _TransientCGroup(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. This creates the cgroup.
+	#
+	# @param		str parentDirPath			(required) The directory of the delegated parent cgroup (e.g. "/sys/fs/cgroup/user.slice/.../jk_simpleexec").
+	# @param		int memoryMax				(optional) The maximum memory in bytes.
+	# @param		float cpuMax				(optional) The maximum CPU bandwidth in number of CPUs (e.g. 0.5 for half a CPU).
+	#
+	def __init__(self, parentDirPath:str, memoryMax:int = None, cpuMax:float = None):
+		assert isinstance(parentDirPath, str)
+		if not os.path.isfile(os.path.join(parentDirPath, "cgroup.subtree_control")):
+			raise Exception("Not a cgroup v2 directory: " + repr(parentDirPath))
+
+		self.dirPath = os.path.join(parentDirPath, "jk_simpleexec-" + str(os.getpid()) + "-" + str(next(_counter)))
+		os.mkdir(self.dirPath)
+
+		try:
+			if memoryMax is not None:
+				self.__write("memory.max", str(int(memoryMax)))
+				if os.path.isfile(os.path.join(self.dirPath, "memory.swap.max")):
+					# otherwise the limit would only be enforced after the swap space has been exhausted
+					self.__write("memory.swap.max", "0")
+			if cpuMax is not None:
+				period = 100000
+				self.__write("cpu.max", str(max(1000, int(cpuMax * period))) + " " + str(period))
+			# opened here so that the child process does not need to open a file before exec()
+			self.__procsFD = os.open(os.path.join(self.dirPath, "cgroup.procs"), os.O_WRONLY | os.O_CLOEXEC)
+		except:
+			os.rmdir(self.dirPath)
+			raise
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __write(self, fileName:str, value:str):
+		with open(os.path.join(self.dirPath, fileName), "w") as fout:
+			fout.write(value)
+	#
+
+	def __read(self, fileName:str) -> typing.Union[str,None]:
+		try:
+			with open(os.path.join(self.dirPath, fileName), "r") as fin:
+				return fin.read()
+		except OSError:
+			return None
+	#
+
+	def __readKeyValues(self, fileName:str) -> typing.Dict[str,int]:
+		ret = {}
+		s = self.__read(fileName)
+		if s:
+			for line in s.splitlines():
+				k, v = line.split(" ", 1)
+				ret[k] = int(v)
+		return ret
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Move the current process into this cgroup. This is invoked in the child process before <c>exec()</c> and performs a single system call.
+	#
+	def enter(self):
+		os.write(self.__procsFD, b"0")
+	#
+
+	#
+	# Read the statistics of this cgroup.
+	#
+	# @return		int			The peak memory usage in bytes (or <c>None</c> if not supported by the kernel).
+	# @return		int			The number of processes killed by the OOM killer.
+	# @return		float		The CPU time consumed in seconds.
+	#
+	def readStats(self) -> typing.Tuple[typing.Union[int,None],int,float]:
+		s = self.__read("memory.peak")
+		memoryPeak = int(s) if s else None
+		oomKills = self.__readKeyValues("memory.events").get("oom_kill", 0)
+		cpuUsage = self.__readKeyValues("cpu.stat").get("usage_usec", 0) / 1000000
+		return memoryPeak, oomKills, cpuUsage
+	#
+
+	#
+	# Remove the cgroup. Remaining processes (e.g. daemonized grandchildren) are killed.
+	#
+	def remove(self):
+		if self.__procsFD is not None:
+			os.close(self.__procsFD)
+			self.__procsFD = None
+		for _ in range(50):
+			try:
+				os.rmdir(self.dirPath)
+				return
+			except FileNotFoundError:
+				return
+			except OSError:
+				if os.path.isfile(os.path.join(self.dirPath, "cgroup.kill")):
+					self.__write("cgroup.kill", "1")
+				time.sleep(0.01)
+		raise Exception("Failed to remove cgroup: " + repr(self.dirPath))
+	#
+
+#
+
+
+
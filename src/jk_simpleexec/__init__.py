@@ -8,10 +8,28 @@ __version__ = "0.2024.8.11"
 
 from .CommandResult import CommandResult
 from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from .EnvSnapshot import EnvSnapshot
+from .ResourceUsage import ResourceUsage
+from .ResourceLimits import ResourceLimits, IOPRIO_CLASS_REALTIME, IOPRIO_CLASS_BEST_EFFORT, IOPRIO_CLASS_IDLE
+from .OutputForwarder import OutputForwarder
+from .OutputTimeline import OutputTimeline
+from .ErrorClassifier import ErrorClassifier
+from .CommandTemplate import CommandTemplate
 from ._DebugValveToFile import _DebugValveToFile
-from ._common import enableDebugging, DEFAULT_STDOUT_PROCESSING, DEFAULT_STDERR_PROCESSING, processCmdOutput
+from ._common import enableDebugging, enableRecording, enableReplay, disableRecording, DEFAULT_STDOUT_PROCESSING, DEFAULT_STDERR_PROCESSING, processCmdOutput
+from .CommandRecording import CommandRecording
 from .simpleexec import invokeCmd, invokeCmd1, invokeCmd2
-from .invoke_utils import runCmd
+from .FileTransferResult import FileTransferResult
+from .invoke_utils import runCmd, getFile, putFile
+from .pipeline import invokePipeline, transferData
+from .RetryPolicy import RetryPolicy
+from .Job import Job
+from .AdaptiveLimiter import AdaptiveLimiter
+from .JobScheduler import JobScheduler
+from .ExecutionEngine import ExecutionEngine
+from .batch import invokeAsCompleted, invokeFirst
+from .CommandResultLogWriter import CommandResultLogWriter
+from .CommandResultLogReader import CommandResultLogReader
 
 import os
 if os.name == "posix":
@@ -0,0 +1,186 @@
+
+
+#
+# Command line interface: run commands in parallel and report their results.
+#
+# Examples:
+#
+#	python3 -m jk_simpleexec -j 8 "ping -c 1 host1" "ping -c 1 host2"
+#	python3 -m jk_simpleexec -j 32 -t 10 -r 2 -f commands.txt --jsonl > results.jsonl
+#	python3 -m jk_simpleexec -n 100 -j 4 "/bin/true"
+#
+# Every command is split into arguments like a shell would do it (see <c>shlex</c>) but is executed without a shell unless
+# <c>--shell</c> is specified. Files with commands contain one command per line; empty lines and lines starting with "#" are ignored.
+#
+# By default a summary table with the duration percentiles of every command is written to STDOUT. With <c>--jsonl</c> a JSON record
+# is written for every result instead (in the format of <c>CommandResultLogWriter</c>, so it can be read with <c>CommandResultLogReader</c>).
+#
+# The exit status is 0 if all commands succeeded and 1 otherwise.
+#
+
+
+
+import os
+import sys
+import time
+import shlex
+import argparse
+import threading
+import typing
+
+from .RetryPolicy import RetryPolicy
+from .JobScheduler import JobScheduler
+from .Job import Job
+from . import _resultlog as _resultlog
+
+
+
+
+def _readCommandsFromFile(filePath:str) -> typing.List[str]:
+	if filePath == "-":
+		lines = sys.stdin.read().splitlines()
+	else:
+		with open(filePath, "r", encoding="utf-8") as fin:
+			lines = fin.read().splitlines()
+	return [ line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#") ]
+#
+
+
+
+def _percentile(sortedValues:typing.List[float], p:float) -> float:
+	return sortedValues[min(len(sortedValues) - 1, int(len(sortedValues) * p))]
+#
+
+
+
+#
+# Build the rows of the summary table.
+#
+def _buildSummary(commands:typing.List[str], jobsByCommand:typing.Dict[int,typing.List[Job]]) -> typing.List[typing.List[str]]:
+	rows = [
+		[ "command", "runs", "ok", "failed", "retries", "p50", "p90", "p99", "max" ],
+	]
+	for i, command in enumerate(commands):
+		jobs = jobsByCommand[i]
+		durations = sorted([ job.result.duration for job in jobs if job.result is not None ])
+		nOK = sum(1 for job in jobs if job.state == "succeeded")
+		row = [
+			command,
+			str(len(jobs)),
+			str(nOK),
+			str(len(jobs) - nOK),
+			str(sum(max(0, job.attempts - 1) for job in jobs)),
+		]
+		if durations:
+			row.extend("{:.3f}s".format(x) for x in [
+				_percentile(durations, 0.5),
+				_percentile(durations, 0.9),
+				_percentile(durations, 0.99),
+				durations[-1],
+			])
+		else:
+			row.extend([ "-" ] * 4)
+		rows.append(row)
+	return rows
+#
+
+def _printTable(rows:typing.List[typing.List[str]], printFunc = print):
+	widths = [ max(len(row[i]) for row in rows) for i in range(len(rows[0])) ]
+	for row in rows:
+		# left align the command, right align the numbers
+		cells = [ row[0].ljust(widths[0]) ] + [ cell.rjust(w) for cell, w in zip(row[1:], widths[1:]) ]
+		printFunc("  ".join(cells).rstrip())
+#
+
+
+
+def main(argv:typing.List[str] = None) -> int:
+	ap = argparse.ArgumentParser(prog="python3 -m jk_simpleexec", description="Run commands in parallel and report their results and durations.")
+	ap.add_argument("commands", nargs="*", help="The commands to run.")
+	ap.add_argument("-f", "--file", action="append", default=[], help="Read commands from this file, one per line (\"-\" for STDIN). Can be specified multiple times.")
+	ap.add_argument("-j", "--jobs", type=int, default=1, help="The number of commands to run in parallel. (Default: 1)")
+	ap.add_argument("-t", "--timeout", type=float, default=None, help="The maximum time in seconds a single attempt of a command may run.")
+	ap.add_argument("-r", "--retries", type=int, default=0, help="The number of times a failed command is retried. (Default: 0)")
+	ap.add_argument("--retry-delay", type=float, default=0.5, help="The initial delay in seconds before a retry; it doubles with every retry. (Default: 0.5)")
+	ap.add_argument("-n", "--repeat", type=int, default=1, help="Run every command this number of times (e.g. for benchmarking). (Default: 1)")
+	ap.add_argument("--shell", action="store_true", help="Run the commands with a shell.")
+	ap.add_argument("--jsonl", action="store_true", help="Write a JSON record for every result to STDOUT instead of the summary table.")
+	args = ap.parse_args(argv)
+
+	commands = list(args.commands)
+	for filePath in args.file:
+		commands.extend(_readCommandsFromFile(filePath))
+	if not commands:
+		ap.error("No commands specified!")
+	if args.jobs < 1:
+		ap.error("-j must be at least 1!")
+
+	invocations = []
+	for command in commands:
+		if args.shell:
+			if not command.strip():
+				ap.error("Empty command specified!")
+			invocations.append((command, None))
+		else:
+			try:
+				cmdArgs = shlex.split(command)
+			except ValueError as ee:
+				ap.error("Invalid command " + repr(command) + ": " + str(ee))
+			if not cmdArgs:
+				ap.error("Empty command specified!")
+			invocations.append((cmdArgs[0], cmdArgs[1:]))
+
+	retryPolicy = RetryPolicy(maxAttempts=args.retries + 1, initialDelay=args.retry_delay) if args.retries > 0 else None
+
+	outputLock = threading.Lock()
+	stdout = sys.stdout.buffer
+	stderr = sys.stderr
+	bStdOutClosed = False
+
+	def onDone(job:Job):
+		nonlocal bStdOutClosed
+
+		with outputLock:
+			if job.exception is not None:
+				stderr.write("ERROR: " + job._invokeArgs["cmdPath"] + ": " + str(job.exception) + "\n")
+			elif args.jsonl and (job.result is not None) and not bStdOutClosed:
+				try:
+					stdout.write(_resultlog.encodeJSONL(job.result))
+					stdout.flush()
+				except BrokenPipeError:
+					# e.g. piped to "head": the remaining records are dropped
+					bStdOutClosed = True
+	#
+
+	jobsByCommand = { i: [] for i in range(len(commands)) }
+	tStart = time.monotonic()
+	with JobScheduler(maxWorkers=args.jobs, defaultRetryPolicy=retryPolicy) as scheduler:
+		for _ in range(args.repeat):
+			for i, (cmdPath, cmdArgs) in enumerate(invocations):
+				job = scheduler.submit(cmdPath=cmdPath, cmdArgs=cmdArgs, shell=args.shell, timeout=args.timeout, onDone=onDone)
+				jobsByCommand[i].append(job)
+		scheduler.waitAll()
+		stats = scheduler.getStats()
+	tDuration = time.monotonic() - tStart
+
+	if bStdOutClosed:
+		# prevent another error when the interpreter flushes STDOUT at exit
+		os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+	if not args.jsonl:
+		_printTable(_buildSummary(commands, jobsByCommand))
+		print()
+		print("{} commands in {:.3f}s ({:.1f}/s), {} succeeded, {} failed, {} expired, {} retries".format(
+			stats["submitted"], tDuration, stats["submitted"] / tDuration if tDuration > 0 else 0.0,
+			stats["succeeded"], stats["failed"], stats["expired"], stats["retries"]))
+
+	return 0 if stats["succeeded"] == stats["submitted"] else 1
+#
+
+
+
+if __name__ == "__main__":
+	sys.exit(main())
+
+
+
@@ -3,17 +3,22 @@
 
 
 
-from jk_cmdoutputparsinghelper.TextData import TextData
+import typing
 
 from .TextDataProcessingPolicy import TextDataProcessingPolicy
 from ._DebugValveToFile import _DebugValveToFile
+from ._TextDecoder import _TextDecoder
 
+if typing.TYPE_CHECKING:
+	from jk_cmdoutputparsinghelper.TextData import TextData
+	from .CommandRecording import CommandRecording
 
 
 
 
-DEFAULT_STDOUT_PROCESSING = TextDataProcessingPolicy(True, True, True)
-DEFAULT_STDERR_PROCESSING = TextDataProcessingPolicy(True, True, True)
+
+DEFAULT_STDOUT_PROCESSING = TextDataProcessingPolicy(True, True, True, "replace")
+DEFAULT_STDERR_PROCESSING = TextDataProcessingPolicy(True, True, True, "replace")
 
 
 
@@ -32,16 +37,127 @@ def enableDebugging(debuggingFilePath:str):
 
 
 
+commandRecording = None
+
+#
+# Record the results of all commands run by <c>invokeCmd2()</c> and <c>runCmd()</c> (see <c>CommandRecording</c>).
+#
+# @param		str filePath				(required) The path of the recording file. Results are appended if the file already exists.
+# @param		str compression				(optional) <c>None</c> (default), "gzip" or "zstd".
+# @return		CommandRecording			The active recording. Close it (or use it as context manager) to stop recording.
+#
+def enableRecording(filePath:str, compression:str = None) -> "CommandRecording":
+	from .CommandRecording import CommandRecording
+	global commandRecording
+
+	disableRecording()
+	commandRecording = CommandRecording(filePath, "record", compression=compression)
+	return commandRecording
+#
+
+#
+# Serve recorded results instead of running commands by <c>invokeCmd2()</c> and <c>runCmd()</c> (see <c>CommandRecording</c>).
+#
+# @param		str filePath				(required) The path of the recording file.
+# @param		float simulateDuration		(optional) If specified serving a result takes the recorded duration multiplied by this factor.
+# @param		bool passThrough			(optional) If <c>True</c> commands not recorded are run. Otherwise (default) an exception is raised.
+# @return		CommandRecording			The active recording. Close it (or use it as context manager) to stop replaying.
+#
+def enableReplay(filePath:str, simulateDuration:float = None, passThrough:bool = False) -> "CommandRecording":
+	from .CommandRecording import CommandRecording
+	global commandRecording
+
+	disableRecording()
+	commandRecording = CommandRecording(filePath, "replay", simulateDuration=simulateDuration, passThrough=passThrough)
+	return commandRecording
+#
+
+def disableRecording():
+	if commandRecording is not None:
+		commandRecording.close()
+#
+
+
+
+
 
-def processCmdOutput(textData:str, policy:TextDataProcessingPolicy) -> TextData:
-	textData = TextData(textData)
 
-	if policy.bRightTrimLines:
-		textData.lines.rightTrimAllLines()
+#
+# Determine the range of the data that remains if leading and/or trailing empty lines are removed (as specified by the policy).
+# Only the empty regions at both ends of the data are inspected.
+#
+# @param		str|bytes data						(required) The data.
+# @param		TextDataProcessingPolicy policy		(required) The processing policy.
+# @param		str|int lineFeed					(required) The line feed as it is returned by <c>data[i]</c>.
+# @return		int									The position of the first character to keep.
+# @return		int									The position after the last character to keep.
+#
+def _getNonEmptyRange(data:typing.Union[str,bytes,bytearray], policy:TextDataProcessingPolicy, lineFeed:typing.Union[str,int]) -> typing.Tuple[int,int]:
+	iFirst = 0
+	iEnd = len(data)
 	if policy.bRemoveLeadingEmptyLines:
-		textData.lines.removeLeadingEmptyLines()
+		while (iFirst < iEnd) and (data[iFirst] == lineFeed):
+			iFirst += 1
+	if policy.bRemoveTrailingEmptyLines:
+		while (iEnd > iFirst) and (data[iEnd - 1] == lineFeed):
+			iEnd -= 1
+	return iFirst, iEnd
+#
+
+#
+# Postprocess the output of a command according to the specified policy.
+#
+# The result is the same as wrapping the data in a <c>TextData</c> object and applying <c>rightTrimAllLines()</c>,
+# <c>removeLeadingEmptyLines()</c> and <c>removeTrailingEmptyLines()</c> on its lines, but the data is processed in bulk:
+#
+# * If no trimming is required the data is not split into lines at all. (<c>TextData</c> will do that on demand.)
+#   Leading and trailing empty lines are cut off the raw buffer before decoding.
+# * Trimming is performed by a single C level pass over all lines (<c>map(str.rstrip)</c>).
+# * Empty lines are removed by only looking at both ends of the data and removing each region in a single step.
+#
+# @param		str|bytes textData					(required) The output to process. Binary data is decoded using UTF-8 according to
+#													<c>policy.decodingErrors</c>.
+# @param		TextDataProcessingPolicy policy		(required) The processing policy.
+# @param		_TextDecoder decoder				(optional) The decoder to use for binary data. Specify one if you need the number of decoding errors.
+# @return		TextData							The processed data.
+#
+def processCmdOutput(textData:typing.Union[str,bytes,bytearray], policy:TextDataProcessingPolicy, decoder:_TextDecoder = None) -> "TextData":
+	from jk_cmdoutputparsinghelper.TextData import TextData
+
+	bIsBinary = isinstance(textData, (bytes, bytearray))
+	if bIsBinary and (decoder is None):
+		decoder = _TextDecoder(errors=policy.decodingErrors or "replace")
+
+	if not policy.bRightTrimLines:
+		# no need to split the data into lines: leading and trailing empty lines are just line feeds at both ends
+		iFirst, iEnd = _getNonEmptyRange(textData, policy, 0x0a if bIsBinary else "\n")
+		if bIsBinary:
+			textData = decoder.decode(memoryview(textData)[iFirst:iEnd], True)
+		elif (iFirst > 0) or (iEnd < len(textData)):
+			textData = textData[iFirst:iEnd]
+
+		if not textData and (policy.bRemoveLeadingEmptyLines or policy.bRemoveTrailingEmptyLines):
+			# all lines have been removed: this is an empty list of lines, not a single empty line
+			return TextData([])
+		return TextData(textData)
+
+	if bIsBinary:
+		textData = decoder.decode(textData, True)
+
+	textData = TextData(textData)
+	lines = textData.lines
+	lines[:] = map(str.rstrip, lines)
+
 	if policy.bRemoveTrailingEmptyLines:
-		textData.lines.removeTrailingEmptyLines()
+		iEnd = len(lines)
+		while iEnd and not lines[iEnd - 1]:
+			iEnd -= 1
+		del lines[iEnd:]
+	if policy.bRemoveLeadingEmptyLines:
+		iFirst = 0
+		while (iFirst < len(lines)) and not lines[iFirst]:
+			iFirst += 1
+		del lines[:iFirst]
 
 	return textData
 #
@@ -58,3 +174,4 @@ def processCmdOutput(textData:str, policy:TextDataProcessingPolicy) -> TextData:
 
 
 
+
@@ -0,0 +1,229 @@
+
+
+import os
+import time
+import selectors
+import subprocess
+import threading
+import typing
+
+from ._SpillBuffer import _SpillBuffer
+
+
+
+_READ_SIZE = 65536
+_WRITE_SIZE = 65536
+
+# the interval in seconds a cancel event is polled
+_CANCEL_POLL_INTERVAL = 0.05
+
+# the time in seconds to wait for the pipes to be closed after the child process has been killed: a grandchild might still hold them open
+_KILL_GRACE_PERIOD = 1.0
+
+
+
+#
+# Convert a wait status to a return code the way <c>subprocess.Popen</c> does: negative values indicate termination by a signal.
+# (<c>os.waitstatus_to_exitcode()</c> is not available before Python 3.9.)
+#
+def waitStatusToReturnCode(status:int) -> int:
+	if os.WIFSIGNALED(status):
+		return -os.WTERMSIG(status)
+	return os.WEXITSTATUS(status)
+#
+
+
+
+#
+# Create the function that receives the chunks read from a pipe: without a forwarder, a timeline and a matcher the chunks are just collected.
+#
+# @return		callable			The function to invoke with each chunk.
+# @return		OutputForwarder		The forwarder (or <c>None</c>).
+#
+def _createSink(chunks:list, forwarder, timeline, streamID:int, matcher = None) -> tuple:
+	if matcher is not None:
+		innerSink, forwarder = _createSink(chunks, forwarder, timeline, streamID)
+
+		def sink(chunk:bytes):
+			innerSink(chunk)
+			matcher.feed(chunk)
+		#
+
+		return (sink, forwarder)
+
+	if timeline is None:
+		if forwarder is None:
+			return (chunks.append, None)
+
+		def sink(chunk:bytes):
+			chunks.append(chunk)
+			forwarder._feed(chunk)
+		#
+
+	else:
+		if forwarder is None:
+
+			def sink(chunk:bytes):
+				timeline._record(streamID, len(chunk))
+				chunks.append(chunk)
+			#
+
+		else:
+
+			def sink(chunk:bytes):
+				timeline._record(streamID, len(chunk))
+				chunks.append(chunk)
+				forwarder._feed(chunk)
+			#
+
+	return (sink, forwarder)
+#
+
+
+
+#
+# Exchange data with a child process and wait for its termination. This is the equivalent to <c>Popen.communicate()</c> but the
+# pipes are multiplexed by this function and the child process is reaped using <c>os.wait4()</c> in order to retrieve its
+# resource usage. Additionally the child process is killed if a timeout occurs or if cancellation is requested.
+#
+# @param		subprocess.Popen p					(required) The child process. STDOUT and STDERR must be pipes. If data is to be written STDIN must be a pipe as well.
+# @param		bytes dataToPipeAsStdIn				(optional) The data to write to STDIN. STDIN is closed after all data has been written.
+# @param		float timeout						(optional) The maximum time in seconds the child process may run.
+# @param		threading.Event cancelEvent			(optional) If this event is set the child process is killed.
+# @param		OutputForwarder stdOutForwarder		(optional) Receives the data read from STDOUT immediately.
+# @param		OutputForwarder stdErrForwarder		(optional) Receives the data read from STDERR immediately.
+# @param		OutputTimeline timeline				(optional) Records the time of arrival of every chunk read.
+# @param		int spillThreshold					(optional) If the output of a stream exceeds this number of bytes it is written to a temporary file
+#													and returned as memory map.
+# @param		_ErrorMatcher stdErrMatcher			(optional) Classifies the data read from STDERR. If it reports a fatal match the child process is killed.
+# @return		bytes|mmap.mmap						The data read from STDOUT.
+# @return		bytes|mmap.mmap						The data read from STDERR.
+# @return		resource.struct_rusage				The resource usage of the child process.
+# @return		str									If the child process has been killed the reason for this ("timeout", "cancelled" or "fatalError"), <c>None</c> otherwise.
+#
+def communicate(
+		p:subprocess.Popen,
+		dataToPipeAsStdIn:typing.Union[bytes,bytearray,None] = None,
+		timeout:float = None,
+		cancelEvent:threading.Event = None,
+		stdOutForwarder = None,
+		stdErrForwarder = None,
+		timeline = None,
+		spillThreshold:int = None,
+		stdErrMatcher = None,
+	) -> tuple:
+
+	if spillThreshold is None:
+		stdOutChunks = []
+		stdErrChunks = []
+	else:
+		# these provide append() as well
+		stdOutChunks = _SpillBuffer(spillThreshold)
+		stdErrChunks = _SpillBuffer(spillThreshold)
+	killReason = None
+	tDeadline = None if timeout is None else time.monotonic() + timeout
+
+	try:
+		with selectors.DefaultSelector() as sel:
+			if p.stdin is not None:
+				if dataToPipeAsStdIn:
+					os.set_blocking(p.stdin.fileno(), False)
+					sel.register(p.stdin.fileno(), selectors.EVENT_WRITE, memoryview(dataToPipeAsStdIn))
+				else:
+					p.stdin.close()
+			sel.register(p.stdout.fileno(), selectors.EVENT_READ, _createSink(stdOutChunks, stdOutForwarder, timeline, 1))
+			sel.register(p.stderr.fileno(), selectors.EVENT_READ, _createSink(stdErrChunks, stdErrForwarder, timeline, 2, stdErrMatcher))
+
+			while sel.get_map():
+				selectTimeout = None
+				if tDeadline is not None:
+					selectTimeout = tDeadline - time.monotonic()
+					if selectTimeout <= 0:
+						if killReason is None:
+							killReason = "timeout"
+							p.kill()
+							tDeadline = time.monotonic() + _KILL_GRACE_PERIOD
+							continue
+						break
+				if (cancelEvent is not None) and (killReason is None):
+					if cancelEvent.is_set():
+						killReason = "cancelled"
+						p.kill()
+						tDeadline = time.monotonic() + _KILL_GRACE_PERIOD
+						continue
+					if (selectTimeout is None) or (selectTimeout > _CANCEL_POLL_INTERVAL):
+						selectTimeout = _CANCEL_POLL_INTERVAL
+				if (stdErrMatcher is not None) and (stdErrMatcher.fatalMatch is not None) and (killReason is None):
+					killReason = "fatalError"
+					p.kill()
+					tDeadline = time.monotonic() + _KILL_GRACE_PERIOD
+					continue
+
+				for key, events in sel.select(selectTimeout):
+					if events & selectors.EVENT_WRITE:
+						data = key.data
+						try:
+							n = os.write(key.fd, data[:_WRITE_SIZE])
+						except BlockingIOError:
+							continue
+						except BrokenPipeError:
+							n = len(data)
+						data = data[n:]
+						if data:
+							sel.modify(key.fd, selectors.EVENT_WRITE, data)
+						else:
+							sel.unregister(key.fd)
+							p.stdin.close()
+					else:
+						chunk = os.read(key.fd, _READ_SIZE)
+						if chunk:
+							key.data[0](chunk)
+						else:
+							sel.unregister(key.fd)
+							if key.data[1] is not None:
+								key.data[1]._close()
+
+			# pipes still open after the grace period
+			for key in list(sel.get_map().values()):
+				if (key.events & selectors.EVENT_READ) and (key.data[1] is not None):
+					key.data[1]._close()
+	except BaseException:
+		# a forwarder, a strict decoder or the matcher failed: do not leave the child process running unreaped
+		p.kill()
+		for f in (p.stdin, p.stdout, p.stderr):
+			if f is not None:
+				try:
+					f.close()
+				except OSError:
+					pass
+		_, status, _ = os.wait4(p.pid, 0)
+		p.returncode = waitStatusToReturnCode(status)
+		raise
+
+	if (p.stdin is not None) and not p.stdin.closed:
+		try:
+			p.stdin.close()
+		except BrokenPipeError:
+			pass
+	p.stdout.close()
+	p.stderr.close()
+	if stdErrMatcher is not None:
+		stdErrMatcher.close()
+
+	_, status, rusage = os.wait4(p.pid, 0)
+	p.returncode = waitStatusToReturnCode(status)
+
+	if spillThreshold is None:
+		stdOut = b"".join(stdOutChunks)
+		stdErr = b"".join(stdErrChunks)
+	else:
+		stdOut = stdOutChunks.getData()
+		stdErr = stdErrChunks.getData()
+	if timeline is not None:
+		timeline._finish(stdOut, stdErr)
+
+	return stdOut, stdErr, rusage, killReason
+#
+
+
+
@@ -0,0 +1,311 @@
+
+
+#
+# Implementation of <c>getFile()</c> and <c>putFile()</c> for fabric connections.
+#
+# A file is split into chunks that are transferred by multiple workers in parallel. Every worker uses a SFTP session of its own
+# (all sessions share the same SSH connection) and pipelines its requests: reads are prefetched, writes are not acknowledged one by one.
+# The data is written to "<destination>.part" which is renamed after the transfer has completed (and has been verified).
+#
+# The chunks completed are recorded in a journal file: for downloads next to the local "<destination>.part", for uploads in a private
+# directory of the current user within the temporary directory. If a transfer is interrupted and started again with the same
+# arguments only the missing chunks are transferred, provided the source file did not change in between.
+#
+
+
+
+import os
+import json
+import stat
+import time
+import shlex
+import hashlib
+import tempfile
+import threading
+import typing
+
+from .FileTransferResult import FileTransferResult
+
+
+
+
+_BLOCK_SIZE = 1024 * 1024
+
+
+
+#
+# Records the chunks of a transfer that have been completed.
+#
+class _Journal(object):
+
+	def __init__(self, filePath:str, header:dict):
+		self.filePath = filePath
+		self.header = header
+		self.__f = None
+		self.__lock = threading.Lock()
+	#
+
+	#
+	# Load the indices of the chunks completed by a previous transfer. If there is no journal or it belongs to a different
+	# version of the source file an empty set is returned.
+	#
+	def load(self) -> typing.Set[int]:
+		try:
+			with open(os.open(self.filePath, os.O_RDONLY | os.O_NOFOLLOW), "r", encoding="utf-8") as fin:
+				lines = fin.read().split("\n")
+		except FileNotFoundError:
+			return set()
+		try:
+			if json.loads(lines[0]) != self.header:
+				return set()
+			# the last line might be incomplete
+			return set(int(x) for x in lines[1:-1])
+		except ValueError:
+			return set()
+	#
+
+	def open(self, doneIndices:typing.Set[int]):
+		# never follow a symbolic link planted at the location of the journal
+		self.__f = open(os.open(self.filePath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_NOFOLLOW, 0o600), "w", encoding="utf-8")
+		self.__f.write(json.dumps(self.header, sort_keys=True) + "\n")
+		for i in sorted(doneIndices):
+			self.__f.write(str(i) + "\n")
+		self.__f.flush()
+	#
+
+	def markDone(self, index:int):
+		with self.__lock:
+			self.__f.write(str(index) + "\n")
+			self.__f.flush()
+	#
+
+	def close(self):
+		if self.__f is not None:
+			self.__f.close()
+			self.__f = None
+	#
+
+	def remove(self):
+		self.close()
+		try:
+			os.unlink(self.filePath)
+		except FileNotFoundError:
+			pass
+	#
+
+#
+
+
+
+#
+# Get the directory for the journals of uploads: a directory within the temporary directory that is accessible by the current user only.
+#
+def _getPrivateTempDirPath() -> str:
+	dirPath = os.path.join(tempfile.gettempdir(), "jk_simpleexec-" + str(os.getuid()))
+	try:
+		os.mkdir(dirPath, 0o700)
+	except FileExistsError:
+		pass
+	st = os.lstat(dirPath)
+	if not stat.S_ISDIR(st.st_mode) or (st.st_uid != os.getuid()) or (stat.S_IMODE(st.st_mode) & 0o077):
+		raise Exception("Insecure temporary directory: " + repr(dirPath))
+	return dirPath
+#
+
+
+
+def _calcLocalSHA256(filePath:str) -> str:
+	h = hashlib.sha256()
+	with open(filePath, "rb") as fin:
+		while True:
+			block = fin.read(_BLOCK_SIZE)
+			if not block:
+				break
+			h.update(block)
+	return h.hexdigest()
+#
+
+def _calcRemoteSHA256(c, filePath:str) -> str:
+	from .invoke_utils import runCmd
+
+	r = runCmd(c, "sha256sum -- " + shlex.quote(filePath))
+	return r.stdOutLines[0].split()[0].lstrip("\\")
+#
+
+
+
+def _getChunk(sftp, remoteFilePath:str, localFile, start:int, size:int):
+	with sftp.open(remoteFilePath, "rb") as fin:
+		blocks = [ (offset, min(_BLOCK_SIZE, start + size - offset)) for offset in range(start, start + size, _BLOCK_SIZE) ]
+		localFile.seek(start)
+		for data in fin.readv(blocks):
+			localFile.write(data)
+	localFile.flush()
+#
+
+def _putChunk(sftp, remoteFilePath:str, localFile, start:int, size:int):
+	with sftp.open(remoteFilePath, "r+b") as fout:
+		fout.set_pipelined(True)
+		fout.seek(start)
+		localFile.seek(start)
+		remaining = size
+		while remaining > 0:
+			data = localFile.read(min(_BLOCK_SIZE, remaining))
+			if not data:
+				raise Exception("Local file has been truncated during the transfer!")
+			fout.write(data)
+			remaining -= len(data)
+	# closing the remote file waits for all outstanding write requests
+#
+
+
+
+#
+# Transfer a file.
+#
+# @param		fabric.Connection c			(required) The connection.
+# @param		bool bGet					(required) <c>True</c> to download a file, <c>False</c> to upload a file.
+# @param		str sourceFilePath			(required) The path of the source file.
+# @param		str destinationFilePath		(required) The path of the destination file.
+# @param		int chunkSize				(required) The size of the chunks.
+# @param		int nParallel				(required) The maximum number of chunks to transfer in parallel.
+# @param		bool bVerify				(required) Compare the SHA-256 checksums of the source and the destination file.
+# @param		bool bResume				(required) Resume an interrupted transfer.
+#
+def transfer(
+		c,
+		bGet:bool,
+		sourceFilePath:str,
+		destinationFilePath:str,
+		chunkSize:int,
+		nParallel:int,
+		bVerify:bool,
+		bResume:bool,
+	) -> FileTransferResult:
+
+	assert chunkSize > 0
+	assert nParallel >= 1
+
+	tStart = time.time()
+	sftp = c.sftp()
+	partFilePath = destinationFilePath + ".part"
+
+	if bGet:
+		st = sftp.stat(sourceFilePath)
+	else:
+		st = os.stat(sourceFilePath)
+	fileSize = st.st_size
+	chunks = [ (i, start, min(chunkSize, fileSize - start)) for i, start in enumerate(range(0, fileSize, chunkSize)) ]
+
+	if bGet:
+		journalFilePath = partFilePath + ".journal"
+	else:
+		# the part file is a remote file
+		key = "\n".join([ str(getattr(c, "host", "")), str(getattr(c, "port", "")), sourceFilePath, destinationFilePath ])
+		journalFilePath = os.path.join(_getPrivateTempDirPath(), "transfer-" + hashlib.sha1(key.encode("utf-8")).hexdigest() + ".journal")
+	journal = _Journal(journalFilePath, { "size": fileSize, "mtime": int(st.st_mtime), "chunkSize": chunkSize })
+
+	# prepare the destination file
+
+	doneIndices = set()
+	if bResume:
+		try:
+			partSize = sftp.stat(partFilePath).st_size if not bGet else os.path.getsize(partFilePath)
+		except (OSError, IOError):
+			partSize = None
+		if partSize == fileSize:
+			doneIndices = journal.load()
+
+	if not doneIndices:
+		if bGet:
+			with open(partFilePath, "wb") as fout:
+				fout.truncate(fileSize)
+		else:
+			with sftp.open(partFilePath, "wb") as fout:
+				fout.truncate(fileSize)
+
+	remainingChunks = [ x for x in chunks if x[0] not in doneIndices ]
+	bytesTransferred = sum(x[2] for x in remainingChunks)
+
+	# transfer the chunks
+
+	journal.open(doneIndices)
+	try:
+		lock = threading.Lock()
+		chunkIterator = iter(remainingChunks)
+		errors = []
+
+		def worker(bFirst:bool):
+			sftpSession = sftp if bFirst else c.client.open_sftp()
+			try:
+				with open(partFilePath if bGet else sourceFilePath, "r+b" if bGet else "rb") as localFile:
+					while True:
+						with lock:
+							if errors:
+								return
+							x = next(chunkIterator, None)
+						if x is None:
+							return
+						i, start, size = x
+						if bGet:
+							_getChunk(sftpSession, sourceFilePath, localFile, start, size)
+						else:
+							_putChunk(sftpSession, partFilePath, localFile, start, size)
+						journal.markDone(i)
+			except BaseException as ee:
+				with lock:
+					errors.append(ee)
+			finally:
+				if not bFirst:
+					sftpSession.close()
+		#
+
+		nWorkers = min(nParallel, len(remainingChunks))
+		threads = [ threading.Thread(target=worker, args=(False,), daemon=True) for i in range(1, nWorkers) ]
+		for t in threads:
+			t.start()
+		if nWorkers > 0:
+			worker(True)
+		for t in threads:
+			t.join()
+		if errors:
+			raise errors[0]
+	finally:
+		journal.close()
+
+	# verify
+
+	sha256 = None
+	if bVerify:
+		if bGet:
+			sha256 = _calcLocalSHA256(partFilePath)
+			sha256Source = _calcRemoteSHA256(c, sourceFilePath)
+		else:
+			sha256 = _calcRemoteSHA256(c, partFilePath)
+			sha256Source = _calcLocalSHA256(sourceFilePath)
+		if sha256 != sha256Source:
+			# the partial data can't be trusted: start from scratch next time
+			journal.remove()
+			raise Exception("Checksum mismatch after transferring " + repr(sourceFilePath) + " to " + repr(destinationFilePath) + "!")
+
+	# move the file into place
+
+	if bGet:
+		os.replace(partFilePath, destinationFilePath)
+	else:
+		try:
+			sftp.posix_rename(partFilePath, destinationFilePath)
+		except IOError:
+			# the server does not support the posix-rename extension
+			try:
+				sftp.remove(destinationFilePath)
+			except IOError:
+				pass
+			sftp.rename(partFilePath, destinationFilePath)
+	journal.remove()
+
+	return FileTransferResult(sourceFilePath, destinationFilePath, fileSize, bytesTransferred, len(chunks), time.time() - tStart, sha256)
+#
+
+
+
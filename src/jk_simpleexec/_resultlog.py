@@ -0,0 +1,334 @@
+
+
+#
+# Encoding and decoding of <c>CommandResult</c> records for <c>CommandResultLogWriter</c> and <c>CommandResultLogReader</c>.
+#
+# Binary log files start with <c>MAGIC</c> followed by a single byte identifying the compression. Then records follow, each consisting
+# of the length of the (compressed) payload as unsigned 64 bit little endian integer and the payload. Every record is compressed on its
+# own so that single records can be read without reading anything else.
+#
+# JSON Lines files contain one JSON object per line. STDOUT and STDERR are stored as a single string each instead of a list of lines.
+#
+# For both formats an index file (the path of the log file with ".idx" appended) can be maintained that contains the offsets of all
+# records as unsigned 64 bit little endian integers.
+#
+
+
+
+import sys
+import array
+import struct
+import typing
+
+from .CommandResult import CommandResult
+from .ResourceUsage import ResourceUsage
+
+
+
+
+MAGIC = b"JKSXLOG1"
+
+COMPRESSION_IDS = {
+	None: 0,
+	"gzip": 1,
+	"zstd": 2,
+}
+COMPRESSION_NAMES = { v: k for k, v in COMPRESSION_IDS.items() }
+
+LENGTH = struct.Struct("<Q")
+
+# returnCode, duration, length of cmd, length of cmdArgs JSON, length of extra JSON, number of STDOUT lines, number of STDERR lines, length of STDOUT, length of STDERR
+_RECORD_HEADER = struct.Struct("<idIIIIIQQ")
+
+INDEX_FILE_EXTENSION = ".idx"
+
+
+
+def getZstdModule():
+	try:
+		import zstandard
+	except ImportError:
+		raise Exception("zstandard module is required for zstd compression to work!")
+	return zstandard
+#
+
+
+
+#
+# Create the functions to compress and decompress record payloads.
+#
+def createCodec(compression:typing.Union[str,None], compressionLevel:int = None) -> typing.Tuple[typing.Callable,typing.Callable]:
+	if compression is None:
+		return None, None
+
+	if compression == "gzip":
+		import gzip
+		level = 6 if compressionLevel is None else compressionLevel
+		return (lambda data: gzip.compress(data, level, mtime=0)), gzip.decompress
+
+	if compression == "zstd":
+		zstandard = getZstdModule()
+		compressor = zstandard.ZstdCompressor(level=3 if compressionLevel is None else compressionLevel)
+		decompressor = zstandard.ZstdDecompressor()
+		return compressor.compress, decompressor.decompress
+
+	raise Exception("Unknown compression: " + repr(compression))
+#
+
+
+
+def _joinLines(lines:typing.List[str]) -> bytes:
+	return "\n".join(lines).encode("utf-8", "surrogateescape")
+#
+
+def _buildTextData(nLines:int, data:typing.Union[bytes,str]):
+	from jk_cmdoutputparsinghelper.TextData import TextData
+
+	if nLines == 0:
+		return TextData([])
+	if not isinstance(data, str):
+		data = str(data, "utf-8", "surrogateescape")
+	# splitting the joined text results in exactly the original lines; this way the lines are not verified one by one
+	return TextData(data)
+#
+
+def _buildExtra(r:CommandResult) -> typing.Union[dict,None]:
+	if (r.resourceUsage is None) and (r.limitKillReason is None) and (r.stdOutDecodeErrors == 0) and (r.stdErrDecodeErrors == 0) and (r.errorClasses is None):
+		return None
+	return {
+		"resourceUsage": r.resourceUsage.toJSON() if r.resourceUsage else None,
+		"limitKillReason": r.limitKillReason,
+		"stdOutDecodeErrors": r.stdOutDecodeErrors,
+		"stdErrDecodeErrors": r.stdErrDecodeErrors,
+		"errorClasses": r.errorClasses,
+		"errorMatches": r.errorMatches,
+	}
+#
+
+#
+# @return		ResourceUsage		The resource usage (or <c>None</c>).
+# @return		str					The limit kill reason (or <c>None</c>).
+# @return		int					The number of decoding errors in STDOUT.
+# @return		int					The number of decoding errors in STDERR.
+# @return		str[]				The error classes matched (or <c>None</c>).
+# @return		tuple[]				The lines that matched an error class (or <c>None</c>).
+#
+def _parseExtra(extra:typing.Union[dict,None]) -> tuple:
+	if not extra:
+		return None, None, 0, 0, None, None
+	resourceUsage = extra.get("resourceUsage")
+	if resourceUsage is not None:
+		resourceUsage = ResourceUsage(**resourceUsage)
+	errorMatches = extra.get("errorMatches")
+	if errorMatches is not None:
+		errorMatches = [ tuple(x) for x in errorMatches ]
+	return resourceUsage, extra.get("limitKillReason"), extra.get("stdOutDecodeErrors", 0), extra.get("stdErrDecodeErrors", 0), extra.get("errorClasses"), errorMatches
+#
+
+
+
+def encodeBinary(r:CommandResult) -> bytes:
+	import json
+
+	cmd = r.commandPath.encode("utf-8", "surrogateescape")
+	cmdArgs = b"" if r.commandArguments is None else json.dumps(r.commandArguments).encode("utf-8")
+	extra = _buildExtra(r)
+	extra = b"" if extra is None else json.dumps(extra).encode("utf-8")
+	stdOutLines = r.stdOutLines
+	stdErrLines = r.stdErrLines
+	stdOut = _joinLines(stdOutLines)
+	stdErr = _joinLines(stdErrLines)
+
+	return b"".join([
+		_RECORD_HEADER.pack(
+			r.returnCode,
+			r.duration,
+			len(cmd),
+			len(cmdArgs),
+			len(extra),
+			len(stdOutLines),
+			len(stdErrLines),
+			len(stdOut),
+			len(stdErr),
+		),
+		cmd,
+		cmdArgs,
+		extra,
+		stdOut,
+		stdErr,
+	])
+#
+
+def decodeBinary(payload:bytes) -> CommandResult:
+	import json
+
+	returnCode, duration, nCmd, nCmdArgs, nExtra, nStdOutLines, nStdErrLines, nStdOut, nStdErr = _RECORD_HEADER.unpack_from(payload)
+	view = memoryview(payload)
+	pos = _RECORD_HEADER.size
+
+	cmd = str(view[pos:pos+nCmd], "utf-8", "surrogateescape")
+	pos += nCmd
+	cmdArgs = json.loads(bytes(view[pos:pos+nCmdArgs])) if nCmdArgs else None
+	pos += nCmdArgs
+	extra = json.loads(bytes(view[pos:pos+nExtra])) if nExtra else None
+	pos += nExtra
+	stdOut = _buildTextData(nStdOutLines, view[pos:pos+nStdOut])
+	pos += nStdOut
+	stdErr = _buildTextData(nStdErrLines, view[pos:pos+nStdErr])
+
+	resourceUsage, limitKillReason, stdOutDecodeErrors, stdErrDecodeErrors, errorClasses, errorMatches = _parseExtra(extra)
+	return CommandResult(cmd, cmdArgs, stdOut, stdErr, returnCode, duration, resourceUsage, limitKillReason, None, stdOutDecodeErrors, stdErrDecodeErrors,
+		errorClasses, errorMatches)
+#
+
+def encodeJSONL(r:CommandResult) -> bytes:
+	import json
+
+	stdOutLines = r.stdOutLines
+	stdErrLines = r.stdErrLines
+	jData = {
+		"cmd": r.commandPath,
+		"cmdArgs": r.commandArguments,
+		"stdOut": "\n".join(stdOutLines) if stdOutLines else None,
+		"stdErr": "\n".join(stdErrLines) if stdErrLines else None,
+		"retCode": r.returnCode,
+		"duration": r.duration,
+	}
+	extra = _buildExtra(r)
+	if extra:
+		jData.update(extra)
+	# json escapes line feeds and control characters, so every record is exactly one line
+	try:
+		return json.dumps(jData, ensure_ascii=False).encode("utf-8") + b"\n"
+	except UnicodeEncodeError:
+		# raw bytes kept by the "surrogateescape" policy are no valid UTF-8: escape all non-ASCII characters instead
+		return json.dumps(jData).encode("ascii") + b"\n"
+#
+
+def decodeJSONL(line:bytes) -> CommandResult:
+	import json
+
+	jData = json.loads(line)
+	stdOut = jData["stdOut"]
+	stdErr = jData["stdErr"]
+	resourceUsage, limitKillReason, stdOutDecodeErrors, stdErrDecodeErrors, errorClasses, errorMatches = _parseExtra(jData)
+	return CommandResult(
+		jData["cmd"],
+		jData["cmdArgs"],
+		_buildTextData(0 if stdOut is None else 1, stdOut),
+		_buildTextData(0 if stdErr is None else 1, stdErr),
+		jData["retCode"],
+		jData["duration"],
+		resourceUsage,
+		limitKillReason,
+		None,
+		stdOutDecodeErrors,
+		stdErrDecodeErrors,
+		errorClasses,
+		errorMatches,
+	)
+#
+
+
+
+#
+# Determine the offsets of all records by reading through the file.
+#
+# @param		file f					(required) The log file opened in binary mode.
+# @param		bool bBinary			(required) <c>True</c> for binary log files, <c>False</c> for JSON Lines files.
+# @return		array.array				The offsets.
+#
+def scanOffsets(f, bBinary:bool) -> array.array:
+	offsets = array.array("Q")
+	if bBinary:
+		f.seek(0, 2)
+		fileSize = f.tell()
+		pos = len(MAGIC) + 1
+		while pos < fileSize:
+			f.seek(pos)
+			header = f.read(LENGTH.size)
+			if len(header) < LENGTH.size:
+				break
+			n = LENGTH.unpack(header)[0]
+			if pos + LENGTH.size + n > fileSize:
+				# incomplete last record (e.g. if the writer was killed)
+				break
+			offsets.append(pos)
+			pos += LENGTH.size + n
+	else:
+		f.seek(0)
+		pos = 0
+		for line in f:
+			if not line.endswith(b"\n"):
+				break
+			offsets.append(pos)
+			pos += len(line)
+	return offsets
+#
+
+#
+# Determine where the record at the specified offset ends.
+#
+def getRecordEnd(f, offset:int, bBinary:bool) -> int:
+	f.seek(offset)
+	if bBinary:
+		header = f.read(LENGTH.size)
+		if len(header) < LENGTH.size:
+			return -1
+		return offset + LENGTH.size + LENGTH.unpack(header)[0]
+	else:
+		line = f.readline()
+		if not line.endswith(b"\n"):
+			return -1
+		return offset + len(line)
+#
+
+#
+# Get the offsets of all complete records of a log file. If the index file exists and matches the log file it is used.
+# Otherwise the offsets are determined by reading through the log file.
+#
+# @param		file f					(required) The log file opened in binary mode.
+# @param		str indexFilePath		(optional) The path of the index file.
+# @param		bool bBinary			(required) <c>True</c> for binary log files, <c>False</c> for JSON Lines files.
+# @return		array.array				The offsets.
+# @return		int						The offset where the last complete record ends.
+#
+def loadOffsets(f, indexFilePath:typing.Union[str,None], bBinary:bool) -> typing.Tuple[array.array,int]:
+	fileSize = f.seek(0, 2)
+	dataStart = len(MAGIC) + 1 if bBinary else 0
+
+	offsets = loadIndex(indexFilePath) if indexFilePath else None
+	if offsets is not None:
+		if offsets:
+			if (offsets[-1] < fileSize) and (getRecordEnd(f, offsets[-1], bBinary) == fileSize):
+				return offsets, fileSize
+		elif fileSize <= dataStart:
+			return offsets, fileSize
+
+	offsets = scanOffsets(f, bBinary)
+	validEnd = getRecordEnd(f, offsets[-1], bBinary) if offsets else dataStart
+	return offsets, validEnd
+#
+
+def loadIndex(indexFilePath:str) -> typing.Union[array.array,None]:
+	try:
+		with open(indexFilePath, "rb") as f:
+			data = f.read()
+	except FileNotFoundError:
+		return None
+	offsets = array.array("Q")
+	offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+	if sys.byteorder != "little":
+		offsets.byteswap()
+	return offsets
+#
+
+def toIndexBytes(offsets:array.array) -> bytes:
+	if sys.byteorder != "little":
+		offsets = array.array("Q", offsets)
+		offsets.byteswap()
+	return offsets.tobytes()
+#
+
+
+
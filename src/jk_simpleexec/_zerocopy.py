@@ -0,0 +1,117 @@
+
+
+#
+# Copying data between file descriptors without passing it through user space where possible.
+#
+# * <c>os.splice()</c> moves data between a pipe and any other file descriptor (Linux, Python 3.10+).
+# * <c>os.sendfile()</c> copies data from a regular file to any other file descriptor (Linux).
+# * <c>os.copy_file_range()</c> copies data between two regular files (Linux, Python 3.8+).
+# * Otherwise the data is copied by a buffered loop.
+#
+
+
+
+import os
+import sys
+import stat
+import errno
+import typing
+
+
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+# errors indicating that a system call is not supported for the file descriptors specified
+_UNSUPPORTED_ERRNOS = ( errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EOPNOTSUPP, errno.EBADF )
+
+_IS_LINUX = sys.platform.startswith("linux")
+
+
+
+def _copyBySplice(srcFD:int, dstFD:int, n:int) -> int:
+	return os.splice(srcFD, dstFD, n)
+#
+
+def _copyBySendFile(srcFD:int, dstFD:int, n:int) -> int:
+	# an explicit offset works with all versions of python; the file position has to be updated then
+	pos = os.lseek(srcFD, 0, os.SEEK_CUR)
+	n = os.sendfile(dstFD, srcFD, pos, n)
+	os.lseek(srcFD, pos + n, os.SEEK_SET)
+	return n
+#
+
+def _copyByCopyFileRange(srcFD:int, dstFD:int, n:int) -> int:
+	return os.copy_file_range(srcFD, dstFD, n)
+#
+
+def _createBufferedCopyFunction() -> typing.Callable[[int,int,int],int]:
+	buffer = bytearray(_CHUNK_SIZE)
+	view = memoryview(buffer)
+
+	def copy(srcFD:int, dstFD:int, n:int) -> int:
+		n = os.readv(srcFD, [ view[:n] ])
+		pos = 0
+		while pos < n:
+			pos += os.write(dstFD, view[pos:n])
+		return n
+	#
+
+	return copy
+#
+
+
+
+#
+# Select the fastest way to copy data between two file descriptors.
+#
+# @return		str						The name of the method: "splice", "sendfile", "copy_file_range" or "buffered".
+# @return		callable				The function <c>(srcFD, dstFD, maxBytes) -> nBytesCopied</c>.
+#
+def selectCopyMethod(srcFD:int, dstFD:int) -> typing.Tuple[str,typing.Callable[[int,int,int],int]]:
+	if _IS_LINUX:
+		srcMode = os.fstat(srcFD).st_mode
+		dstMode = os.fstat(dstFD).st_mode
+		if hasattr(os, "splice") and (stat.S_ISFIFO(srcMode) or stat.S_ISFIFO(dstMode)):
+			return "splice", _copyBySplice
+		if stat.S_ISREG(srcMode):
+			if stat.S_ISREG(dstMode) and hasattr(os, "copy_file_range"):
+				return "copy_file_range", _copyByCopyFileRange
+			if hasattr(os, "sendfile"):
+				return "sendfile", _copyBySendFile
+	return "buffered", _createBufferedCopyFunction()
+#
+
+
+
+#
+# Copy data from one file descriptor to another. Both file descriptors must be in blocking mode.
+#
+# @param		int srcFD				(required) The file descriptor to read from.
+# @param		int dstFD				(required) The file descriptor to write to.
+# @param		int count				(optional) The maximum number of bytes to copy. If <c>None</c> is specified all data is copied until
+#										the end of the input is reached.
+# @return		int						The number of bytes copied.
+# @return		str						The method used (see <c>selectCopyMethod()</c>).
+#
+def copyFD(srcFD:int, dstFD:int, count:int = None) -> typing.Tuple[int,str]:
+	methodName, method = selectCopyMethod(srcFD, dstFD)
+	nTotal = 0
+	while (count is None) or (nTotal < count):
+		n = _CHUNK_SIZE if count is None else min(_CHUNK_SIZE, count - nTotal)
+		try:
+			n = method(srcFD, dstFD, n)
+		except OSError as ee:
+			if (ee.errno in _UNSUPPORTED_ERRNOS) and (methodName != "buffered") and (nTotal == 0):
+				# e.g. a file system not supporting copy_file_range() or a socket type not supporting splice()
+				methodName, method = "buffered", _createBufferedCopyFunction()
+				continue
+			raise
+		if n == 0:
+			break
+		nTotal += n
+	return nTotal, methodName
+#
+
+
+
@@ -0,0 +1,110 @@
+
+
+import typing
+
+from .CommandResult import CommandResult
+from .ExecutionEngine import ExecutionEngine
+
+
+
+
+def _toSubmitArgs(command:typing.Union[dict,typing.List[str]]) -> dict:
+	if isinstance(command, dict):
+		return command
+	assert isinstance(command, (list, tuple)) and command
+	return {
+		"cmdPath": command[0],
+		"cmdArgs": list(command[1:]),
+	}
+#
+
+def _iterateAsCompleted(commands:list, stopWhen:typing.Callable, maxProcesses:int, ignoreErrors:bool) -> typing.Iterator[CommandResult]:
+	engine = ExecutionEngine(maxProcesses)
+	try:
+		futures = [ engine.submit(**args) for args in commands ]
+		yield from engine.asCompleted(futures, stopWhen, ignoreErrors)
+	finally:
+		engine.shutdown(wait=True)
+#
+
+
+
+#
+# Run commands concurrently and iterate over their results in the order of their completion. If a result matches <c>stopWhen</c>
+# all other commands are killed immediately and the iteration ends with the matching result. Leaving the iteration early kills all
+# commands still running as well. (See <c>ExecutionEngine.asCompleted()</c>.)
+#
+# The commands are not started before the iteration begins.
+#
+# @param		dict[]|str[][] commands				(required) The commands to run. Each command is specified either as a dictionary with the arguments
+#													for <c>invokeCmd2()</c> (except for <c>log</c> and <c>cancelEvent</c>) or as argument vector
+#													(e.g. as rendered by <c>CommandTemplate.render()</c>).
+# @param		callable stopWhen					(optional) A predicate that receives a <c>CommandResult</c>. If it returns <c>True</c> all other commands are killed.
+# @param		int maxProcesses					(optional) The maximum number of commands to run at the same time.
+# @param		bool ignoreErrors					(optional) If <c>True</c> commands that could not be run (e.g. because the program does not exist) are skipped.
+# @return		CommandResult[]						An iterator over the results.
+#
+def invokeAsCompleted(
+		*argv,
+		commands:typing.List[typing.Union[dict,typing.List[str]]],
+		stopWhen:typing.Callable[[CommandResult],bool] = None,
+		maxProcesses:int = None,
+		ignoreErrors:bool = False,
+	) -> typing.Iterator[CommandResult]:
+
+	if len(argv) > 0:
+		raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+	assert isinstance(commands, (list, tuple))
+	if stopWhen is not None:
+		assert callable(stopWhen)
+
+	return _iterateAsCompleted([ _toSubmitArgs(x) for x in commands ], stopWhen, maxProcesses, ignoreErrors)
+#
+
+#
+# Run commands concurrently and return the first result that matches the predicate. All other commands are killed as soon as a
+# result matches. This way the time required is that of the fastest match instead of the sum of all attempts.
+#
+# Example:
+#
+#	r = invokeFirst(commands=[ [ "curl", "-sf", "-o", "/dev/null", url ] for url in mirrorURLs ])
+#
+# @param		dict[]|str[][] commands				(required) The commands to run (see <c>invokeAsCompleted()</c>).
+# @param		callable predicate					(optional) A predicate that receives a <c>CommandResult</c>. (Default: the return code is zero.)
+# @param		int maxProcesses					(optional) The maximum number of commands to run at the same time.
+# @return		CommandResult						The first result that matches or <c>None</c> if no result matches. Commands that could
+#													not be run are considered as not matching.
+#
+def invokeFirst(
+		*argv,
+		commands:typing.List[typing.Union[dict,typing.List[str]]],
+		predicate:typing.Callable[[CommandResult],bool] = None,
+		maxProcesses:int = None,
+	) -> typing.Union[CommandResult,None]:
+
+	if len(argv) > 0:
+		raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+	if predicate is None:
+		predicate = lambda r: r.returnCode == 0
+
+	# the predicate is evaluated exactly once per result
+	matches = []
+	def stopWhen(r:CommandResult) -> bool:
+		if predicate(r):
+			matches.append(r)
+			return True
+		return False
+	#
+
+	it = invokeAsCompleted(commands=commands, stopWhen=stopWhen, maxProcesses=maxProcesses, ignoreErrors=True)
+	try:
+		for r in it:
+			if matches:
+				return matches[0]
+		return None
+	finally:
+		it.close()
+#
+
+
+
@@ -1,39 +1,65 @@
 
 import os
 import subprocess
-import invoke
 import typing
 import time
 
 from . import _common as _common
 from .CommandResult import CommandResult
 from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from .FileTransferResult import FileTransferResult
+from ._TextDecoder import _TextDecoder
 
-try:
-	from fabric import Connection
-except ImportError as ee:
-	pass
 
 
 
 
 
 
+_DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+_DEFAULT_N_PARALLEL = 4
+
+
+
+def _isFabricConnection(c) -> bool:
+	if getattr(c.__class__, "_bFabricCompatible", False):
+		# e.g. jk_simpleexec.testing.FakeConnection
+		return True
+	return (c.__class__.__name__ == "Connection") and (c.__class__.__module__ in [ "fabric", "fabric.connection" ])
+#
+
+#
+# Identify the host a connection refers to (for recording results).
+#
+def _getHostID(c) -> typing.Union[str,None]:
+	if c is None:
+		return None
+	return "{}@{}:{}".format(getattr(c, "user", None), getattr(c, "host", None), getattr(c, "port", None))
+#
+
+
 
 #
 # Run a command locally or remotely.
 # If a "cat <file>" is to be invoked *and* this is to be invoked locally, this method will detect this. In that case instead of running "cat" it will fall back to a regular file read
 # for efficiency. Therefore you can access data on local and remote systems in a uniform way without spending too much thoughts on efficiency.
 #
+# NOTE: Running commands remotely requires the python modules "<c>fabric</c>" and "<c>invoke</c>" to be installed (see the "remote" extra of this package).
+# These modules are imported only if a fabric connection is actually used.
+#
 # @param		fabric.Connection c				(optional) Provide a fabric connection here if you want to run a command remotely.
 #												If you specify <c>None</c> here the command will be run locally.
-# @param		str command						(required) The command to run. Please note that this command will be interpreted by a shell.
+# @param		str|str[] command				(required) The command to run. Please note that a string will be interpreted by a shell. An argument vector
+#												(e.g. as rendered by <c>CommandTemplate.render()</c>) is run locally without a shell; for running it remotely
+#												all arguments are quoted.
 # @param		bool failOnNonZeroExitCode		(optional) Raises an exception if the last command executed returned with a non-zero exit code.
 #
+# If a recording is active (see <c>enableRecording()</c> and <c>enableReplay()</c>) the result is recorded resp. the recorded result is served
+# without running the command. Remote commands are identified by user, host and port of the connection.
 #
 def runCmd(
 		c,
-		command:str,
+		command:typing.Union[str,typing.List[str]],
 		stdOutProcessing:TextDataProcessingPolicy = None,
 		stdErrProcessing:TextDataProcessingPolicy = None,
 		failOnNonZeroExitCode:bool = True,
@@ -42,10 +68,29 @@ def runCmd(
 	stdOutProcessing = _common.DEFAULT_STDOUT_PROCESSING.override(stdOutProcessing)
 	stdErrProcessing = _common.DEFAULT_STDERR_PROCESSING.override(stdErrProcessing)
 
+	if isinstance(command, str):
+		cmdPath, cmdArgs = command, None
+	else:
+		assert isinstance(command, (list, tuple)) and command
+		cmdPath, cmdArgs = command[0], list(command[1:])
+
+	# serve a recorded result instead of running the command (but not for local file reads)
+
+	recording = _common.commandRecording
+	if (recording is not None) and not ((c is None) and (cmdArgs is None) and command.startswith("cat ")):
+		recordingKey = recording._createKey([ command ] if cmdArgs is None else command, host=_getHostID(c))
+		r = recording._replay(recordingKey)
+		if r is not None:
+			if failOnNonZeroExitCode and r.returnCode > 0:
+				raise Exception("Command failed with exit code " + str(r.returnCode) + ": " + repr(command))
+			return r
+	else:
+		recording = None
+
 	# execute command locally
 
 	if c is None:
-		if command.startswith("cat "):
+		if (cmdArgs is None) and command.startswith("cat "):
 			filePath = command[4:]
 
 			if _common.debugValve:
@@ -61,32 +106,42 @@ def runCmd(
 			_common.debugValve("Invoking via subprocess: " + repr(command))
 
 		tStart = time.time()
-		p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+		p = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=cmdArgs is None)
 		binStdOut, binStdErr = p.communicate()
 		tDuration = time.time() - tStart
-		stdOut = binStdOut.decode("utf-8")
-		stdErr = binStdErr.decode("utf-8")
 
 		if _common.debugValve:
 			_common.debugValve("exit status:", p.returncode)
 			_common.debugValve("stdout:")
-			for line in stdOut.split("\n"):
+			for line in binStdOut.decode("utf-8", "replace").split("\n"):
 				_common.debugValve("\t" + repr(line))
 			_common.debugValve("stderr:")
-			for line in stdErr.split("\n"):
+			for line in binStdErr.decode("utf-8", "replace").split("\n"):
 				_common.debugValve("\t" + repr(line))
 
+		stdOutDecoder = _TextDecoder(errors=stdOutProcessing.decodingErrors or "replace")
+		stdErrDecoder = _TextDecoder(errors=stdErrProcessing.decodingErrors or "replace")
+		stdOut = _common.processCmdOutput(binStdOut, stdOutProcessing, stdOutDecoder)
+		stdErr = _common.processCmdOutput(binStdErr, stdErrProcessing, stdErrDecoder)
+
+		r = CommandResult(cmdPath, cmdArgs, stdOut, stdErr, p.returncode, tDuration, stdOutDecodeErrors=stdOutDecoder.nErrors, stdErrDecodeErrors=stdErrDecoder.nErrors)
+		if recording is not None:
+			recording._record(recordingKey, r)
+
 		if failOnNonZeroExitCode and p.returncode > 0:
 			raise Exception("Command failed with exit code " + str(p.returncode) + ": " + repr(command))
 
-		stdOut = _common.processCmdOutput(stdOut, stdOutProcessing)
-		stdErr = _common.processCmdOutput(stdErr, stdErrProcessing)
-
-		return CommandResult(command, None, stdOut, stdErr, p.returncode, tDuration)
+		return r
 
 	# execute command remotely with fabric
 
-	if (c.__class__.__name__ == "Connection") and (c.__class__.__module__ in [ "fabric", "fabric.connection" ]):
+	if _isFabricConnection(c):
+		import invoke
+
+		if cmdArgs is not None:
+			import shlex
+			command = " ".join([ shlex.quote(x) for x in command ])
+
 		if _common.debugValve:
 			_common.debugValve("Invoking via fabric: " + repr(command))
 
@@ -106,13 +161,18 @@ def runCmd(
 			for line in r.stderr.split("\n"):
 				_common.debugValve("\t" + repr(line))
 
-		if failOnNonZeroExitCode and r.exited > 0:
-			raise Exception("Command failed with exit code " + str(r.exited) + ": " + repr(command))
-
 		stdOut = _common.processCmdOutput(r.stdout, stdOutProcessing)
 		stdErr = _common.processCmdOutput(r.stderr, stdErrProcessing)
 
-		return CommandResult(command, None, stdOut, stdErr, r.exited, tDuration)
+		# the output has already been decoded by invoke (which replaces invalid data): the number of errors is unknown
+		ret = CommandResult(cmdPath, cmdArgs, stdOut, stdErr, r.exited, tDuration, stdOutDecodeErrors=None, stdErrDecodeErrors=None)
+		if recording is not None:
+			recording._record(recordingKey, ret)
+
+		if failOnNonZeroExitCode and r.exited > 0:
+			raise Exception("Command failed with exit code " + str(r.exited) + ": " + repr(command))
+
+		return ret
 
 	# error
 
@@ -121,6 +181,134 @@ def runCmd(
 
 
 
+#
+# Copy a file locally. This is used by <c>getFile()</c> and <c>putFile()</c> if no connection is specified.
+#
+def _copyFileLocally(sourceFilePath:str, destinationFilePath:str, bVerify:bool) -> FileTransferResult:
+	import shutil
+	from ._filetransfer import _calcLocalSHA256
+
+	tStart = time.time()
+	partFilePath = destinationFilePath + ".part"
+	shutil.copyfile(sourceFilePath, partFilePath)
+	fileSize = os.path.getsize(partFilePath)
+
+	sha256 = None
+	if bVerify:
+		sha256 = _calcLocalSHA256(partFilePath)
+		if sha256 != _calcLocalSHA256(sourceFilePath):
+			os.unlink(partFilePath)
+			raise Exception("Checksum mismatch after copying " + repr(sourceFilePath) + " to " + repr(destinationFilePath) + "!")
+
+	os.replace(partFilePath, destinationFilePath)
+
+	return FileTransferResult(sourceFilePath, destinationFilePath, fileSize, fileSize, 1, time.time() - tStart, sha256)
+#
+
+
+
+#
+# Download a file from a remote system.
+#
+# The file is transferred via SFTP in chunks. Up to <c>nParallel</c> chunks are transferred in parallel, each using a SFTP session
+# of its own, and read requests are pipelined. The data is written to "<localFilePath>.part" first which is renamed after the transfer has
+# completed. If a transfer is interrupted invoking this function again with the same arguments transfers only the missing chunks
+# (provided that the remote file has not been modified in between).
+#
+# NOTE: Transferring files requires the python module "<c>fabric</c>" to be installed (see the "remote" extra of this package).
+# Verification requires "<c>sha256sum</c>" on the remote system.
+#
+# @param		fabric.Connection c				(optional) The fabric connection to use. If you specify <c>None</c> here the file is copied locally.
+# @param		str remoteFilePath				(required) The path of the file on the remote system.
+# @param		str localFilePath				(required) The path of the local file to write.
+# @param		int chunkSize					(optional) The size of the chunks in bytes (default: 8 MiB).
+# @param		int nParallel					(optional) The maximum number of chunks to transfer in parallel (default: 4).
+# @param		bool bVerify					(optional) Compare the SHA-256 checksums of both files after the transfer (default: <c>True</c>).
+# @param		bool bResume					(optional) Resume an interrupted transfer (default: <c>True</c>).
+# @return		FileTransferResult				Information about the transfer.
+#
+def getFile(
+		c,
+		remoteFilePath:str,
+		localFilePath:str,
+		*argv,
+		chunkSize:int = _DEFAULT_CHUNK_SIZE,
+		nParallel:int = _DEFAULT_N_PARALLEL,
+		bVerify:bool = True,
+		bResume:bool = True,
+	) -> FileTransferResult:
+
+	if argv:
+		raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+	assert isinstance(remoteFilePath, str)
+	assert isinstance(localFilePath, str)
+
+	if c is None:
+		return _copyFileLocally(remoteFilePath, localFilePath, bVerify)
+
+	if _isFabricConnection(c):
+		from ._filetransfer import transfer
+
+		if _common.debugValve:
+			_common.debugValve("Downloading via SFTP: " + repr(remoteFilePath) + " -> " + repr(localFilePath))
+
+		return transfer(c, True, remoteFilePath, localFilePath, chunkSize, nParallel, bVerify, bResume)
+
+	raise Exception("Sorry, I don't know about " + repr(c.__class__) + " objects for parameter c.")
+#
+
+
+
+#
+# Upload a file to a remote system. This is the counterpart of <c>getFile()</c>: the data is written to "<remoteFilePath>.part" first
+# using pipelined writes which is renamed after the transfer has completed.
+#
+# NOTE: Transferring files requires the python module "<c>fabric</c>" to be installed (see the "remote" extra of this package).
+# Verification requires "<c>sha256sum</c>" on the remote system.
+#
+# @param		fabric.Connection c				(optional) The fabric connection to use. If you specify <c>None</c> here the file is copied locally.
+# @param		str localFilePath				(required) The path of the local file to read.
+# @param		str remoteFilePath				(required) The path of the file on the remote system.
+# @param		int chunkSize					(optional) The size of the chunks in bytes (default: 8 MiB).
+# @param		int nParallel					(optional) The maximum number of chunks to transfer in parallel (default: 4).
+# @param		bool bVerify					(optional) Compare the SHA-256 checksums of both files after the transfer (default: <c>True</c>).
+# @param		bool bResume					(optional) Resume an interrupted transfer (default: <c>True</c>).
+# @return		FileTransferResult				Information about the transfer.
+#
+def putFile(
+		c,
+		localFilePath:str,
+		remoteFilePath:str,
+		*argv,
+		chunkSize:int = _DEFAULT_CHUNK_SIZE,
+		nParallel:int = _DEFAULT_N_PARALLEL,
+		bVerify:bool = True,
+		bResume:bool = True,
+	) -> FileTransferResult:
+
+	if argv:
+		raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+	assert isinstance(localFilePath, str)
+	assert isinstance(remoteFilePath, str)
+
+	if c is None:
+		return _copyFileLocally(localFilePath, remoteFilePath, bVerify)
+
+	if _isFabricConnection(c):
+		from ._filetransfer import transfer
+
+		if _common.debugValve:
+			_common.debugValve("Uploading via SFTP: " + repr(localFilePath) + " -> " + repr(remoteFilePath))
+
+		return transfer(c, False, localFilePath, remoteFilePath, chunkSize, nParallel, bVerify, bResume)
+
+	raise Exception("Sorry, I don't know about " + repr(c.__class__) + " objects for parameter c.")
+#
+
+
+
+
+
 
 
 
@@ -0,0 +1,352 @@
+
+
+import os
+import sys
+import time
+import selectors
+import subprocess
+import threading
+import typing
+
+from .CommandResult import CommandResult
+from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from .EnvSnapshot import EnvSnapshot
+from . import _common as _common
+from . import _zerocopy as _zerocopy
+
+
+
+
+_READ_SIZE = 65536
+
+
+
+#
+# Determine the file descriptor of a data source or target that can be used directly.
+#
+# @return		int				The file descriptor (or <c>None</c> if the data has to be copied by python code).
+# @return		bool			<c>True</c> if the file descriptor has been opened here and has to be closed by the caller.
+#
+def _getFD(x, bWrite:bool) -> typing.Tuple[typing.Union[int,None],bool]:
+	if isinstance(x, int):
+		return x, False
+	if isinstance(x, str):
+		if bWrite:
+			return os.open(x, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o666), True
+		return os.open(x, os.O_RDONLY | os.O_CLOEXEC), True
+
+	# data sent over a TLS connection must be encrypted by python
+	sslModule = sys.modules.get("ssl")
+	if (sslModule is not None) and isinstance(x, sslModule.SSLSocket):
+		return None, False
+
+	filenoFunc = getattr(x, "fileno", None)
+	if filenoFunc is not None:
+		try:
+			fd = filenoFunc()
+		except (OSError, ValueError, AttributeError):
+			# e.g. io.BytesIO
+			fd = None
+		else:
+			if bWrite and hasattr(x, "flush"):
+				# the file object might have buffered data that must be written first
+				x.flush()
+			return fd, False
+	return None, False
+#
+
+def _copyFromReader(reader, dstFD:int, count:int = None) -> int:
+	readFunc = getattr(reader, "recv", None) or reader.read
+	nTotal = 0
+	while (count is None) or (nTotal < count):
+		data = readFunc(_zerocopy._CHUNK_SIZE if count is None else min(_zerocopy._CHUNK_SIZE, count - nTotal))
+		if not data:
+			break
+		view = memoryview(data)
+		while view:
+			view = view[os.write(dstFD, view):]
+		nTotal += len(data)
+	return nTotal
+#
+
+def _copyToWriter(srcFD:int, writer, count:int = None) -> int:
+	writeFunc = getattr(writer, "sendall", None) or writer.write
+	nTotal = 0
+	while (count is None) or (nTotal < count):
+		data = os.read(srcFD, _zerocopy._CHUNK_SIZE if count is None else min(_zerocopy._CHUNK_SIZE, count - nTotal))
+		if not data:
+			break
+		writeFunc(data)
+		nTotal += len(data)
+	return nTotal
+#
+
+
+
+#
+# Copy data between files, pipes and sockets. Depending on the kind of source and target the data is copied by the kernel using
+# <c>os.splice()</c> (one side is a pipe), <c>os.sendfile()</c> (the source is a regular file) or <c>os.copy_file_range()</c> (both are regular files).
+# Only if none of these is applicable the data is copied by a buffered loop.
+#
+# Sources and targets can be:
+# * an <c>int</c> - a file descriptor (in blocking mode)
+# * a <c>str</c> - the path of a file (a target file is created or truncated)
+# * an object with a <c>fileno()</c> method (e.g. a file object or a socket) - its file descriptor is used directly;
+#   file objects must not contain buffered data that has been read ahead
+# * other objects providing <c>read()</c>/<c>recv()</c> or <c>write()</c>/<c>sendall()</c> (e.g. <c>io.BytesIO</c> or TLS sockets) -
+#   these are copied by python code
+#
+# @param		* source				(required) The source to read from.
+# @param		* target				(required) The target to write to.
+# @param		int count				(optional) The maximum number of bytes to copy. If <c>None</c> all data is copied until the end of the source.
+# @return		int						The number of bytes copied.
+#
+def transferData(source, target, count:int = None) -> int:
+	srcFD, bCloseSrc = _getFD(source, False)
+	try:
+		dstFD, bCloseDst = _getFD(target, True)
+		try:
+			if srcFD is None:
+				if dstFD is None:
+					# no file descriptors on both sides: copy the data through a pipe
+					r, w = os.pipe()
+					result = []
+					t = threading.Thread(target=lambda: result.append(_copyToWriter(r, target, count)), daemon=True)
+					t.start()
+					try:
+						_copyFromReader(source, w, count)
+					finally:
+						os.close(w)
+						t.join()
+						os.close(r)
+					return result[0] if result else 0
+				return _copyFromReader(source, dstFD, count)
+			if dstFD is None:
+				return _copyToWriter(srcFD, target, count)
+			return _zerocopy.copyFD(srcFD, dstFD, count)[0]
+		finally:
+			if bCloseDst:
+				os.close(dstFD)
+	finally:
+		if bCloseSrc:
+			os.close(srcFD)
+#
+
+
+
+#
+# Run a pipeline of commands like a shell does for <c>cmd1 | cmd2 | ...</c> but without a shell.
+#
+# The commands are connected by pipes directly, so the data flows from one command to the next without passing through the current
+# process at all. Files and sockets specified as source and target are handed to the first and last command as STDIN and STDOUT directly
+# (see <c>transferData()</c> for the kinds of sources and targets possible). Only sources and targets without a file descriptor are copied
+# by the current process. This way bulk transformations (e.g. compress, encrypt, upload) run at kernel speed.
+#
+# @param		str[][] commands							(required) The commands to run. Each command is specified as argument vector
+#															(e.g. as rendered by <c>CommandTemplate.render()</c>).
+# @param		*|bytes stdIn								(optional) The source for STDIN of the first command. Data specified as <c>bytes</c> is written
+#															to the first command. If <c>None</c> is specified STDIN of the current process is inherited.
+# @param		* stdOut									(optional) The target for STDOUT of the last command. If <c>None</c> is specified the output is
+#															captured and provided by the result of the last command.
+# @param		str workingDirectory						(optional) The working directory for the commands.
+# @param		dict|EnvSnapshot env						(optional) The environment for the commands (see <c>invokeCmd2()</c>).
+# @param		dict envOverrides							(optional) Environment variables to set or remove (see <c>invokeCmd2()</c>).
+# @param		bool clearEnv								(optional) If <c>True</c> the environment of the current process is not inherited.
+# @param		TextDataProcessingPolicy stdOutProcessing	(optional) The processing of the STDOUT output captured from the last command.
+# @param		TextDataProcessingPolicy stdErrProcessing	(optional) The processing of the STDERR output captured from every command.
+# @return		CommandResult[]								A result for every command. STDOUT is empty for all but the last command.
+#
+# If copying data from a source or to a target without a file descriptor fails the exception is raised after all commands terminated.
+#
+def invokePipeline(
+		*argv,
+		commands:typing.List[typing.List[str]],
+		stdIn = None,
+		stdOut = None,
+		workingDirectory:str = None,
+		env:typing.Union[typing.Mapping[str,str],EnvSnapshot] = None,
+		envOverrides:typing.Mapping[str,typing.Union[str,None]] = None,
+		clearEnv:bool = False,
+		stdOutProcessing:TextDataProcessingPolicy = None,
+		stdErrProcessing:TextDataProcessingPolicy = None,
+	) -> typing.List[CommandResult]:
+
+	from .simpleexec import _buildCommandResult
+
+	if len(argv) > 0:
+		raise Exception("For compatibility with future changes please invoke this method with named arguments only!")
+	assert isinstance(commands, (list, tuple)) and commands
+	for cmd in commands:
+		assert isinstance(cmd, (list, tuple)) and cmd
+		for x in cmd:
+			assert isinstance(x, str)
+
+	stdOutProcessing = _common.DEFAULT_STDOUT_PROCESSING.override(stdOutProcessing)
+	stdErrProcessing = _common.DEFAULT_STDERR_PROCESSING.override(stdErrProcessing)
+	popenEnv = EnvSnapshot.resolve(env, envOverrides, clearEnv)
+
+	fdsToClose = []			# file descriptors opened here
+	threads = []			# threads copying data from sources or to targets without file descriptors
+	readerThreads = []		# the threads of these reading from sources without file descriptors
+	threadErrors = []		# the exceptions raised by these threads
+	processes = []
+
+	def runThread(func, *args):
+		try:
+			func(*args)
+		except BaseException as ee:
+			threadErrors.append(ee)
+	#
+
+	def startThread(func, *args) -> threading.Thread:
+		t = threading.Thread(target=runThread, args=(func,) + args, daemon=True)
+		t.start()
+		threads.append(t)
+		return t
+	#
+
+	def writeData(fd:int, data:bytes):
+		try:
+			view = memoryview(data)
+			while view:
+				view = view[os.write(fd, view):]
+		except BrokenPipeError:
+			pass
+		finally:
+			os.close(fd)
+	#
+
+	def copyFromReader(reader, fd:int):
+		try:
+			_copyFromReader(reader, fd)
+		except BrokenPipeError:
+			pass
+		finally:
+			os.close(fd)
+	#
+
+	def copyToWriter(fd:int, writer):
+		try:
+			_copyToWriter(fd, writer)
+		finally:
+			os.close(fd)
+	#
+
+	if _common.debugValve:
+		_common.debugValve("================================================================================================================================")
+		_common.debugValve("EXECUTING PIPELINE: " + " | ".join(str(cmd) for cmd in commands))
+
+	tStart = time.time()
+	bStarted = False
+	try:
+		# prepare STDIN of the first command
+
+		firstStdIn = None
+		if isinstance(stdIn, (bytes, bytearray)):
+			firstStdIn, w = os.pipe()
+			fdsToClose.append(firstStdIn)
+			startThread(writeData, w, stdIn)
+		elif stdIn is not None:
+			fd, bClose = _getFD(stdIn, False)
+			if fd is None:
+				firstStdIn, w = os.pipe()
+				readerThreads.append(startThread(copyFromReader, stdIn, w))
+				bClose = True
+			else:
+				firstStdIn = fd
+			if bClose:
+				fdsToClose.append(firstStdIn)
+
+		# prepare STDOUT of the last command
+
+		lastStdOut = subprocess.PIPE
+		if stdOut is not None:
+			fd, bClose = _getFD(stdOut, True)
+			if fd is None:
+				r, lastStdOut = os.pipe()
+				startThread(copyToWriter, r, stdOut)
+				bClose = True
+			else:
+				lastStdOut = fd
+			if bClose:
+				fdsToClose.append(lastStdOut)
+
+		# start the commands
+
+		prevStdOutFD = firstStdIn
+		for i, cmd in enumerate(commands):
+			if i < len(commands) - 1:
+				r, w = os.pipe()
+				fdsToClose.append(r)
+				fdsToClose.append(w)
+			else:
+				r, w = None, lastStdOut
+			processes.append(subprocess.Popen(
+				cmd,
+				stdin=prevStdOutFD,
+				stdout=w,
+				stderr=subprocess.PIPE,
+				env=popenEnv,
+				cwd=workingDirectory or None,
+			))
+			prevStdOutFD = r
+		bStarted = True
+
+	finally:
+		# the commands have their own copies of these file descriptors: otherwise the end of the data would never be detected
+		for fd in fdsToClose:
+			os.close(fd)
+
+		if not bStarted:
+			# a command could not be started: terminate the commands started so far before the exception is passed on
+			for p in processes:
+				try:
+					p.kill()
+				except ProcessLookupError:
+					pass
+				p.wait()
+				p.stderr.close()
+				if p.stdout is not None:
+					p.stdout.close()
+			for t in threads:
+				# a thread reading from a source might block forever: it terminates as soon as the source provides data (as the pipe is closed)
+				if t not in readerThreads:
+					t.join()
+
+	# collect the output
+
+	stdOutChunks = []
+	stdErrChunks = [ [] for p in processes ]
+	with selectors.DefaultSelector() as sel:
+		for p, chunks in zip(processes, stdErrChunks):
+			sel.register(p.stderr.fileno(), selectors.EVENT_READ, chunks)
+		if processes[-1].stdout is not None:
+			sel.register(processes[-1].stdout.fileno(), selectors.EVENT_READ, stdOutChunks)
+		while sel.get_map():
+			for key, events in sel.select():
+				chunk = os.read(key.fd, _READ_SIZE)
+				if chunk:
+					key.data.append(chunk)
+				else:
+					sel.unregister(key.fd)
+
+	for p in processes:
+		p.wait()
+		p.stderr.close()
+		if p.stdout is not None:
+			p.stdout.close()
+	for t in threads:
+		t.join()
+	if threadErrors:
+		raise threadErrors[0]
+	tDuration = time.time() - tStart
+
+	ret = []
+	for i, (p, cmd) in enumerate(zip(processes, commands)):
+		stdout = b"".join(stdOutChunks) if i == len(processes) - 1 else b""
+		ret.append(_buildCommandResult(cmd[0], list(cmd[1:]), stdout, b"".join(stdErrChunks[i]), p.returncode, tDuration, stdOutProcessing, stdErrProcessing))
+	return ret
+#
+
+
+
@@ -3,14 +3,23 @@
 
 import os
 import sys
+import mmap
 import subprocess
+import threading
 import typing
 import time
 
 from .CommandResult import CommandResult
 from .TextDataProcessingPolicy import TextDataProcessingPolicy
+from .EnvSnapshot import EnvSnapshot
+from .ResourceLimits import ResourceLimits
+from .OutputForwarder import OutputForwarder
+from .OutputTimeline import OutputTimeline
+from .ErrorClassifier import ErrorClassifier
 from ._DebugValveToFile import _DebugValveToFile
+from ._TextDecoder import _TextDecoder
 from . import _common as _common
+from . import _communicate as _communicate
 
 
 
@@ -177,8 +186,8 @@ def invokeCmd1(
 #															Please note that there is no shell to interprete these commands.
 # @param		str|bytes[] dataToPipeAsStdIn				(optional) Either a string or binary data (or None) that should be passed on to the application invoked usint STDIN.
 #															If string data is presented it is automatically encoded using UTF-8
-# @param		str workingDirectory						(optional) If you specify a working directory here this function will change to this working directory
-#															specified in <c>workingDirector</c> and return to the previous one after the command has been completed.
+# @param		str workingDirectory						(optional) If you specify a working directory here the command is executed in this working directory.
+#															(The working directory of the current process is not changed, so this is safe to use from multiple threads.)
 # @param		TextDataProcessingPolicy stdOutProcessing	(optional) If specified you can override defaults of the STDOUT preprocessing that can already be done by this function.
 # @param		TextDataProcessingPolicy stdErrProcessing	(optional) If specified you can override defaults of the STDERR preprocessing that can already be done by this function.
 # @param		* log										(optional) You can specify a logger here. This logger will receive a notice about what command is going to be executed.
@@ -188,6 +197,38 @@ def invokeCmd1(
 #															* is callable (= is a method itself) expecting a single string argument - the log message
 # @param		bool shell									If set to `True` interpret the specified command by a shell. (This is then equivalent to `subprocess.Popen(..)`
 #															with `shell = True`.)
+# @param		dict|EnvSnapshot env						(optional) The environment for the command. If <c>None</c> is specified the environment of the current
+#															process is inherited. For running many commands with the same environment specify an <c>EnvSnapshot</c>
+#															here: its mapping is passed on as it is and no environment is built per call.
+# @param		dict envOverrides							(optional) Environment variables to set for the command (or to remove if <c>None</c> is specified as value).
+#															This way single variables (e.g. <c>LC_ALL=C</c>) can be changed without the need for a shell.
+# @param		bool clearEnv								(optional) If <c>True</c> the environment of the current process is not inherited.
+#															Please note that a program specified without path is looked up using the <c>PATH</c> of the
+#															environment of the command.
+# @param		ResourceLimits resourceLimits				(optional) Resource limits to apply to the command. If specified the resources used by the
+#															command are provided by <c>CommandResult.resourceUsage</c>. (Specify an empty <c>ResourceLimits()</c>
+#															to only measure the resource usage.) Please note the restrictions regarding threads described at
+#															<c>ResourceLimits</c>.
+# @param		float timeout								(optional) The maximum time in seconds the command may run. If this time is exceeded the command is killed
+#															and <c>CommandResult.limitKillReason</c> is "timeout".
+# @param		threading.Event cancelEvent					(optional) If this event is set while the command is running the command is killed and
+#															<c>CommandResult.limitKillReason</c> is "cancelled".
+# @param		OutputForwarder stdOutForwarder				(optional) Forwards the STDOUT output while the command is running (e.g. to callbacks, files or a logger).
+# @param		OutputForwarder stdErrForwarder				(optional) Forwards the STDERR output while the command is running.
+# @param		bool recordTimeline							(optional) If <c>True</c> the time of arrival of all output is recorded. The merged and timestamped
+#															output is then provided by <c>CommandResult.timeline</c>.
+# @param		int spillThreshold							(optional) If the output of STDOUT or STDERR exceeds this number of bytes it is written to an anonymous
+#															temporary file (in the directory specified by <c>TMPDIR</c>) and kept memory mapped instead of being
+#															held in memory. <c>stdOut</c>/<c>stdErr</c> of the result then provide the lines as a sequence decoded on access,
+#															the raw data as <c>buffer</c> and a file object for incremental parsing via <c>openReader()</c>.
+#															The JSON and XML parsers of <c>CommandResult</c> work directly on the mapped data.
+#															Decoding errors are not counted for such output.
+# @param		ErrorClassifier stdErrClassifier			(optional) Classifies the STDERR output while it arrives. The classes matched are provided by
+#															<c>CommandResult.errorClasses</c> and <c>CommandResult.errorMatches</c>. If a class declared as
+#															fatal matches the command is killed immediately and <c>CommandResult.limitKillReason</c> is "fatalError".
+#
+# If a recording is active (see <c>enableRecording()</c> and <c>enableReplay()</c>) the result is recorded resp. the recorded result is served
+# without running the command.
 #
 # @return		CommandOutput								Returns an object that contains the exit status, (preprocessed) STDOUT and (preprocessed) STDERR data.
 #
@@ -201,6 +242,17 @@ def invokeCmd2(
 		stdErrProcessing:TextDataProcessingPolicy = None,
 		shell:bool = False,
 		log = None,
+		env:typing.Union[typing.Mapping[str,str],EnvSnapshot] = None,
+		envOverrides:typing.Mapping[str,typing.Union[str,None]] = None,
+		clearEnv:bool = False,
+		resourceLimits:ResourceLimits = None,
+		timeout:float = None,
+		cancelEvent:threading.Event = None,
+		stdOutForwarder:OutputForwarder = None,
+		stdErrForwarder:OutputForwarder = None,
+		recordTimeline:bool = False,
+		spillThreshold:int = None,
+		stdErrClassifier:ErrorClassifier = None,
 	) -> CommandResult:
 
 	if len(argv) > 0:
@@ -220,87 +272,161 @@ def invokeCmd2(
 
 	if workingDirectory is not None:
 		assert isinstance(workingDirectory, str)
-		returnToDirectory = os.getcwd()
-	else:
-		returnToDirectory = None
 
-	try:
-		if workingDirectory:
-			os.chdir(workingDirectory)
+	if spillThreshold is not None:
+		assert isinstance(spillThreshold, int)
+		assert spillThreshold >= 0
 
-		if dataToPipeAsStdIn:
-			if isinstance(dataToPipeAsStdIn, str):
-				dataToPipeAsStdIn = dataToPipeAsStdIn.encode("utf-8")
-			elif isinstance(dataToPipeAsStdIn, (bytes, bytearray)):
-				pass
-			else:
-				raise Exception("Can only pipe string data and byte arrays!")
+	if stdErrClassifier is not None:
+		assert isinstance(stdErrClassifier, ErrorClassifier)
 
-		# build list of arguments
+	if dataToPipeAsStdIn:
+		if isinstance(dataToPipeAsStdIn, str):
+			dataToPipeAsStdIn = dataToPipeAsStdIn.encode("utf-8")
+		elif isinstance(dataToPipeAsStdIn, (bytes, bytearray)):
+			pass
+		else:
+			raise Exception("Can only pipe string data and byte arrays!")
 
-		cmd = []
-		cmd.append(cmdPath)
-		if cmdArgs is not None:
-			cmd.extend(cmdArgs)
+	popenEnv = EnvSnapshot.resolve(env, envOverrides, clearEnv)
+
+	# build list of arguments
+
+	cmd = []
+	cmd.append(cmdPath)
+	if cmdArgs is not None:
+		cmd.extend(cmdArgs)
 
-		# write log message if logger is specified
+	# write log message if logger is specified
 
-		if log:
-			printFunc = getattr(log, "notice", None)
+	if log:
+		printFunc = getattr(log, "notice", None)
+		if printFunc is None:
+			printFunc = getattr(log, "info", None)
 			if printFunc is None:
-				printFunc = getattr(log, "info", None)
-				if printFunc is None:
-					assert callable(log)
-					printFunc = log
-			printFunc("run: " + str(cmd))
+				assert callable(log)
+				printFunc = log
+		printFunc("run: " + str(cmd))
 
-		# write data to debug valve
+	# write data to debug valve
 
-		if _common.debugValve:
-			_common.debugValve("================================================================================================================================")
-			_common.debugValve("EXECUTING: " + str(cmd))
+	if _common.debugValve:
+		_common.debugValve("================================================================================================================================")
+		_common.debugValve("EXECUTING: " + str(cmd))
+
+	# serve a recorded result instead of running the command
+
+	recording = _common.commandRecording
+	if recording is not None:
+		recordingKey = recording._createKey(cmd, workingDirectory, dataToPipeAsStdIn)
+		r = recording._replay(recordingKey, cancelEvent)
+		if r is not None:
+			return r
 
-		# run the processes
+	# run the processes
 
+	cgroup = resourceLimits._createCGroup() if resourceLimits else None
+	try:
 		tStart = time.time()
-		if dataToPipeAsStdIn:
-			p = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
-			p.stdin.write(dataToPipeAsStdIn)
+		timeline = OutputTimeline() if recordTimeline else None
+		stdErrMatcher = stdErrClassifier._createMatcher() if stdErrClassifier else None
+		p = subprocess.Popen(
+			cmd,
+			shell=shell,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+			stdin=subprocess.PIPE if dataToPipeAsStdIn else None,
+			env=popenEnv,
+			cwd=workingDirectory or None,
+			preexec_fn=resourceLimits._createPreExecFunction(cgroup) if resourceLimits else None,
+		)
+		if resourceLimits or (timeout is not None) or (cancelEvent is not None) or stdOutForwarder or stdErrForwarder or timeline or (spillThreshold is not None) or stdErrMatcher:
+			(stdout, stderr, rusage, killReason) = _communicate.communicate(p, dataToPipeAsStdIn, timeout, cancelEvent, stdOutForwarder, stdErrForwarder, timeline, spillThreshold, stdErrMatcher)
 		else:
-			p = subprocess.Popen(cmd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=None)
-		(stdout, stderr) = p.communicate()
+			(stdout, stderr) = p.communicate(dataToPipeAsStdIn)
+			killReason = None
 		tDuration = time.time() - tStart
 
-		# process stdout
+		resourceUsage = resourceLimits._buildResourceUsage(p.returncode, rusage, cgroup) if resourceLimits else None
+	finally:
+		if cgroup:
+			cgroup.remove()
 
-		stdOutData = stdout.decode("utf-8")
+	r = _buildCommandResult(cmdPath, cmdArgs, stdout, stderr, p.returncode, tDuration, stdOutProcessing, stdErrProcessing, resourceUsage, killReason, timeline, stdErrMatcher)
+	if recording is not None:
+		recording._record(recordingKey, r)
+	return r
+#
 
-		if _common.debugValve:
-			_common.debugValve("STDOUT:")
-			_common.debugValve(stdOutData)
 
-		stdOutData = _common.processCmdOutput(stdOutData, stdOutProcessing)
 
-		# process stderr
+#
+# Process the output of a terminated command and build the <c>CommandResult</c> object.
+#
+def _buildCommandResult(
+		cmdPath:str,
+		cmdArgs:list,
+		stdout:bytes,
+		stderr:bytes,
+		returnCode:int,
+		tDuration:float,
+		stdOutProcessing:TextDataProcessingPolicy,
+		stdErrProcessing:TextDataProcessingPolicy,
+		resourceUsage = None,
+		killReason:str = None,
+		timeline:OutputTimeline = None,
+		stdErrMatcher = None,
+	) -> CommandResult:
 
-		stdErrData = stderr.decode("utf-8")
+	# process stdout
 
-		if _common.debugValve:
-			_common.debugValve("STDERR:")
-			_common.debugValve(stdErrData)
+	if _common.debugValve:
+		_common.debugValve("STDOUT:")
+		_common.debugValve(_debugText(stdout))
 
-		stdErrData = _common.processCmdOutput(stdErrData, stdErrProcessing)
+	stdOutData, stdOutDecodeErrors = _processOutput(stdout, stdOutProcessing)
 
-		# ----
+	# process stderr
 
-		if _common.debugValve != None:
-			_common.debugValve("RETURN CODE:", p.returncode)
+	if _common.debugValve:
+		_common.debugValve("STDERR:")
+		_common.debugValve(_debugText(stderr))
 
-		return CommandResult(cmdPath, cmdArgs, stdOutData, stdErrData, p.returncode, tDuration)
+	stdErrData, stdErrDecodeErrors = _processOutput(stderr, stdErrProcessing)
 
-	finally:
-		if returnToDirectory:
-			os.chdir(returnToDirectory)
+	# ----
+
+	if _common.debugValve != None:
+		_common.debugValve("RETURN CODE:", returnCode)
+
+	if stdErrMatcher is None:
+		errorClasses = None
+		errorMatches = None
+	else:
+		errorClasses = stdErrMatcher.classes
+		errorMatches = stdErrMatcher.matches
+
+	return CommandResult(cmdPath, cmdArgs, stdOutData, stdErrData, returnCode, tDuration, resourceUsage, killReason, timeline, stdOutDecodeErrors, stdErrDecodeErrors,
+		errorClasses, errorMatches)
+#
+
+def _debugText(data:typing.Union[bytes,mmap.mmap]) -> str:
+	if isinstance(data, mmap.mmap):
+		return "(" + str(len(data)) + " bytes spilled to disk)"
+	return data.decode("utf-8", "replace")
+#
+
+#
+# @return		TextData			The processed output.
+# @return		int					The number of decoding errors (or <c>None</c> if the output has been spilled to disk).
+#
+def _processOutput(data:typing.Union[bytes,mmap.mmap], policy:TextDataProcessingPolicy) -> tuple:
+	if isinstance(data, mmap.mmap):
+		from ._MappedTextData import _MappedTextData
+		return _MappedTextData(data, policy), None
+
+	decoder = _TextDecoder(errors=policy.decodingErrors or "replace")
+	return _common.processCmdOutput(data, policy, decoder), decoder.nErrors
 #
 
 
@@ -0,0 +1,365 @@
+
+
+import os
+import sys
+import time
+import random
+import re
+import subprocess
+import threading
+import typing
+
+
+
+
+#
+# A file opened via <c>_FakeSFTPClient</c>.
+#
+class _FakeSFTPFile(object):
+
+	def __init__(self, connection, filePath:str, mode:str):
+		self.__connection = connection
+		self.__f = open(filePath, mode)
+		self.__bPipelined = False
+		self.__bPendingWrites = False
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+	def set_pipelined(self, pipelined:bool = True):
+		self.__bPipelined = pipelined
+	#
+
+	def seek(self, offset:int, whence:int = 0):
+		self.__f.seek(offset, whence)
+	#
+
+	def tell(self) -> int:
+		return self.__f.tell()
+	#
+
+	def truncate(self, size:int):
+		self.__connection._request()
+		self.__f.truncate(size)
+	#
+
+	def read(self, size:int = -1) -> bytes:
+		self.__connection._request()
+		data = self.__f.read(size)
+		self.__connection._transfer(len(data))
+		return data
+	#
+
+	#
+	# Read multiple blocks. As with paramiko the requests are pipelined, so the latency applies only once.
+	#
+	def readv(self, chunks:typing.List[typing.Tuple[int,int]], max_concurrent_prefetch_requests:int = None):
+		self.__connection._request()
+		for offset, size in chunks:
+			self.__f.seek(offset)
+			data = self.__f.read(size)
+			self.__connection._transfer(len(data))
+			yield data
+	#
+
+	def write(self, data:bytes):
+		if self.__bPipelined:
+			# the acknowledgement is awaited when the file is closed
+			self.__bPendingWrites = True
+		else:
+			self.__connection._request()
+		self.__connection._transfer(len(data))
+		self.__f.write(data)
+	#
+
+	def close(self):
+		if self.__f.closed:
+			return
+		if self.__bPendingWrites:
+			self.__connection._request()
+		self.__f.close()
+	#
+
+#
+
+
+
+#
+# A stand-in for <c>paramiko.SFTPClient</c> operating on the local file system.
+#
+class _FakeSFTPClient(object):
+
+	def __init__(self, connection):
+		self.__connection = connection
+	#
+
+	def stat(self, path:str) -> os.stat_result:
+		self.__connection._request()
+		return os.stat(path)
+	#
+
+	def open(self, filename:str, mode:str = "r", bufsize:int = -1) -> _FakeSFTPFile:
+		self.__connection._request()
+		if "b" not in mode:
+			mode += "b"
+		return _FakeSFTPFile(self.__connection, filename, mode)
+	#
+
+	def remove(self, path:str):
+		self.__connection._request()
+		os.unlink(path)
+	#
+
+	def rename(self, oldpath:str, newpath:str):
+		self.__connection._request()
+		if os.path.exists(newpath):
+			raise IOError("File exists: " + repr(newpath))
+		os.rename(oldpath, newpath)
+	#
+
+	def posix_rename(self, oldpath:str, newpath:str):
+		self.__connection._request()
+		os.replace(oldpath, newpath)
+	#
+
+	def close(self):
+		pass
+	#
+
+#
+
+
+
+#
+# A stand-in for <c>paramiko.SSHClient</c> as provided by <c>Connection.client</c>.
+#
+class _FakeSSHClient(object):
+
+	def __init__(self, connection):
+		self.__connection = connection
+	#
+
+	def open_sftp(self) -> _FakeSFTPClient:
+		self.__connection._request()
+		return _FakeSFTPClient(self.__connection)
+	#
+
+#
+
+
+
+#
+# An in-process stand-in for <c>fabric.Connection</c> for testing and benchmarking code that runs commands remotely via <c>runCmd()</c>,
+# <c>getFile()</c> and <c>putFile()</c> without a SSH server and without network.
+#
+# Commands are run locally by <c>/bin/sh</c> and SFTP operations are performed on the local file system. Network conditions can be simulated:
+#
+# * every request (running a command, opening a file, ...) takes <c>latency</c> seconds longer (a round trip);
+# * all data transferred shares a link of <c>bandwidth</c> bytes per second;
+# * requests fail randomly with a probability of <c>failureRate</c> or if the command matches <c>failurePattern</c>. The failure is a
+#   <c>ConnectionResetError</c> as if the connection had been lost.
+#
+# NOTE: Running commands requires the python module "<c>invoke</c>" to be installed (see the "remote" extra of this package) as results and
+# errors are reported using its classes, just like fabric does.
+#
+class FakeConnection(object):
+
+	# makes runCmd(), getFile() and putFile() treat objects of this class as fabric connections
+	_bFabricCompatible = True
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method.
+	#
+	# @param		str host						(optional) The host name to report. (Default: "localhost")
+	# @param		int port						(optional) The port to report. (Default: 22)
+	# @param		str user						(optional) The user name to report. (Default: the current user)
+	# @param		float latency					(optional) The round trip time in seconds added to every request. (Default: 0)
+	# @param		float bandwidth					(optional) The bandwidth in bytes per second. (Default: unlimited)
+	# @param		float failureRate				(optional) The probability of a request to fail (0 .. 1). (Default: 0)
+	# @param		str|re.Pattern failurePattern	(optional) Running a command matching this regular expression (via <c>re.search()</c>) fails.
+	# @param		int seed						(optional) A seed for the random failures in order to get reproducable results.
+	#
+	def __init__(self,
+			host:str = "localhost",
+			port:int = 22,
+			user:str = None,
+			latency:float = 0,
+			bandwidth:float = None,
+			failureRate:float = 0,
+			failurePattern:typing.Union[str,typing.Pattern] = None,
+			seed:int = None,
+		):
+
+		assert latency >= 0
+		assert (bandwidth is None) or (bandwidth > 0)
+		assert 0 <= failureRate <= 1
+
+		if user is None:
+			import getpass
+			user = getpass.getuser()
+		if isinstance(failurePattern, str):
+			failurePattern = re.compile(failurePattern)
+
+		self.host = host
+		self.port = port
+		self.user = user
+		self.latency = latency
+		self.bandwidth = bandwidth
+		self.failureRate = failureRate
+		self.failurePattern = failurePattern
+
+		self.client = _FakeSSHClient(self)
+		self.__random = random.Random(seed)
+		self.__lock = threading.Lock()
+		self.__tLinkFree = 0
+		self.__bIsOpen = False
+		self.__nRequests = 0
+		self.__nBytesTransferred = 0
+		self.__nFailuresInjected = 0
+	#
+
+	################################################################################################################################
+	## Public Properties
+	################################################################################################################################
+
+	@property
+	def is_connected(self) -> bool:
+		return self.__bIsOpen
+	#
+
+	#
+	# The number of requests performed so far.
+	#
+	@property
+	def nRequests(self) -> int:
+		return self.__nRequests
+	#
+
+	#
+	# The number of bytes transferred so far (in both directions).
+	#
+	@property
+	def nBytesTransferred(self) -> int:
+		return self.__nBytesTransferred
+	#
+
+	#
+	# The number of requests that failed because a failure has been injected.
+	#
+	@property
+	def nFailuresInjected(self) -> int:
+		return self.__nFailuresInjected
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	def __fail(self):
+		with self.__lock:
+			self.__nFailuresInjected += 1
+		self.__bIsOpen = False
+		raise ConnectionResetError("Injected connection failure")
+	#
+
+	#
+	# Perform a request: wait for the round trip and inject a failure if required.
+	#
+	def _request(self):
+		self.__bIsOpen = True
+		with self.__lock:
+			self.__nRequests += 1
+			bFail = (self.failureRate > 0) and (self.__random.random() < self.failureRate)
+		if self.latency:
+			time.sleep(self.latency)
+		if bFail:
+			self.__fail()
+	#
+
+	#
+	# Transfer data over the simulated link. All transfers share the bandwidth.
+	#
+	def _transfer(self, nBytes:int):
+		with self.__lock:
+			self.__nBytesTransferred += nBytes
+			if self.bandwidth is None:
+				return
+			tNow = time.monotonic()
+			self.__tLinkFree = max(tNow, self.__tLinkFree) + nBytes / self.bandwidth
+			tWait = self.__tLinkFree - tNow
+		if tWait > 0:
+			time.sleep(tWait)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	def open(self):
+		self.__bIsOpen = True
+	#
+
+	def close(self):
+		self.__bIsOpen = False
+	#
+
+	def __enter__(self):
+		self.open()
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.close()
+	#
+
+	def sftp(self) -> _FakeSFTPClient:
+		return self.client.open_sftp()
+	#
+
+	#
+	# Run a command the way <c>fabric.Connection.run()</c> does.
+	#
+	# @param		str command						(required) The command to run. It is interpreted by <c>/bin/sh</c>.
+	# @param		bool hide						(optional) If <c>False</c> the output is written to STDOUT and STDERR of the current process.
+	# @param		bool warn						(optional) If <c>True</c> no exception is raised if the command fails.
+	# @param		str encoding					(optional) The encoding of the output. (Default: "utf-8")
+	# @return		invoke.runners.Result			The result.
+	#
+	def run(self, command:str, hide:bool = False, warn:bool = False, encoding:str = "utf-8", **kwargs):
+		import invoke
+
+		self._request()
+		if (self.failurePattern is not None) and self.failurePattern.search(command):
+			self.__fail()
+
+		p = subprocess.run([ "/bin/sh", "-c", command ], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+		self._transfer(len(command) + len(p.stdout) + len(p.stderr))
+
+		stdOut = p.stdout.decode(encoding, "replace")
+		stdErr = p.stderr.decode(encoding, "replace")
+		if not hide:
+			sys.stdout.write(stdOut)
+			sys.stderr.write(stdErr)
+
+		# like a SSH server report termination by a signal as 128 + signal number
+		exitCode = p.returncode if p.returncode >= 0 else 128 - p.returncode
+		result = invoke.runners.Result(stdout=stdOut, stderr=stdErr, encoding=encoding, command=command, shell="/bin/sh", exited=exitCode)
+		if (exitCode != 0) and not warn:
+			raise invoke.exceptions.UnexpectedExit(result)
+		return result
+	#
+
+#
+
+
+
@@ -0,0 +1,170 @@
+
+
+import os
+import time
+import shutil
+import socket
+import tempfile
+import subprocess
+import typing
+
+
+
+
+#
+# Runs a private <c>sshd</c> on a temporary port of 127.0.0.1 for testing and benchmarking remote execution on a single machine.
+#
+# The server runs as the current user with its own host key and accepts only a client key generated for it, so neither root privileges
+# nor changes to the system configuration are required. Everything is removed again when the server is stopped.
+#
+# NOTE: This requires the programs "<c>sshd</c>" and "<c>ssh-keygen</c>" (OpenSSH). Connecting requires the python module "<c>fabric</c>"
+# to be installed (see the "remote" extra of this package).
+#
+# Example:
+#
+#	with LocalSSHServer() as server:
+#		with server.connect() as c:
+#			r = runCmd(c, "uname -a")
+#
+class LocalSSHServer(object):
+
+	################################################################################################################################
+	## Constructor
+	################################################################################################################################
+
+	#
+	# Constructor method. This starts the server.
+	#
+	# @param		str sshdPath					(optional) The path of the <c>sshd</c> program. (Default: looked up in <c>PATH</c>, "/usr/sbin" and "/usr/local/sbin")
+	# @param		float startupTimeout			(optional) The maximum time in seconds to wait for the server to accept connections. (Default: 10)
+	#
+	def __init__(self, sshdPath:str = None, startupTimeout:float = 10):
+		if sshdPath is None:
+			sshdPath = shutil.which("sshd", path=os.pathsep.join([ os.environ.get("PATH", ""), "/usr/sbin", "/usr/local/sbin" ]))
+			if sshdPath is None:
+				raise Exception("sshd not found!")
+		sshKeyGenPath = shutil.which("ssh-keygen")
+		if sshKeyGenPath is None:
+			raise Exception("ssh-keygen not found!")
+
+		self.__tempDirPath = tempfile.mkdtemp(prefix="jk_simpleexec-sshd-")
+		self.__p = None
+		try:
+			hostKeyFilePath = os.path.join(self.__tempDirPath, "host_key")
+			self.clientKeyFilePath = os.path.join(self.__tempDirPath, "client_key")
+			for keyFilePath in [ hostKeyFilePath, self.clientKeyFilePath ]:
+				subprocess.run([ sshKeyGenPath, "-q", "-t", "ed25519", "-N", "", "-f", keyFilePath ], check=True, stdin=subprocess.DEVNULL)
+			authorizedKeysFilePath = os.path.join(self.__tempDirPath, "authorized_keys")
+			shutil.copyfile(self.clientKeyFilePath + ".pub", authorizedKeysFilePath)
+
+			self.host = "127.0.0.1"
+			self.port = self.__findFreePort(self.host)
+
+			configFilePath = os.path.join(self.__tempDirPath, "sshd_config")
+			with open(configFilePath, "w") as fout:
+				fout.write("\n".join([
+					"ListenAddress " + self.host,
+					"Port " + str(self.port),
+					"HostKey " + hostKeyFilePath,
+					"PidFile " + os.path.join(self.__tempDirPath, "sshd.pid"),
+					"AuthorizedKeysFile " + authorizedKeysFilePath,
+					"PubkeyAuthentication yes",
+					"PasswordAuthentication no",
+					"KbdInteractiveAuthentication no",
+					"UsePAM no",
+					"StrictModes no",
+					"Subsystem sftp internal-sftp",
+					"",
+				]))
+
+			self.__p = subprocess.Popen([ sshdPath, "-D", "-e", "-f", configFilePath ], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+			self.__waitForStartup(startupTimeout)
+		except:
+			self.stop()
+			raise
+	#
+
+	################################################################################################################################
+	## Helper Methods
+	################################################################################################################################
+
+	@staticmethod
+	def __findFreePort(host:str) -> int:
+		with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+			s.bind((host, 0))
+			return s.getsockname()[1]
+	#
+
+	def __waitForStartup(self, timeout:float):
+		tDeadline = time.monotonic() + timeout
+		while True:
+			if self.__p.poll() is not None:
+				raise Exception("sshd terminated: " + self.__p.stderr.read().decode("utf-8", "replace").strip())
+			try:
+				with socket.create_connection((self.host, self.port), timeout=0.5):
+					return
+			except OSError:
+				if time.monotonic() >= tDeadline:
+					raise Exception("sshd did not start within " + str(timeout) + " seconds!")
+				time.sleep(0.05)
+	#
+
+	################################################################################################################################
+	## Public Methods
+	################################################################################################################################
+
+	#
+	# Create a fabric connection to this server.
+	#
+	# @param		str user						(optional) The user to log in as. Only the user running this server can log in. (Default: the current user)
+	# @param		dict kwargs						(optional) Additional arguments for <c>fabric.Connection</c>.
+	# @return		fabric.Connection				The connection (not yet opened).
+	#
+	def connect(self, user:str = None, **kwargs):
+		import fabric
+		import getpass
+
+		return fabric.Connection(
+			host=self.host,
+			port=self.port,
+			user=user or getpass.getuser(),
+			connect_kwargs={
+				"key_filename": self.clientKeyFilePath,
+				"look_for_keys": False,
+				"allow_agent": False,
+			},
+			**kwargs,
+		)
+	#
+
+	#
+	# Stop the server and remove all temporary files.
+	#
+	def stop(self):
+		if self.__p is not None:
+			if self.__p.poll() is None:
+				self.__p.terminate()
+				try:
+					self.__p.wait(5)
+				except subprocess.TimeoutExpired:
+					self.__p.kill()
+					self.__p.wait()
+			self.__p.stderr.close()
+			self.__p = None
+		if self.__tempDirPath is not None:
+			shutil.rmtree(self.__tempDirPath, ignore_errors=True)
+			self.__tempDirPath = None
+	#
+
+	def __enter__(self):
+		return self
+	#
+
+	def __exit__(self, exType, exObj, exStackTrace):
+		self.stop()
+	#
+
+#
+
+
+
@@ -0,0 +1,15 @@
+
+
+
+#
+# Helpers for testing and benchmarking code that runs commands remotely via <c>runCmd()</c>, <c>getFile()</c> and <c>putFile()</c>.
+# These are not imported by <c>import jk_simpleexec</c>: use <c>import jk_simpleexec.testing</c>.
+#
+
+
+
+from .FakeConnection import FakeConnection
+from .LocalSSHServer import LocalSSHServer
+
+
+
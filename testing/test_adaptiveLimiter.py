@@ -0,0 +1,120 @@
+
+
+import os
+import sys
+import time
+import tempfile
+
+import jk_simpleexec
+
+# the module (not the class of the same name)
+_AdaptiveLimiterModule = sys.modules["jk_simpleexec.AdaptiveLimiter"]
+
+
+
+
+def _createLimiter(**kwargs) -> jk_simpleexec.AdaptiveLimiter:
+	args = dict(minLimit=1, maxLimit=10, initialLimit=8, maxLoadPerCPU=None, maxPressure={ "cpu": None, "memory": None, "io": None }, adjustInterval=0)
+	args.update(kwargs)
+	return jk_simpleexec.AdaptiveLimiter(**args)
+#
+
+
+
+def test_latency():
+	limiter = _createLimiter(targetLatency=1)
+
+	# the limit is reached: additive increase up to the maximum
+	while limiter.tryAcquire():
+		pass
+	assert limiter.limit == limiter.running == 10
+	assert limiter.getMetrics()["increase"] == 2
+
+	# too slow: multiplicative decrease
+	limiter.release(5.0)
+	assert limiter.limit == 7
+	d = limiter.getMetrics()["lastDecision"]
+	assert d["action"] == "decrease"
+	assert d["reasons"] == [ "latency" ]
+	assert d["previousLimit"] == 10
+
+	# without new results the limit is not decreased again
+	for i in range(5):
+		limiter.tryAcquire()
+	assert limiter.limit >= 7
+	assert limiter.getMetrics()["decrease"] == 1
+	assert limiter.getMetrics()["signals"]["latency"] is None
+
+	# only the latencies observed since the previous decision count
+	nDecreases = limiter.getMetrics()["decrease"]
+	while limiter.running > 0:
+		limiter.release(0.01)
+	assert limiter.getMetrics()["decrease"] == nDecreases
+	assert limiter.getMetrics()["signals"]["latency"] == 0.01
+
+	# fast again
+	while limiter.tryAcquire():
+		pass
+	assert limiter.limit == 10
+	assert limiter.getMetrics()["decrease"] == nDecreases
+	assert [ d["action"] for d in limiter.getDecisions() ].count("decrease") == nDecreases
+#
+
+
+
+def test_hostSignals(monkeypatch):
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		loadAvgFilePath = os.path.join(tempDirPath, "loadavg")
+		with open(loadAvgFilePath, "w") as fout:
+			fout.write("{} 1.00 1.00 2/300 12345\n".format(100 * (os.cpu_count() or 1)))
+		with open(os.path.join(tempDirPath, "cpu"), "w") as fout:
+			fout.write("some avg10=90.00 avg60=10.00 avg300=1.00 total=123456\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+		monkeypatch.setattr(_AdaptiveLimiterModule, "_LOADAVG_FILE_PATH", loadAvgFilePath)
+		monkeypatch.setattr(_AdaptiveLimiterModule, "_PRESSURE_FILE_PATH_PATTERN", os.path.join(tempDirPath, "{}"))
+
+		limiter = _createLimiter(maxLoadPerCPU=1.5, maxPressure={ "cpu": 40.0, "memory": 10.0 })
+		assert limiter.tryAcquire()
+		limiter.release()
+		d = limiter.getDecisions()[0]
+		assert d["action"] == "decrease"
+		assert d["reasons"] == [ "loadavg", "cpu pressure" ]
+		# the memory PSI file is missing: this signal is ignored
+		assert d["signals"]["memoryPressure"] is None
+		assert d["signals"]["cpuPressure"] == 90.0
+
+		# the averages do not reflect the decrease yet: no further decrease within the cooldown period
+		limit = limiter.limit
+		for i in range(10):
+			if limiter.tryAcquire():
+				limiter.release()
+		assert limiter.limit == limit
+		assert limiter.getMetrics()["decrease"] == 1
+		d = limiter.getMetrics()["lastDecision"]
+		assert d["action"] == "hold"
+		assert d["reasons"] == [ "loadavg", "cpu pressure" ]
+
+		# the limit never drops below the minimum
+		monkeypatch.setattr(jk_simpleexec.AdaptiveLimiter, "LOADAVG_COOLDOWN", 0)
+		monkeypatch.setattr(jk_simpleexec.AdaptiveLimiter, "PRESSURE_COOLDOWN", 0)
+		for i in range(10):
+			if limiter.tryAcquire():
+				limiter.release()
+		assert limiter.limit == 1
+#
+
+
+
+def test_jobScheduler():
+	limiter = _createLimiter(maxLimit=1, initialLimit=1, adjustInterval=60)
+	with jk_simpleexec.JobScheduler(maxWorkers=4, limiter=limiter) as scheduler:
+		t = time.monotonic()
+		jobs = [ scheduler.submit(cmdPath="sleep", cmdArgs=[ "0.1" ]) for i in range(4) ]
+		assert scheduler.getStats()["limit"] == 1
+		scheduler.waitAll()
+		assert time.monotonic() - t >= 0.4
+	assert all(job.state == "succeeded" for job in jobs)
+	assert limiter.running == 0
+#
+
+
+
@@ -0,0 +1,122 @@
+
+
+import os
+import time
+import threading
+import subprocess
+import tempfile
+
+import pytest
+
+import jk_simpleexec
+import jk_simpleexec.testing
+
+
+
+
+def _runCommands() -> list:
+	return [
+		jk_simpleexec.invokeCmd2(cmdPath="cat", cmdArgs=[], dataToPipeAsStdIn="first"),
+		jk_simpleexec.invokeCmd2(cmdPath="cat", cmdArgs=[], dataToPipeAsStdIn="second"),
+		jk_simpleexec.invokeCmd2(cmdPath="pwd", cmdArgs=[], workingDirectory="/"),
+		jk_simpleexec.runCmd(None, "echo hello; echo err >&2"),
+		jk_simpleexec.runCmd(None, [ "sleep", "0.2" ]),
+	]
+#
+
+
+
+@pytest.mark.parametrize("compression", [ None, "gzip" ])
+def test_recordReplay(monkeypatch, compression):
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "commands.rec")
+
+		with jk_simpleexec.enableRecording(filePath, compression=compression) as recording:
+			recorded = _runCommands()
+			with pytest.raises(Exception):
+				jk_simpleexec.runCmd(None, [ "sh", "-c", "exit 3" ])
+			assert recording.nRecorded == 6
+		assert jk_simpleexec._common.commandRecording is None
+
+		# no process must be started while replaying
+		def noPopen(*args, **kwargs):
+			raise AssertionError("a process has been started")
+		monkeypatch.setattr(subprocess, "Popen", noPopen)
+
+		with jk_simpleexec.enableReplay(filePath) as recording:
+			assert recording.commandCount == 6
+			t = time.monotonic()
+			replayed = _runCommands()
+			assert time.monotonic() - t < 0.1
+			for a, b in zip(recorded, replayed):
+				assert a.toJSON() == b.toJSON()
+			assert replayed[0].stdOutLines == [ "first" ]
+			assert replayed[1].stdOutLines == [ "second" ]
+
+			# the exit code is checked the same way
+			with pytest.raises(Exception):
+				jk_simpleexec.runCmd(None, [ "sh", "-c", "exit 3" ])
+
+			# different STDIN, different working directory or a remote host: not recorded
+			with pytest.raises(Exception):
+				jk_simpleexec.invokeCmd2(cmdPath="cat", cmdArgs=[], dataToPipeAsStdIn="third")
+			with pytest.raises(Exception):
+				jk_simpleexec.invokeCmd2(cmdPath="pwd", cmdArgs=[], workingDirectory="/tmp")
+			with pytest.raises(Exception):
+				jk_simpleexec.runCmd(jk_simpleexec.testing.FakeConnection(), "echo hello; echo err >&2")
+			assert recording.nMissing == 3
+			assert recording.nReplayed == 6
+
+		with jk_simpleexec.enableReplay(filePath, simulateDuration=1.0):
+			t = time.monotonic()
+			r = jk_simpleexec.runCmd(None, [ "sleep", "0.2" ])
+			assert time.monotonic() - t >= r.duration
+#
+
+
+
+def test_repeatedCommands():
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "commands.rec")
+
+		with jk_simpleexec.enableRecording(filePath):
+			for i in range(3):
+				jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo " + str(i) + " > counter; cat counter" ], workingDirectory=tempDirPath)
+		# appending to an existing recording
+		with jk_simpleexec.enableRecording(filePath):
+			jk_simpleexec.invokeCmd2(cmdPath="echo", cmdArgs=[ "x" ])
+
+		# results recorded multiple times are served in the order of recording, then again from the beginning
+		with jk_simpleexec.enableReplay(filePath, passThrough=True) as recording:
+			outputs = [
+				jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo " + str(i) + " > counter; cat counter" ], workingDirectory=tempDirPath).stdOutLines[0]
+				for i in range(3)
+			]
+			# passThrough: the command is run
+			assert jk_simpleexec.invokeCmd2(cmdPath="echo", cmdArgs=[ "y" ]).stdOutLines == [ "y" ]
+			assert jk_simpleexec.invokeCmd2(cmdPath="echo", cmdArgs=[ "x" ]).stdOutLines == [ "x" ]
+			assert recording.nMissing == 1
+	assert outputs == [ "0", "1", "2" ]
+#
+
+
+
+def test_replayCancelled():
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "commands.rec")
+		with jk_simpleexec.enableRecording(filePath):
+			jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo x; sleep 1" ])
+
+		with jk_simpleexec.enableReplay(filePath, simulateDuration=5.0):
+			cancelEvent = threading.Event()
+			threading.Timer(0.1, cancelEvent.set).start()
+			t = time.monotonic()
+			r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo x; sleep 1" ], cancelEvent=cancelEvent)
+			assert time.monotonic() - t < 3
+	assert r.limitKillReason == "cancelled"
+	assert r.returnCode == -9
+	assert r.stdOutLines == []
+#
+
+
+
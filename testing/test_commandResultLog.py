@@ -0,0 +1,95 @@
+
+
+import os
+import tempfile
+
+import pytest
+
+import jk_simpleexec
+
+
+
+
+def _createResults() -> list:
+	return [
+		jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo 'line 1'; echo; echo 'äöü \\t x'; echo err >&2; exit 3" ]),
+		jk_simpleexec.invokeCmd2(cmdPath="/bin/true", cmdArgs=[], resourceLimits=jk_simpleexec.ResourceLimits()),
+		jk_simpleexec.invokeCmd2(cmdPath="sleep", cmdArgs=[ "5" ], timeout=0.05),
+		jk_simpleexec.CommandResult("x", None, [ "" ], [], 0, 1.5),
+		# raw output that is not valid UTF-8
+		jk_simpleexec.invokeCmd2(cmdPath="printf", cmdArgs=[ "a\\377b\\n" ],
+			stdOutProcessing=jk_simpleexec.TextDataProcessingPolicy(decodingErrors="surrogateescape")),
+	]
+#
+
+def _assertEqual(a:jk_simpleexec.CommandResult, b:jk_simpleexec.CommandResult):
+	assert a.toJSON() == b.toJSON()
+#
+
+
+
+@pytest.mark.parametrize("format, compression", [
+	("binary", None),
+	("binary", "gzip"),
+	("binary", "zstd"),
+	("jsonl", None),
+])
+def test_writeRead(format, compression):
+	if compression == "zstd":
+		pytest.importorskip("zstandard")
+
+	results = _createResults()
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "results.log")
+
+		with jk_simpleexec.CommandResultLogWriter(filePath, format=format, compression=compression) as w:
+			w.writeAll(results[:2])
+		with jk_simpleexec.CommandResultLogWriter(filePath, format=format, compression=compression) as w:
+			assert w.recordCount == 2
+			w.writeAll(results[2:])
+
+		with jk_simpleexec.CommandResultLogReader(filePath) as reader:
+			assert reader.format == format
+			assert reader.compression == compression
+			loaded = list(reader)
+			assert len(loaded) == len(results)
+			for a, b in zip(results, loaded):
+				_assertEqual(a, b)
+			assert len(reader) == len(results)
+			_assertEqual(reader[-1], results[-1])
+			_assertEqual(reader[1], results[1])
+
+		assert loaded[2].limitKillReason == "timeout"
+		assert loaded[1].resourceUsage.maxRSS == results[1].resourceUsage.maxRSS
+		assert loaded[4].stdOutLines == [ "a\udcffb" ]
+#
+
+
+
+@pytest.mark.parametrize("format", [ "binary", "jsonl" ])
+def test_incompleteRecord(format):
+	results = _createResults()
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		filePath = os.path.join(tempDirPath, "results.log")
+
+		with jk_simpleexec.CommandResultLogWriter(filePath, format=format) as w:
+			w.writeAll(results)
+		# simulate a writer that has been killed while writing the last record
+		with open(filePath, "r+b") as f:
+			f.truncate(os.path.getsize(filePath) - 3)
+
+		with jk_simpleexec.CommandResultLogReader(filePath) as reader:
+			assert len(list(reader)) == len(results) - 1
+			assert len(reader) == len(results) - 1
+
+		with jk_simpleexec.CommandResultLogWriter(filePath, format=format) as w:
+			assert w.recordCount == len(results) - 1
+			w.write(results[-1])
+
+		with jk_simpleexec.CommandResultLogReader(filePath, bUseIndex=False) as reader:
+			assert len(reader) == len(results)
+			_assertEqual(reader[-1], results[-1])
+#
+
+
+
@@ -0,0 +1,38 @@
+import pytest
+
+import jk_simpleexec
+
+
+
+
+def test_render():
+	t = jk_simpleexec.CommandTemplate("tar -c -v{verbose?} [--exclude={excludes*}] -f '{literal}' \"{dir}/\" {files*}")
+	assert not t.requiresShell
+	assert t.placeholderNames == [ "verbose", "excludes", "dir", "files" ]
+	assert t.render(dir="a b; rm -rf /", files=[ "x", "y" ], verbose=True) == [ "tar", "-c", "-v", "-f", "{literal}", "a b; rm -rf //", "x", "y" ]
+	assert t.render({ "dir": "d", "excludes": [ "*.o", "*.a" ] }) == [ "tar", "-c", "--exclude=*.o", "--exclude=*.a", "-f", "{literal}", "d/" ]
+	assert t.renderCommandLine(dir="it's") == "tar -c -f '{literal}' 'it'\"'\"'s/'"
+
+	with pytest.raises(Exception):
+		t.render(files=[ "x" ])
+#
+
+
+
+def test_shellFallback():
+	messages = []
+	t = jk_simpleexec.CommandTemplate("echo {text} | tr a-z A-Z > /dev/stderr; [ -n \"{text}\" ]", log=messages.append)
+	assert t.requiresShell
+	assert t.shellSyntax == [ "pipe", "redirection", "command separator" ]
+	assert len(messages) == 1
+
+	r = t.invoke({ "text": "a$(id)\"`b`" })
+	assert r.stdErrLines == [ "A$(ID)\"`B`" ]
+	assert r.returnCode == 0
+
+	r = jk_simpleexec.runCmd(None, jk_simpleexec.CommandTemplate("printf %s {x}").render(x="$HOME"))
+	assert r.stdOutLines == [ "$HOME" ]
+#
+
+
+
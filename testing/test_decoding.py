@@ -0,0 +1,51 @@
+import pytest
+
+import jk_simpleexec
+from jk_simpleexec._TextDecoder import _TextDecoder
+
+
+
+
+def test_splitSequences():
+	data = "größer €uro 😀\n".encode("utf-8") * 3
+	for chunkSize in [ 1, 2, 3, 5 ]:
+		d = _TextDecoder(errors="strict")
+		text = "".join(d.decode(data[i:i+chunkSize]) for i in range(0, len(data), chunkSize)) + d.decode(b"", True)
+		assert text == data.decode("utf-8")
+		assert d.nErrors == 0
+#
+
+
+
+def test_policies():
+	cmdArgs = [ "-c", "printf 'a\\377b\\n\\342\\202'" ]
+
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=cmdArgs)
+	assert r.stdOutLines == [ "a�b", "�" ]
+	assert (r.stdOutDecodeErrors, r.stdErrDecodeErrors) == (2, 0)
+
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=cmdArgs, stdOutProcessing=jk_simpleexec.TextDataProcessingPolicy(decodingErrors="surrogateescape"))
+	assert "\n".join(r.stdOutLines).encode("utf-8", "surrogateescape") == b"a\xffb\n\xe2\x82"
+	assert r.stdOutDecodeErrors == 2
+
+	with pytest.raises(UnicodeDecodeError):
+		jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=cmdArgs, stdOutProcessing=jk_simpleexec.TextDataProcessingPolicy(decodingErrors="strict"))
+
+	r = jk_simpleexec.runCmd(None, "printf 'x\\377'")
+	assert r.stdOutLines == [ "x�" ]
+	assert r.stdOutDecodeErrors == 1
+#
+
+
+
+def test_forwarder():
+	lines = []
+	forwarder = jk_simpleexec.OutputForwarder(onLine=lines.append)
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "printf '\\303'; sleep 0.1; printf '\\274\\377\\n'" ], stdOutForwarder=forwarder)
+	assert lines == [ "ü�" ]
+	assert forwarder.nDecodeErrors == 1
+	assert r.stdOutLines == lines
+#
+
+
+
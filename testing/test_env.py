@@ -0,0 +1,58 @@
+
+
+import os
+
+import jk_simpleexec
+
+
+
+
+def test_inherit(monkeypatch):
+	monkeypatch.setenv("JK_SIMPLEEXEC_TEST", "inherited")
+	r = jk_simpleexec.invokeCmd2(cmdPath="/usr/bin/env", cmdArgs=[])
+	assert "JK_SIMPLEEXEC_TEST=inherited" in r.stdOutLines
+#
+
+
+
+def test_overrides(monkeypatch):
+	monkeypatch.setenv("JK_SIMPLEEXEC_TEST", "inherited")
+	r = jk_simpleexec.invokeCmd2(cmdPath="/usr/bin/env", cmdArgs=[], envOverrides={ "LC_ALL": "C", "JK_SIMPLEEXEC_TEST": None })
+	assert "LC_ALL=C" in r.stdOutLines
+	assert not [ x for x in r.stdOutLines if x.startswith("JK_SIMPLEEXEC_TEST=") ]
+	assert os.environ["JK_SIMPLEEXEC_TEST"] == "inherited"
+#
+
+
+
+def test_clearEnv():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/usr/bin/env", cmdArgs=[], clearEnv=True, envOverrides={ "FOO": "bar" })
+	assert r.stdOutLines == [ "FOO=bar" ]
+#
+
+
+
+def test_snapshot(monkeypatch):
+	monkeypatch.setenv("JK_SIMPLEEXEC_TEST", "inherited")
+	snapshot = jk_simpleexec.EnvSnapshot(envOverrides={ "LC_ALL": "C" })
+	monkeypatch.setenv("JK_SIMPLEEXEC_TEST", "changed later")
+
+	assert jk_simpleexec.EnvSnapshot.resolve(snapshot) is snapshot.env
+
+	r = jk_simpleexec.invokeCmd2(cmdPath="/usr/bin/env", cmdArgs=[], env=snapshot)
+	assert "LC_ALL=C" in r.stdOutLines
+	assert "JK_SIMPLEEXEC_TEST=inherited" in r.stdOutLines
+
+	snapshot2 = snapshot.derive({ "LC_ALL": None, "FOO": "bar" })
+	assert "LC_ALL" not in snapshot2
+	assert snapshot2["FOO"] == "bar"
+	assert "FOO" not in snapshot
+#
+
+
+
+
+
+
+
+
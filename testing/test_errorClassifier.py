@@ -0,0 +1,123 @@
+
+
+import time
+
+import pytest
+
+import jk_simpleexec
+
+
+
+
+def _createClassifier(**kwargs) -> jk_simpleexec.ErrorClassifier:
+	return jk_simpleexec.ErrorClassifier({
+		"permission": r"[Pp]ermission denied",
+		"notFound": [ r"No such file or directory", r"^command not found" ],
+		"disk": r"No space left on device",
+	}, **kwargs)
+#
+
+def _run(script:str, **kwargs) -> jk_simpleexec.CommandResult:
+	return jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", script ], **kwargs)
+#
+
+
+
+def test_classify():
+	c = _createClassifier()
+	assert c.classify("ok\nerror: No such file or directory\nfoo: permission denied\nPermission denied") == [ "notFound", "permission" ]
+	assert c.classify([ "x command not found", "command not found" ]) == [ "notFound" ]
+	assert c.classify(b"") == []
+	assert c.classify("PERMISSION DENIED") == []
+	assert _createClassifier(ignoreCase=True).classify("PERMISSION DENIED") == [ "permission" ]
+
+	with pytest.raises(Exception):
+		jk_simpleexec.ErrorClassifier({ "a": "(" })
+	with pytest.raises(Exception):
+		_createClassifier(fatalClasses=[ "unknown" ])
+#
+
+
+
+def test_patternRestrictions():
+	# the patterns are combined: constructs referring to or affecting other patterns are rejected with the class reported
+	for patterns in [
+		{ "a": r"x", "b": r"(\w+) \1" },
+		{ "a": r"(a)?(?(1)b|c)" },
+		{ "a": r"(?P<n>x)", "b": r"(?P<n>y)" },
+		{ "a": r"x", "b": r"(?i)y" },
+		{ "a": r"(?i)y" },
+		{ "a": r"(?P<_jkc0>x)" },
+	]:
+		with pytest.raises(Exception) as ei:
+			jk_simpleexec.ErrorClassifier(patterns)
+		className = list(patterns)[-1]
+		assert ("class " + repr(className)) in str(ei.value)
+
+	# what is supported
+	c = jk_simpleexec.ErrorClassifier({
+		"a": r"x",
+		"repeated": r"(?P<word>\w+) (?P=word)",
+		"scoped": r"(?i:error)",
+		"escapes": r"\\1[\1]\101",
+	})
+	assert c.classify("foo foo") == [ "repeated" ]
+	assert c.classify("foo bar") == []
+	assert c.classify("ERROR") == [ "scoped" ]
+	assert c.classify("\\1\x01A") == [ "escapes" ]
+#
+
+
+
+def test_incremental():
+	c = _createClassifier()
+	m = c._createMatcher()
+	# chunks split within lines and within multi byte characters
+	data = "ä: No such file or directory\nä: Permission den".encode("utf-8")
+	for i in range(len(data)):
+		m.feed(data[i:i+1])
+	assert m.classes == [ "notFound" ]
+	m.feed(b"ied\n")
+	assert m.classes == [ "notFound", "permission" ]
+	assert m.matches == [ ("notFound", "ä: No such file or directory"), ("permission", "ä: Permission denied") ]
+	m.close()
+#
+
+
+
+def test_invoke():
+	c = _createClassifier()
+	r = _run("echo 'cp: cannot stat: No such file or directory' >&2; echo out", stdErrClassifier=c)
+	assert r.errorClasses == [ "notFound" ]
+	assert r.errorMatches == [ ("notFound", "cp: cannot stat: No such file or directory") ]
+	assert r.limitKillReason is None
+	assert r.toJSON()["errorClasses"] == [ "notFound" ]
+
+	r = _run("echo warning >&2", stdErrClassifier=c)
+	assert r.errorClasses == []
+	assert _run("true").errorClasses is None
+
+	with jk_simpleexec.ExecutionEngine(2) as engine:
+		r = engine.run(cmdPath="/bin/sh", cmdArgs=[ "-c", "printf 'rm: Permission denied' >&2" ], stdErrClassifier=c)
+	assert r.errorClasses == [ "permission" ]
+#
+
+
+
+def test_fatal():
+	c = _createClassifier(fatalClasses=[ "disk" ])
+	t = time.monotonic()
+	r = _run("echo 'write: No space left on device' >&2; sleep 10", stdErrClassifier=c)
+	assert time.monotonic() - t < 5
+	assert r.limitKillReason == "fatalError"
+	assert r.errorClasses == [ "disk" ]
+
+	with jk_simpleexec.ExecutionEngine(2) as engine:
+		t = time.monotonic()
+		r = engine.run(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo 'No space left on device' >&2; sleep 10" ], stdErrClassifier=c)
+	assert time.monotonic() - t < 5
+	assert r.limitKillReason == "fatalError"
+#
+
+
+
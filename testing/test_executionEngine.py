@@ -0,0 +1,134 @@
+
+
+import time
+
+import jk_simpleexec
+
+
+
+
+def test_manyCommands():
+	with jk_simpleexec.ExecutionEngine(maxProcesses=50) as engine:
+		futures = [ engine.submit(cmdPath="/bin/sh", cmdArgs=[ "-c", "sleep 0.1; echo " + str(i) + "; echo e" + str(i) + " >&2" ]) for i in range(200) ]
+		for i, f in enumerate(futures):
+			r = f.result()
+			assert r.stdOutLines == [ str(i) ]
+			assert r.stdErrLines == [ "e" + str(i) ]
+			assert r.returnCode == 0
+#
+
+
+
+def test_stdinAndTimeline():
+	with jk_simpleexec.ExecutionEngine() as engine:
+		data = b"x" * (4 * 1024 * 1024)
+		r = engine.run(cmdPath="wc", cmdArgs=[ "-c" ], dataToPipeAsStdIn=data, recordTimeline=True)
+		assert r.stdOutLines == [ str(len(data)) ]
+		assert r.timeline.getLines("stdout")[0][2].strip() == str(len(data))
+#
+
+
+
+def test_timeoutAndCancel():
+	with jk_simpleexec.ExecutionEngine() as engine:
+		f1 = engine.submit(cmdPath="sleep", cmdArgs=[ "5" ], timeout=0.1)
+		f2 = engine.submit(cmdPath="sleep", cmdArgs=[ "5" ])
+		time.sleep(0.1)
+		engine.cancel(f2)
+		assert f1.result(3).limitKillReason == "timeout"
+		assert f2.result(3).limitKillReason == "cancelled"
+		assert f2.result().returnCode < 0
+#
+
+
+
+def test_finishedTimers():
+	with jk_simpleexec.ExecutionEngine() as engine:
+		r = engine.run(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo x" ], timeout=60)
+		assert r.stdOutLines == [ "x" ]
+		assert engine.run(cmdPath="sleep", cmdArgs=[ "5" ], timeout=0.1).limitKillReason == "timeout"
+		# queued timers must not keep finished children (and their output) alive
+		timers = engine._ExecutionEngine__timers
+		assert timers
+		assert all(entry[2] is None for entry in timers)
+#
+
+
+
+def test_queuedCancel():
+	with jk_simpleexec.ExecutionEngine(maxProcesses=1) as engine:
+		f1 = engine.submit(cmdPath="sleep", cmdArgs=[ "0.3" ])
+		f2 = engine.submit(cmdPath="true", cmdArgs=[])
+		engine.cancel(f2)
+		assert f1.result().returnCode == 0
+		assert f2.cancelled()
+#
+
+
+
+def test_error():
+	with jk_simpleexec.ExecutionEngine() as engine:
+		f = engine.submit(cmdPath="/does/not/exist", cmdArgs=[])
+		assert isinstance(f.exception(), FileNotFoundError)
+#
+
+
+
+def test_forwarderError():
+	def onChunk(chunk:bytes):
+		raise ValueError("failing forwarder")
+	#
+
+	with jk_simpleexec.ExecutionEngine() as engine:
+		f = engine.submit(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo x; sleep 5" ], stdOutForwarder=jk_simpleexec.OutputForwarder(onChunk=onChunk))
+		assert isinstance(f.exception(5), ValueError)
+		# the engine keeps running
+		assert engine.run(cmdPath="true", cmdArgs=[]).returnCode == 0
+		assert engine.runningCount == 0
+#
+
+
+
+def test_asCompleted():
+	with jk_simpleexec.ExecutionEngine(maxProcesses=3) as engine:
+		futures = [ engine.submit(cmdPath="/bin/sh", cmdArgs=[ "-c", "sleep " + t + "; echo " + t ]) for t in [ "5", "0.2", "0.1", "5" ] ]
+		t = time.monotonic()
+		results = list(engine.asCompleted(futures, stopWhen=lambda r: r.stdOutLines == [ "0.2" ]))
+		assert time.monotonic() - t < 3
+		assert [ r.stdOutLines for r in results ] == [ [ "0.1" ], [ "0.2" ] ]
+		# the running command has been killed, the queued one has not been started
+		assert futures[0].result().limitKillReason == "cancelled"
+		assert futures[3].cancelled() or (futures[3].result().limitKillReason == "cancelled")
+		assert engine.runningCount == 0
+#
+
+
+
+def test_invokeFirst():
+	t = time.monotonic()
+	r = jk_simpleexec.invokeFirst(commands=[
+		[ "/does/not/exist" ],
+		[ "sleep", "5" ],
+		[ "/bin/sh", "-c", "sleep 0.1; exit 1" ],
+		{ "cmdPath": "/bin/sh", "cmdArgs": [ "-c", "sleep 0.2; echo found" ] },
+	])
+	assert time.monotonic() - t < 3
+	assert r.stdOutLines == [ "found" ]
+
+	assert jk_simpleexec.invokeFirst(commands=[ [ "false" ], [ "/does/not/exist" ] ]) is None
+
+	# the predicate is evaluated once per result
+	evaluated = []
+	r = jk_simpleexec.invokeFirst(commands=[ [ "echo", "a" ], [ "/bin/sh", "-c", "sleep 0.2; echo b" ] ],
+		predicate=lambda r: evaluated.append(r.stdOutLines[0]) or (r.stdOutLines == [ "b" ]))
+	assert r.stdOutLines == [ "b" ]
+	assert evaluated == [ "a", "b" ]
+
+	# leaving the iteration early kills the remaining commands
+	it = jk_simpleexec.invokeAsCompleted(commands=[ [ "true" ], [ "sleep", "5" ] ])
+	t = time.monotonic()
+	for r in it:
+		break
+	it.close()
+	assert time.monotonic() - t < 3
+#
@@ -0,0 +1,61 @@
+import time
+import shutil
+
+import pytest
+
+import jk_simpleexec
+import jk_simpleexec.testing
+
+
+
+
+def test_runCmd():
+	c = jk_simpleexec.testing.FakeConnection()
+	r = jk_simpleexec.runCmd(c, "echo hello; echo error >&2; exit 3", failOnNonZeroExitCode=False)
+	assert r.stdOutLines == [ "hello" ]
+	assert r.stdErrLines == [ "error" ]
+	assert r.returnCode == 3
+	assert r.stdOutDecodeErrors is None
+
+	with pytest.raises(Exception):
+		jk_simpleexec.runCmd(c, "false")
+
+	# recognized as fabric connection without pretending to be one
+	assert type(c).__module__ == "jk_simpleexec.testing.FakeConnection"
+	assert not hasattr(jk_simpleexec, "FakeConnection")
+#
+
+
+
+def test_networkConditions():
+	c = jk_simpleexec.testing.FakeConnection(latency=0.1, bandwidth=100000)
+	t = time.monotonic()
+	jk_simpleexec.runCmd(c, "head -c 20000 /dev/zero")
+	assert time.monotonic() - t >= 0.3
+	assert c.nBytesTransferred > 20000
+
+	c = jk_simpleexec.testing.FakeConnection(failurePattern="^reboot", failureRate=0.5, seed=1)
+	nFailures = 0
+	for i in range(20):
+		try:
+			jk_simpleexec.runCmd(c, "true")
+		except ConnectionResetError:
+			nFailures += 1
+	assert 0 < nFailures < 20
+	assert c.nFailuresInjected == nFailures
+	with pytest.raises(ConnectionResetError):
+		jk_simpleexec.testing.FakeConnection(failurePattern="^reboot").run("reboot now")
+#
+
+
+
+@pytest.mark.skipif(shutil.which("sshd", path="/usr/sbin:/usr/local/sbin:/usr/bin") is None, reason="sshd is not installed")
+def test_localSSHServer():
+	with jk_simpleexec.testing.LocalSSHServer() as server:
+		with server.connect() as c:
+			r = jk_simpleexec.runCmd(c, "echo hello")
+			assert r.stdOutLines == [ "hello" ]
+#
+
+
+
@@ -0,0 +1,86 @@
+import os
+import stat
+import hashlib
+
+import pytest
+
+import jk_simpleexec
+import jk_simpleexec.testing
+from jk_simpleexec import _filetransfer
+
+
+
+
+def test_localCopy(tmp_path):
+	srcFilePath = str(tmp_path / "src")
+	with open(srcFilePath, "wb") as fout:
+		fout.write(b"abc" * 1000)
+	r = jk_simpleexec.getFile(None, srcFilePath, str(tmp_path / "dst"))
+	assert r.fileSize == 3000
+	assert r.sha256 == hashlib.sha256(b"abc" * 1000).hexdigest()
+	with open(str(tmp_path / "dst"), "rb") as fin:
+		assert fin.read() == b"abc" * 1000
+#
+
+
+
+def test_chunkedTransferAndResume(tmp_path):
+	c = jk_simpleexec.testing.FakeConnection()
+	data = os.urandom(5 * 65536 + 17)
+	srcFilePath = str(tmp_path / "src")
+	dstFilePath = str(tmp_path / "dst")
+	with open(srcFilePath, "wb") as fout:
+		fout.write(data)
+
+	for transferFunc in [ jk_simpleexec.getFile, jk_simpleexec.putFile ]:
+		r = transferFunc(c, srcFilePath, dstFilePath, chunkSize=65536)
+		assert (r.nChunks, r.bytesTransferred, r.isResumed) == (6, len(data), False)
+		assert r.sha256 == hashlib.sha256(data).hexdigest()
+		with open(dstFilePath, "rb") as fin:
+			assert fin.read() == data
+		assert not os.path.exists(dstFilePath + ".part")
+
+	# simulate an interrupted download of which the first three chunks have been completed
+	st = os.stat(srcFilePath)
+	journal = _filetransfer._Journal(dstFilePath + ".part.journal", { "size": len(data), "mtime": int(st.st_mtime), "chunkSize": 65536 })
+	journal.open({ 0, 1, 2 })
+	journal.close()
+	with open(dstFilePath + ".part", "wb") as fout:
+		fout.write(data[:3 * 65536] + bytes(len(data) - 3 * 65536))
+
+	r = jk_simpleexec.getFile(c, srcFilePath, dstFilePath, chunkSize=65536)
+	assert r.isResumed
+	assert r.bytesTransferred == len(data) - 3 * 65536
+	with open(dstFilePath, "rb") as fin:
+		assert fin.read() == data
+	assert not os.path.exists(journal.filePath)
+#
+
+
+
+def test_journalLocation(tmp_path):
+	c = jk_simpleexec.testing.FakeConnection()
+	srcFilePath = str(tmp_path / "src")
+	dstFilePath = str(tmp_path / "dst")
+	with open(srcFilePath, "wb") as fout:
+		fout.write(b"abc" * 1000)
+
+	# a symbolic link at the location of the journal is not followed
+	victimFilePath = str(tmp_path / "victim")
+	with open(victimFilePath, "wb") as fout:
+		fout.write(b"victim")
+	os.symlink(victimFilePath, dstFilePath + ".part.journal")
+	with pytest.raises(OSError):
+		jk_simpleexec.getFile(c, srcFilePath, dstFilePath, chunkSize=1024)
+	with open(victimFilePath, "rb") as fin:
+		assert fin.read() == b"victim"
+
+	# the journals of uploads are kept in a directory accessible by the current user only
+	st = os.stat(_filetransfer._getPrivateTempDirPath())
+	assert st.st_uid == os.getuid()
+	assert stat.S_IMODE(st.st_mode) == 0o700
+#
+
+
+
+
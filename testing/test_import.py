@@ -0,0 +1,50 @@
+
+
+
+import os
+import sys
+import subprocess
+
+import jk_simpleexec
+
+
+
+
+LAZY_MODULES = [
+	"invoke",
+	"fabric",
+	"lxml",
+	"xml.etree.ElementTree",
+	"json",
+	"jk_cmdoutputparsinghelper",
+]
+
+
+
+def test_import_does_not_load_optional_modules():
+	srcDirPath = os.path.dirname(os.path.dirname(os.path.abspath(jk_simpleexec.__file__)))
+	code = "import sys; sys.path.insert(0, {!r}); import jk_simpleexec; print(' '.join(m for m in {!r} if m in sys.modules))".format(srcDirPath, LAZY_MODULES)
+	p = subprocess.run([ sys.executable, "-c", code ], stdout=subprocess.PIPE, check=True)
+	assert p.stdout.decode("utf-8").strip() == ""
+#
+
+
+
+def test_dump():
+	import jk_prettyprintobj
+
+	r = jk_simpleexec.CommandResult("/bin/true", [], "abc", "", 0, 0.1)
+	assert isinstance(r, jk_prettyprintobj.DumpMixin)
+	assert isinstance(jk_simpleexec.TextDataProcessingPolicy(), jk_prettyprintobj.DumpMixin)
+	s = r.dumpToStr()
+	assert "CommandResult" in s
+	assert "'abc'" in s
+#
+
+
+
+
+
+
+
+
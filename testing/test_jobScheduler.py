@@ -0,0 +1,105 @@
+
+
+import os
+import time
+import tempfile
+
+import jk_simpleexec
+
+
+
+
+def test_priority():
+	order = []
+	with jk_simpleexec.JobScheduler(maxWorkers=1) as scheduler:
+		blocker = scheduler.submit(cmdPath="sleep", cmdArgs=[ "0.2" ])
+		jobs = [
+			scheduler.submit(cmdPath="echo", cmdArgs=[ str(prio) ], priority=prio, onDone=lambda job: order.append(job.result.stdOutLines[0]))
+			for prio in [ 1, 5, 3 ]
+		]
+		scheduler.waitAll()
+	assert order == [ "5", "3", "1" ]
+	assert all(job.state == "succeeded" for job in jobs)
+	assert blocker.state == "succeeded"
+#
+
+
+
+def test_retry():
+	with tempfile.TemporaryDirectory() as tempDirPath:
+		counterFilePath = os.path.join(tempDirPath, "counter")
+		# fails twice with a "temporary" error, then succeeds
+		script = "echo x >> " + counterFilePath + "; [ $(wc -l < " + counterFilePath + ") -ge 3 ] || { echo 'temporary failure' >&2; exit 1; }"
+
+		policy = jk_simpleexec.RetryPolicy(maxAttempts=5, retryOnStdErrPattern="temporary", retryOnReturnCodes=[], initialDelay=0.01)
+		with jk_simpleexec.JobScheduler(maxWorkers=2) as scheduler:
+			job = scheduler.submit(cmdPath="/bin/sh", cmdArgs=[ "-c", script ], retryPolicy=policy)
+			r = job.getResult()
+			assert job.attempts == 3
+			assert r.returnCode == 0
+
+			job = scheduler.submit(cmdPath="/bin/sh", cmdArgs=[ "-c", "exit 2" ], retryPolicy=policy)
+			job.wait()
+			assert job.state == "failed"
+			assert job.attempts == 1
+
+			stats = scheduler.getStats()
+			assert stats["retries"] == 2
+			assert stats["succeeded"] == 1
+			assert stats["failed"] == 1
+#
+
+
+
+def test_deadline():
+	with jk_simpleexec.JobScheduler(maxWorkers=1) as scheduler:
+		job = scheduler.submit(cmdPath="sleep", cmdArgs=[ "5" ], deadline=0.2)
+		job2 = scheduler.submit(cmdPath="true", cmdArgs=[], deadline=0.1)
+		scheduler.waitAll()
+	assert job.state == "expired"
+	assert job.result.limitKillReason == "timeout"
+	assert job.latency < 2
+	assert job2.state == "expired"
+	assert job2.attempts == 0
+#
+
+
+
+def test_cancel():
+	with jk_simpleexec.JobScheduler(maxWorkers=1) as scheduler:
+		job = scheduler.submit(cmdPath="sleep", cmdArgs=[ "5" ])
+		job2 = scheduler.submit(cmdPath="true", cmdArgs=[])
+		while job.state != "running":
+			time.sleep(0.01)
+		assert scheduler.queueDepth == 1
+		assert job2.cancel()
+		assert job.cancel()
+		assert job.wait(2)
+	assert job.state == "cancelled"
+	assert job2.state == "cancelled"
+	assert job2.attempts == 0
+	assert scheduler.getStats()["cancelled"] == 2
+#
+
+
+
+def test_onDoneException(caplog):
+	def onDone(job):
+		raise Exception("failing callback")
+	#
+
+	with jk_simpleexec.JobScheduler(maxWorkers=1) as scheduler:
+		job = scheduler.submit(cmdPath="true", cmdArgs=[], onDone=onDone)
+		job2 = scheduler.submit(cmdPath="true", cmdArgs=[])
+		job3 = scheduler.submit(cmdPath="true", cmdArgs=[], onDone=onDone)
+		# cancelling must not raise the exception of the callback either
+		job3.cancel()
+		assert job2.wait(5)
+		scheduler.waitAll()
+	assert job.state == "succeeded"
+	assert job2.state == "succeeded"
+	assert "failing callback" in caplog.text
+#
+
+
+
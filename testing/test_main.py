@@ -0,0 +1,63 @@
+
+
+import os
+import sys
+import json
+import shlex
+import subprocess
+
+import pytest
+
+import jk_simpleexec
+import jk_simpleexec.__main__
+
+
+
+
+def test_table(capsys):
+	ret = jk_simpleexec.__main__.main([ "-j", "2", "-n", "3", "echo hello", "sh -c 'exit 1'" ])
+	assert ret == 1
+	out = capsys.readouterr().out
+	lines = out.splitlines()
+	assert lines[0].split() == [ "command", "runs", "ok", "failed", "retries", "p50", "p90", "p99", "max" ]
+	assert lines[1].split()[:5] == [ "echo", "hello", "3", "3", "0" ]
+	assert "6 commands" in out
+#
+
+
+
+def test_jsonl(capsysbinary):
+	ret = jk_simpleexec.__main__.main([ "--jsonl", "-t", "0.2", "echo a b", "sleep 5" ])
+	assert ret == 1
+	records = [ json.loads(line) for line in capsysbinary.readouterr().out.splitlines() ]
+	records.sort(key=lambda x: x["cmd"])
+	assert records[0]["cmd"] == "echo"
+	assert records[0]["stdOut"] == "a b"
+	assert records[1]["limitKillReason"] == "timeout"
+#
+
+
+
+
+
+
+@pytest.mark.parametrize("command", [ " ", "echo 'unbalanced" ])
+def test_invalidCommand(command, capsys):
+	with pytest.raises(SystemExit) as ei:
+		jk_simpleexec.__main__.main([ command ])
+	assert ei.value.code == 2
+	assert "error:" in capsys.readouterr().err
+#
+
+
+
+def test_brokenPipe():
+	# the reader exits after the first record: writing the remaining records must not break the run
+	p = subprocess.run("{} -m jk_simpleexec --jsonl -n 50 -j 4 true | head -n 1".format(shlex.quote(sys.executable)), shell=True,
+		stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60, env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(jk_simpleexec.__file__))))
+	assert len(p.stdout.splitlines()) == 1
+	assert b"Traceback" not in p.stderr
+#
+
+
+
@@ -0,0 +1,84 @@
+
+
+import io
+import os
+import time
+import logging
+
+import pytest
+
+import jk_simpleexec
+
+
+
+
+def test_lines():
+	lines = []
+	chunks = []
+	tLines = []
+	r = jk_simpleexec.invokeCmd2(
+		cmdPath="/bin/sh",
+		cmdArgs=[ "-c", "echo first; sleep 0.3; printf 'second\\nincomplete'" ],
+		stdOutForwarder=jk_simpleexec.OutputForwarder(onLine=lambda line: (lines.append(line), tLines.append(time.monotonic())), onChunk=chunks.append),
+	)
+	tEnd = time.monotonic()
+	assert lines == [ "first", "second", "incomplete" ]
+	assert b"".join(chunks) == b"first\nsecond\nincomplete"
+	assert r.stdOutLines == lines
+	# the first line must have been forwarded before the command terminated
+	assert tEnd - tLines[0] >= 0.25
+#
+
+
+
+def test_tee():
+	textFile = io.StringIO()
+	readFD, writeFD = os.pipe()
+
+	records = []
+	logger = logging.getLogger("test_tee")
+	logger.setLevel(logging.INFO)
+	handler = logging.Handler()
+	handler.emit = lambda record: records.append(record.getMessage())
+	logger.addHandler(handler)
+
+	try:
+		r = jk_simpleexec.invokeCmd2(
+			cmdPath="/bin/sh",
+			cmdArgs=[ "-c", "echo out; echo 'äöü err' >&2" ],
+			stdOutForwarder=jk_simpleexec.OutputForwarder(tee=[ textFile, writeFD ]),
+			stdErrForwarder=jk_simpleexec.OutputForwarder(tee=logger),
+		)
+		os.close(writeFD)
+		with os.fdopen(readFD, "rb") as fin:
+			assert fin.read() == b"out\n"
+	finally:
+		logger.removeHandler(handler)
+
+	assert textFile.getvalue() == "out\n"
+	assert records == [ "äöü err" ]
+	assert r.stdErrLines == [ "äöü err" ]
+#
+
+
+
+def test_failingForwarder():
+	pids = []
+
+	def onLine(line:str):
+		pids.append(int(line))
+		raise ValueError("forwarder failed")
+	#
+
+	t = time.monotonic()
+	with pytest.raises(ValueError):
+		jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo $$; exec sleep 10" ], stdOutForwarder=jk_simpleexec.OutputForwarder(onLine=onLine))
+	assert time.monotonic() - t < 5
+	# the child process has been killed and reaped
+	with pytest.raises(ProcessLookupError):
+		os.kill(pids[0], 0)
+#
+
+
+
+
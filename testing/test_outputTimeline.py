@@ -0,0 +1,45 @@
+
+
+import jk_simpleexec
+
+
+
+
+def test_timeline():
+	r = jk_simpleexec.invokeCmd2(
+		cmdPath="/bin/sh",
+		cmdArgs=[ "-c", "echo out1; sleep 0.1; echo err1 >&2; sleep 0.1; echo out2; sleep 0.3; printf 'err2' >&2" ],
+		recordTimeline=True,
+	)
+	timeline = r.timeline
+	assert timeline.chunkCount == 4
+
+	lines = timeline.getLines()
+	assert [ (s, line) for t, s, line in lines ] == [ ("stdout", "out1"), ("stderr", "err1"), ("stdout", "out2"), ("stderr", "err2") ]
+	assert [ line for t, s, line in timeline.getLines("stdout") ] == [ "out1", "out2" ]
+	assert [ line for t, s, line in timeline.getLines("stderr") ] == [ "err1", "err2" ]
+	assert [ data for t, s, data in timeline.getChunks("stderr") ] == [ b"err1\n", b"err2" ]
+
+	assert timeline.timeToFirstOutput == timeline.timeToFirstStdOut
+	assert timeline.timeToFirstStdErr >= 0.1
+
+	stats = timeline.getGapStats()
+	assert stats["count"] == 3
+	assert stats["maxGapLineIndex"] == 3
+	assert stats["max"] >= 0.25
+#
+
+
+
+def test_noTimeline():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/true", cmdArgs=[])
+	assert r.timeline is None
+
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/true", cmdArgs=[], recordTimeline=True)
+	assert r.timeline.timeToFirstOutput is None
+	assert r.timeline.getLines() == []
+	assert r.timeline.getGapStats()["count"] == 0
+#
+
+
+
@@ -0,0 +1,110 @@
+import io
+import os
+import socket
+import hashlib
+import time
+import threading
+
+import pytest
+
+import jk_simpleexec
+from jk_simpleexec import _zerocopy
+
+
+
+
+def test_pipeline(tmp_path):
+	data = os.urandom(300000) * 4
+	srcFilePath = str(tmp_path / "src")
+	with open(srcFilePath, "wb") as fout:
+		fout.write(data)
+
+	# file -> gzip -> gunzip -> file
+	results = jk_simpleexec.invokePipeline(commands=[ [ "gzip", "-c" ], [ "gunzip", "-c" ] ], stdIn=srcFilePath, stdOut=str(tmp_path / "dst"))
+	assert [ r.returnCode for r in results ] == [ 0, 0 ]
+	with open(str(tmp_path / "dst"), "rb") as fin:
+		assert fin.read() == data
+
+	# bytes -> sha256sum -> captured
+	results = jk_simpleexec.invokePipeline(commands=[ [ "cat" ], [ "sha256sum" ] ], stdIn=data)
+	assert results[-1].stdOutLines[0].split()[0] == hashlib.sha256(data).hexdigest()
+
+	# file object without file descriptor as target; errors of all commands are captured
+	buffer = io.BytesIO()
+	results = jk_simpleexec.invokePipeline(commands=[ [ "/bin/sh", "-c", "echo oops >&2; printf abc" ], [ "tr", "a-z", "A-Z" ] ], stdOut=buffer)
+	assert buffer.getvalue() == b"ABC"
+	assert results[0].stdErrLines == [ "oops" ]
+#
+
+
+
+def test_transferData(tmp_path):
+	data = os.urandom(3 * 1024 * 1024 + 5)
+	srcFilePath = str(tmp_path / "src")
+	with open(srcFilePath, "wb") as fout:
+		fout.write(data)
+
+	assert jk_simpleexec.transferData(srcFilePath, str(tmp_path / "copy")) == len(data)
+	with open(str(tmp_path / "copy"), "rb") as fin:
+		assert fin.read() == data
+
+	a, b = socket.socketpair()
+	with a, b, open(srcFilePath, "rb") as fin:
+		assert _zerocopy.selectCopyMethod(fin.fileno(), a.fileno())[0] == "sendfile"
+		assert jk_simpleexec.transferData(fin, a, count=1000) == 1000
+		assert b.recv(2000) == data[:1000]
+
+	buffer = io.BytesIO()
+	assert jk_simpleexec.transferData(io.BytesIO(data), buffer) == len(data)
+	assert buffer.getvalue() == data
+#
+
+
+
+def test_startFailure():
+	t = time.monotonic()
+	with pytest.raises(FileNotFoundError):
+		jk_simpleexec.invokePipeline(commands=[ [ "sleep", "7.25" ], [ "/does/not/exist" ] ], stdIn=b"x" * 1000000)
+	assert time.monotonic() - t < 3
+
+	# the command already started has been terminated
+	for pid in os.listdir("/proc"):
+		if pid.isdigit():
+			try:
+				with open("/proc/" + pid + "/cmdline", "rb") as fin:
+					assert fin.read() != b"sleep\0" + b"7.25\0"
+			except OSError:
+				pass
+#
+
+
+
+def test_copyErrors():
+	class FailingWriter(object):
+		def write(self, data:bytes):
+			raise ValueError("write failed")
+	#
+
+	with pytest.raises(ValueError):
+		jk_simpleexec.invokePipeline(commands=[ [ "echo", "abc" ] ], stdOut=FailingWriter())
+
+	# a source that does not provide any data must not block the termination of a pipeline that failed to start
+	event = threading.Event()
+	class BlockingReader(object):
+		def read(self, n:int) -> bytes:
+			event.wait()
+			return b""
+	#
+
+	t = time.monotonic()
+	try:
+		with pytest.raises(FileNotFoundError):
+			jk_simpleexec.invokePipeline(commands=[ [ "cat" ], [ "/does/not/exist" ] ], stdIn=BlockingReader())
+		assert time.monotonic() - t < 3
+	finally:
+		event.set()
+#
+
+
+
+
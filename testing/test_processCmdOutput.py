@@ -0,0 +1,89 @@
+
+
+
+import random
+import itertools
+
+from jk_cmdoutputparsinghelper.TextData import TextData
+
+import jk_simpleexec
+
+
+
+
+#
+# The original line based implementation of processCmdOutput(). The current implementation must produce exactly the same lines.
+#
+def legacyProcessCmdOutput(textData:str, policy:jk_simpleexec.TextDataProcessingPolicy) -> TextData:
+	textData = TextData(textData)
+
+	if policy.bRightTrimLines:
+		textData.lines.rightTrimAllLines()
+	if policy.bRemoveLeadingEmptyLines:
+		textData.lines.removeLeadingEmptyLines()
+	if policy.bRemoveTrailingEmptyLines:
+		textData.lines.removeTrailingEmptyLines()
+
+	return textData
+#
+
+ALL_POLICIES = [
+	jk_simpleexec.TextDataProcessingPolicy(a, b, c)
+	for a, b, c in itertools.product([ True, False, None ], repeat=3)
+]
+
+SAMPLES = [
+	"",
+	"\n",
+	"\n\n\n",
+	"   ",
+	" \n \t\n",
+	"abc",
+	"abc\n",
+	"\n\nabc  \n  def\t\n\n \n",
+	"a\r\nb\r\n\r\n",
+	"x\x1c\x1f\x0b\x0c \ny",
+	"unicode 　 \n\u0085\n",
+	"ümläut  \n\n",
+]
+
+def _checkEquivalence(text:str):
+	for policy in ALL_POLICIES:
+		expected = legacyProcessCmdOutput(text, policy).lines
+		assert list(jk_simpleexec.processCmdOutput(text, policy).lines) == list(expected), (text, policy.dumpToStr())
+		assert list(jk_simpleexec.processCmdOutput(text.encode("utf-8"), policy).lines) == list(expected), (text, policy.dumpToStr())
+#
+
+
+
+def test_samples():
+	for text in SAMPLES:
+		_checkEquivalence(text)
+#
+
+
+
+def test_random():
+	rnd = random.Random(42)
+	alphabet = [ "a", "b", " ", "\t", "\n", "\n", "\r", "\x0b", "\x1d", " ", " ", "ä" ]
+	for _ in range(2000):
+		text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+		_checkEquivalence(text)
+#
+
+
+
+def test_empty_stderr_is_no_error():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "printf 'a  \\n\\n'; printf '\\n  \\n' >&2" ])
+	assert r.stdOutLines == [ "a" ]
+	assert r.stdErrLines == []
+	assert not r.isError
+#
+
+
+
+
+
+
+
+
@@ -0,0 +1,54 @@
+
+
+import jk_simpleexec
+
+
+
+
+def test_measureOnly():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "echo hello" ], resourceLimits=jk_simpleexec.ResourceLimits())
+	assert r.returnCode == 0
+	assert r.stdOutLines == [ "hello" ]
+	assert r.resourceUsage.maxRSS > 0
+	assert r.limitKillReason is None
+	assert r.toJSON()["resourceUsage"]["maxRSS"] == r.resourceUsage.maxRSS
+
+	# nothing to apply in the child process
+	assert jk_simpleexec.ResourceLimits()._createPreExecFunction(None) is None
+	assert callable(jk_simpleexec.ResourceLimits(nice=1)._createPreExecFunction(None))
+#
+
+
+
+def test_noLimits():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/true", cmdArgs=[])
+	assert r.resourceUsage is None
+	assert r.limitKillReason is None
+#
+
+
+
+def test_stdin():
+	data = b"x" * (1024 * 1024)
+	r = jk_simpleexec.invokeCmd2(cmdPath="wc", cmdArgs=[ "-c" ], dataToPipeAsStdIn=data, resourceLimits=jk_simpleexec.ResourceLimits())
+	assert r.stdOutLines == [ str(len(data)) ]
+#
+
+
+
+def test_maxOpenFiles():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "ulimit -n" ], resourceLimits=jk_simpleexec.ResourceLimits(maxOpenFiles=42))
+	assert r.stdOutLines == [ "42" ]
+#
+
+
+
+def test_cpuSeconds():
+	r = jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", "while :; do :; done" ], resourceLimits=jk_simpleexec.ResourceLimits(cpuSeconds=1))
+	assert r.returnCode < 0
+	assert r.limitKillReason == "cpuSeconds"
+	assert r.resourceUsage.cpuTime > 0.5
+#
+
+
+
@@ -0,0 +1,91 @@
+
+
+import sys
+import json
+
+import pytest
+
+import jk_simpleexec
+
+
+
+
+def _run(script:str, **kwargs) -> jk_simpleexec.CommandResult:
+	return jk_simpleexec.invokeCmd2(cmdPath="/bin/sh", cmdArgs=[ "-c", script ], **kwargs)
+#
+
+
+
+def test_lines():
+	r = _run("seq 1 200000", spillThreshold=4096)
+	assert hasattr(r.stdOut, "buffer")
+	lines = r.stdOutLines
+	assert lines[0] == "1"
+	assert lines[12345] == "12346"
+	assert lines[-1] == "200000"
+	assert len(lines) == 200000
+	assert lines == [ str(i) for i in range(1, 200001) ]
+	assert r.stdOut.size == len(r.stdOut.buffer)
+	assert r.stdOutDecodeErrors is None
+
+	# below the threshold the output is kept in memory
+	r = _run("seq 1 10; seq 1 3 >&2", spillThreshold=4096)
+	assert not hasattr(r.stdOut, "buffer")
+	assert r.stdOutLines == [ str(i) for i in range(1, 11) ]
+	assert r.stdErrLines == [ "1", "2", "3" ]
+#
+
+
+
+@pytest.mark.parametrize("bRightTrimLines", [ True, False ])
+@pytest.mark.parametrize("bRemoveEmptyLines", [ True, False ])
+@pytest.mark.parametrize("script", [
+	"printf '\\n  \\n a  \\n\\n b\\t\\n\\n  \\n'",
+	"printf 'x'",
+	"printf '\\n \\n'",
+	"printf 'a\\n'; printf 'ä%.0s' $(seq 1 300000); printf '\\n\\n'",
+	"printf 'e\\n  \\n' >&2",
+])
+def test_policy(script, bRightTrimLines, bRemoveEmptyLines):
+	policy = jk_simpleexec.TextDataProcessingPolicy(bRemoveEmptyLines, bRemoveEmptyLines, bRightTrimLines)
+	expected = _run(script, stdOutProcessing=policy, stdErrProcessing=policy)
+	r = _run(script, stdOutProcessing=policy, stdErrProcessing=policy, spillThreshold=0)
+	assert r.stdOutLines == expected.stdOutLines
+	assert list(r.stdOutLines) == expected.stdOutLines
+	# (TextData keeps the text it has been created with even if its lines are trimmed later on)
+	assert r.stdOutStr == "\n".join(expected.stdOutLines)
+	assert bool(r.stdOut) == bool(r.stdOutStr)
+	assert r.stdErrLines == expected.stdErrLines
+	assert r.isError == expected.isError
+#
+
+
+
+def test_parsers():
+	script = "import json, sys; json.dump([ { 'n': i, 's': 'x' * 100 } for i in range(20000) ], sys.stdout, indent=1)"
+	r = jk_simpleexec.invokeCmd2(cmdPath=sys.executable, cmdArgs=[ "-c", script ], spillThreshold=65536)
+	assert hasattr(r.stdOut, "buffer")
+	jData = r.getStdOutAsJSON()
+	assert len(jData) == 20000
+	assert jData[-1]["n"] == 19999
+
+	r = _run("echo '<root>'; for i in $(seq 1 5000); do echo \"<item n='$i'>text</item>\"; done; echo '</root>'", spillThreshold=65536)
+	assert hasattr(r.stdOut, "buffer")
+	xRoot = r.getStdOutAsXML()
+	assert len(xRoot) == 5000
+	assert xRoot[-1].get("n") == "5000"
+#
+
+
+
+def test_toJSON():
+	r = jk_simpleexec.invokeCmd2(cmdPath="seq", cmdArgs=[ "1", "5000" ], spillThreshold=100)
+	assert hasattr(r.stdOut, "buffer")
+	data = json.loads(json.dumps(r.toJSON()))
+	assert data["stdOut"] == [ str(i) for i in range(1, 5001) ]
+	assert data["stdErr"] == []
+#
+
+
+
+